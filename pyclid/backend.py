@@ -0,0 +1,231 @@
+""" Compute backend for the batch operations
+
+The vector and quaternion arrays and the matrix buffer transforms run in pure Python, or with NumPy when it is
+installed. Single vectors, matrices and quaternions always use the scalar code.
+
+    'auto'      NumPy for batches of at least NUMPY_THRESHOLD elements, pure Python otherwise (the default)
+    'python'    always pure Python
+    'numpy'     always NumPy
+
+The backend is read from the PYCLID_BACKEND environment variable at import, and can be changed with set_backend(),
+or for a block with using()
+
+    with pyclid.backend.using('python'):
+        points.normalize()
+
+Every kernel here works on the planar array('d') data of the arrays (see pyclid.vector._VecArray) in place,
+or returns an array('d'), so the results are the same type whichever backend runs.
+"""
+import os
+from array import array
+
+BACKENDS = ('auto', 'python', 'numpy')
+
+# Batch length from which 'auto' uses NumPy, below it the conversion overhead outweighs the gain
+NUMPY_THRESHOLD = 16
+
+_backend = ['auto']
+# The numpy module once imported, None when it is not installed
+_numpy = []
+
+
+def _load_numpy():
+    if not _numpy:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy.append(numpy)
+    return _numpy[0]
+
+
+def available():
+    # True when NumPy can be imported
+    return _load_numpy() is not None
+
+
+def get_backend():
+    return _backend[0]
+
+
+def set_backend(name):
+    assert name in BACKENDS, 'Requires a backend of ' + ', '.join(BACKENDS)
+    assert name != 'numpy' or available(), 'The numpy backend requires NumPy to be installed'
+    _backend[0] = name
+
+
+def set_threshold(size):
+    global NUMPY_THRESHOLD
+    NUMPY_THRESHOLD = size
+
+
+def use_numpy(n):
+    # True when a batch of n elements should run with NumPy
+    backend = _backend[0]
+    if backend == 'python':
+        return False
+    if backend == 'numpy':
+        return True
+    return n >= NUMPY_THRESHOLD and available()
+
+
+class using:
+    """ Context manager selecting a backend, and optionally a threshold, for a block
+    """
+    def __init__(self, name, threshold=None):
+        self.name = name
+        self.threshold = threshold
+
+    def __enter__(self):
+        self.__previous = (_backend[0], NUMPY_THRESHOLD)
+        set_backend(self.name)
+        if self.threshold is not None:
+            set_threshold(self.threshold)
+        return self
+
+    def __exit__(self, *exc_info):
+        _backend[0], threshold = self.__previous
+        set_threshold(threshold)
+        return False
+
+
+def _planar(np, data, n, dim):
+    # (dim, n) view of planar data, writable when data is
+    return np.frombuffer(data, dtype=np.float64).reshape(dim, n)
+
+
+def _to_array(np, values):
+    result = array('d')
+    result.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return result
+
+
+def dot(a, b, n, dim):
+    np = _numpy[0]
+    return _to_array(np, (_planar(np, a, n, dim)*_planar(np, b, n, dim)).sum(axis=0))
+
+
+def magnitude(data, n, dim):
+    np = _numpy[0]
+    values = _planar(np, data, n, dim)
+    return _to_array(np, np.sqrt((values*values).sum(axis=0)))
+
+
+def normalize(data, n, dim):
+    # Zero length vectors are left untouched
+    np = _numpy[0]
+    values = _planar(np, data, n, dim)
+    mags = np.sqrt((values*values).sum(axis=0))
+    mags[mags == 0] = 1.0
+    values /= mags
+
+
+def normalize_tuples(data, components):
+    # Normalizes interleaved tuples of an array('d') in place, zero length tuples are left untouched
+    np = _numpy[0]
+    values = np.frombuffer(data, dtype=np.float64).reshape(-1, components)
+    mags = np.sqrt((values*values).sum(axis=1))
+    mags[mags == 0] = 1.0
+    values /= mags[:, None]
+
+
+def distance(a, b, n, dim):
+    np = _numpy[0]
+    diff = _planar(np, a, n, dim) - _planar(np, b, n, dim)
+    return _to_array(np, np.sqrt((diff*diff).sum(axis=0)))
+
+
+def quat_mul_into(out, a, b, n):
+    """ Element wise quaternion product of planar data, b is planar data or a (q0, q1, q2, q3) tuple
+        applied to every element. out may be a or b
+    """
+    np = _numpy[0]
+    p0, p1, p2, p3 = _planar(np, a, n, 4)
+    if isinstance(b, tuple):
+        q0, q1, q2, q3 = b
+    else:
+        q0, q1, q2, q3 = _planar(np, b, n, 4)
+    result = np.stack((p0*q0 - p1*q1 - p2*q2 - p3*q3,
+                       p1*q0 + p0*q1 - p3*q2 + p2*q3,
+                       p2*q0 + p3*q1 + p0*q2 - p1*q3,
+                       p3*q0 - p2*q1 + p1*q2 + p0*q3))
+    _planar(np, out, n, 4)[...] = result
+
+
+def quat_rotate_into(out, quats, vecs, n):
+    # Expanded sandwich product of planar quaternion and vector data, out may be vecs
+    np = _numpy[0]
+    w, x, y, z = _planar(np, quats, n, 4)
+    vx, vy, vz = _planar(np, vecs, n, 3)
+    tx = 2.0*(y*vz - z*vy)
+    ty = 2.0*(z*vx - x*vz)
+    tz = 2.0*(x*vy - y*vx)
+    result = np.stack((vx + w*tx + (y*tz - z*ty),
+                       vy + w*ty + (z*tx - x*tz),
+                       vz + w*tz + (x*ty - y*tx)))
+    _planar(np, out, n, 3)[...] = result
+
+
+def transform_buffer(mat, size, src, dst, components, w, divide):
+    """ NumPy version of pyclid.matrix._transform_buffer, src and dst are flat float32/float64 memoryviews
+    """
+    np = _numpy[0]
+    m = np.array(mat, dtype=np.float64).reshape(-1, size)
+    tuples = np.frombuffer(src, dtype=src.format).reshape(-1, components)
+    result = tuples @ m[:components, :components].T
+    if components < size:
+        result += m[:components, size - 1]*w
+    if divide:
+        result /= (tuples @ m[size - 1, :components] + m[size - 1, size - 1])[:, None]
+    np.frombuffer(dst, dtype=dst.format).reshape(-1, components)[...] = result
+
+
+def trs_compose(translations, rotations, scales, n):
+    """ Row major T*R*S matrices, 16 values each, from planar translation, unit quaternion and
+        scale data (scales may be None), as pyclid.matrix._trs_values
+    """
+    np = _numpy[0]
+    tx, ty, tz = _planar(np, translations, n, 3)
+    w, x, y, z = _planar(np, rotations, n, 4)
+    sx, sy, sz = (1.0, 1.0, 1.0) if scales is None else _planar(np, scales, n, 3)
+    x2, y2, z2 = x + x, y + y, z + z
+    xx, yy, zz = x*x2, y*y2, z*z2
+    xy, xz, yz = x*y2, x*z2, y*z2
+    wx, wy, wz = w*x2, w*y2, w*z2
+    out = np.zeros((n, 16))
+    out[:, 0], out[:, 1], out[:, 2], out[:, 3] = (1.0 - (yy + zz))*sx, (xy - wz)*sy, (xz + wy)*sz, tx
+    out[:, 4], out[:, 5], out[:, 6], out[:, 7] = (xy + wz)*sx, (1.0 - (xx + zz))*sy, (yz - wx)*sz, ty
+    out[:, 8], out[:, 9], out[:, 10], out[:, 11] = (xz - wy)*sx, (yz + wx)*sy, (1.0 - (xx + yy))*sz, tz
+    out[:, 15] = 1.0
+    return _to_array(np, out)
+
+
+def trs_decompose(values, n):
+    """ Planar (translations, rotations, scales) of n row major matrices in a flat float view,
+        as pyclid.matrix._decompose_values
+    """
+    np = _numpy[0]
+    m = np.frombuffer(values, dtype=values.format).reshape(n, 16).astype(np.float64)
+    upper = m[:, [0, 1, 2, 4, 5, 6, 8, 9, 10]].reshape(n, 3, 3)
+    scales = np.sqrt((upper*upper).sum(axis=1))
+    assert (scales != 0).all(), 'Requires a matrix with non-zero scale'
+    scales[:, 0] *= np.where(np.linalg.det(upper) < 0, -1.0, 1.0)
+    r = upper/scales[:, None, :]
+    r0, r1, r2, r3, r4, r5, r6, r7, r8 = r.reshape(n, 9).T
+    trace = r0 + r4 + r8
+    # Every branch of the scalar version, then the one chosen per matrix
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.sqrt(np.stack((trace + 1.0, 1.0 + r0 - r4 - r8, 1.0 + r4 - r0 - r8, 1.0 + r8 - r0 - r4)))*2.0
+        candidates = np.stack((
+            np.stack((0.25*t[0], (r7 - r5)/t[0], (r2 - r6)/t[0], (r3 - r1)/t[0])),
+            np.stack(((r7 - r5)/t[1], 0.25*t[1], (r1 + r3)/t[1], (r2 + r6)/t[1])),
+            np.stack(((r2 - r6)/t[2], (r1 + r3)/t[2], 0.25*t[2], (r5 + r7)/t[2])),
+            np.stack(((r3 - r1)/t[3], (r2 + r6)/t[3], (r5 + r7)/t[3], 0.25*t[3]))))
+    case = np.where(trace > 0, 0, np.where((r0 > r4) & (r0 > r8), 1, np.where(r4 > r8, 2, 3)))
+    quats = candidates[case, :, np.arange(n)].T
+    quats *= np.where(quats[0] < 0, -1.0, 1.0)
+    translations = m[:, [3, 7, 11]].T
+    return _to_array(np, translations), _to_array(np, quats), _to_array(np, scales.T)
+
+
+set_backend(os.environ.get('PYCLID_BACKEND', 'auto'))
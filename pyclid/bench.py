@@ -0,0 +1,328 @@
+""" Benchmarks for pyclid
+
+    python -m pyclid.bench run [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+    python -m pyclid.bench memory [--before path/to/earlier/pyclid]
+
+"""
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+from array import array
+
+import pyclid
+import pyclid.backend
+
+
+# (type name, build(cls, value) making one instance)
+_MEMORY_TYPES = (
+    ('Vec2', lambda cls, value: cls(value, value)),
+    ('Vec3', lambda cls, value: cls(value, value, value)),
+    ('Vec4', lambda cls, value: cls(value, value, value, value)),
+    ('Quat', lambda cls, value: cls(value, value, value, value)),
+    ('Mat2', lambda cls, value: cls([value]*4)),
+    ('Mat3', lambda cls, value: cls([value]*9)),
+    ('Mat4', lambda cls, value: cls([value]*16)),
+)
+
+
+def _load_before(path):
+    """ The classes of a pyclid package directory, such as a checkout of a release from before the classes
+        were slotted. Its modules are loaded under other names, so both versions can be measured side by side
+    """
+    classes = {}
+    for name in ('vector', 'matrix', 'quaternion'):
+        spec = importlib.util.spec_from_file_location('_pyclid_before_' + name, os.path.join(path, name + '.py'))
+        assert spec is not None, 'Requires a pyclid package directory with vector.py, matrix.py and quaternion.py'
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        classes.update((cls, getattr(module, cls)) for cls, build in _MEMORY_TYPES if hasattr(module, cls))
+    return classes
+
+
+def _memory_cases(before=None):
+    # (name, before factory or None, current factory), each factory builds one instance from a shared value
+    value = 1.5
+    classes = _load_before(before) if before else {}
+    return [(name, functools.partial(build, classes[name], value) if name in classes else None,
+             functools.partial(build, getattr(pyclid, name), value)) for name, build in _MEMORY_TYPES]
+
+
+def bytes_per_instance(factory, count=10000):
+    """ Average traced allocation per instance when holding count instances
+    """
+    holder = [None]*count
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            holder[i] = factory()
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return used/float(count)
+
+
+def memory(count=10000, before=None):
+    """ Returns a list of (name, bytes before, bytes after) per instance for each type
+
+        before is the path of an earlier pyclid package directory to measure against, bytes before is None
+        without it
+    """
+    results = []
+    for name, previous, current in _memory_cases(before):
+        results.append((name, bytes_per_instance(previous, count) if previous else None,
+                        bytes_per_instance(current, count)))
+    return results
+
+
+def _print_memory(results):
+    print('{:<6} {:>10} {:>10} {:>8}'.format('type', 'before', 'after', 'saved'))
+    for name, before, after in results:
+        if before is None:
+            print('{:<6} {:>10} {:>10.1f} {:>8}'.format(name, '-', after, '-'))
+            continue
+        saved = 100.0*(before - after)/before
+        print('{:<6} {:>10.1f} {:>10.1f} {:>7.1f}%'.format(name, before, after, saved))
+
+
+def _random_values(count, rng):
+    return [rng.uniform(-1.0, 1.0) for i in range(count)]
+
+
+def timing_cases(batch_size=1000, seed=0):
+    """ Returns a list of (name, function) pairs, each function running one operation
+
+        Operations that modify their operand in place are chosen so repeated calls stay bounded
+    """
+    rng = random.Random(seed)
+    values = _random_values(16, rng)
+    cases = []
+
+    def add(name, func):
+        cases.append((name, func))
+
+    for cls, size in ((pyclid.Vec2, 2), (pyclid.Vec3, 3), (pyclid.Vec4, 4)):
+        name = cls.__name__
+        a = cls(*values[:size])
+        b = cls(*values[size:size*2])
+        out = cls()
+        args = values[:size]
+        add(name + '.construct', lambda cls=cls, args=args: cls(*args))
+        add(name + '.add', lambda a=a, b=b: a + b)
+        add(name + '.sub', lambda a=a, b=b: a - b)
+        add(name + '.mul', lambda a=a: a*2.0)
+        add(name + '.add_into', lambda out=out, a=a, b=b, cls=cls: cls.add_into(out, a, b))
+        add(name + '.dot' if size < 4 else name + '.distance_between',
+            (lambda a=a, b=b: a.dot(b)) if size < 4 else (lambda a=a, b=b: a.distance_between(b)))
+        add(name + '.magnitude', lambda a=a: a.magnitude())
+        add(name + '.normalize', lambda a=a: a.normalize())
+        add(name + '.str', lambda a=a: str(a))
+    add('Vec2.rotate', lambda v=pyclid.Vec2(1.0, 0.0): v.rotate(0.1))
+    add('Vec3.cross', lambda a=pyclid.Vec3(*values[:3]), b=pyclid.Vec3(*values[3:6]): a.cross(b))
+
+    for cls, vec, size in ((pyclid.Mat2, pyclid.Vec2, 2), (pyclid.Mat3, pyclid.Vec3, 3), (pyclid.Mat4, pyclid.Vec4, 4)):
+        name = cls.__name__
+        # Rotations keep repeated in place products bounded
+        a = cls().load_identity()
+        if size == 4:
+            a.rotate_x(0.3).rotate_y(0.2)
+        else:
+            a.rotate(0.3)
+        b = cls(list(a.values))
+        v = vec(*values[:size])
+        out = cls()
+        args = list(values[:size*size])
+        add(name + '.construct', lambda cls=cls, args=args: cls(args))
+        add(name + '.add', lambda a=a, b=b: a + b)
+        add(name + '.mul_scalar', lambda a=a: a*2.0)
+        add(name + '.mul_mat', lambda a=a, b=b: a*b)
+        add(name + '.mul_vec', lambda a=a, v=v: a*v)
+        add(name + '.mul_into', lambda out=out, a=a, b=b, cls=cls: cls.mul_into(out, a, b))
+        add(name + '.transpose', lambda a=a: a.transpose())
+        add(name + '.determinant', lambda a=a: a.determinant())
+        add(name + '.inverse_into', lambda out=out, a=a, cls=cls: cls.inverse_into(out, a))
+        add(name + '.str', lambda a=a: str(a))
+        if size == 4:
+            add(name + '.rotate_x', lambda b=b: b.rotate_x(0.1))
+            add(name + '.inverse_rigid_into', lambda out=out, a=a: pyclid.Mat4.inverse_rigid_into(out, a))
+            add(name + '.transform_point', lambda a=a, p=pyclid.Vec3(*values[:3]): a.transform_point(p))
+        else:
+            add(name + '.rotate', lambda b=b: b.rotate(0.1))
+
+    for cls, vec in ((pyclid.Mat2x3, pyclid.Vec3), (pyclid.Mat3x4, pyclid.Vec4)):
+        name = cls.__name__
+        a = cls().load_identity()
+        if cls is pyclid.Mat3x4:
+            a.rotate_x(0.3).rotate_y(0.2).translate(1.0, 2.0, 3.0)
+        else:
+            a.rotate(0.3).translate(1.0, 2.0)
+        b = cls(list(a.values))
+        v = vec(*values[:len(vec.__slots__) - 1] + [1.0])
+        out = cls()
+        add(name + '.construct', lambda cls=cls, args=list(values[:cls.size]): cls(args))
+        add(name + '.mul_mat', lambda a=a, b=b: a*b)
+        add(name + '.mul_vec', lambda a=a, v=v: a*v)
+        add(name + '.mul_into', lambda out=out, a=a, b=b, cls=cls: cls.mul_into(out, a, b))
+        add(name + '.inverse_into', lambda out=out, a=a, cls=cls: cls.inverse_into(out, a))
+
+    q = pyclid.Quat(*values[:4]).unit()
+    r = pyclid.Quat(*values[4:8]).unit()
+    add('Quat.construct', lambda args=values[:4]: pyclid.Quat(*args))
+    add('Quat.add', lambda: q + r)
+    add('Quat.mul', lambda: q*r)
+    add('Quat.mul_into', lambda out=pyclid.Quat(): pyclid.Quat.mul_into(out, q, r))
+    add('Quat.normalize', lambda: q.normalize())
+    add('Quat.rotate', lambda v=pyclid.Vec3(*values[:3]): q.rotate(v))
+    add('Quat.to_mat4', lambda: q.to_mat4())
+    add('Quat.from_euler', lambda: pyclid.Quat.from_euler(0.1, 0.2, 0.3))
+    add('Quat.slerp', lambda: pyclid.Quat.slerp(q, r, 0.3))
+    add('Quat.str', lambda: str(q))
+
+    # Batch APIs, timed per call over batch_size elements
+    n = batch_size
+    for cls, vec, size in ((pyclid.Vec2Array, pyclid.Vec2, 2), (pyclid.Vec3Array, pyclid.Vec3, 3),
+                           (pyclid.Vec4Array, pyclid.Vec4, 4)):
+        name = cls.__name__
+        a = cls([vec(*_random_values(size, rng)) for i in range(n)])
+        b = cls([vec(*_random_values(size, rng)) for i in range(n)])
+        add(name + '.add', lambda a=a, b=b: a + b)
+        add(name + '.dot', lambda a=a, b=b: a.dot(b))
+        add(name + '.magnitude', lambda a=a: a.magnitude())
+        add(name + '.normalize', lambda a=a: a.normalize())
+        add(name + '.distance_between', lambda a=a, b=b: a.distance_between(b))
+        add(name + '.mid_point', lambda a=a, b=b: a.mid_point(b))
+    vecs = pyclid.Vec3Array([pyclid.Vec3(*_random_values(3, rng)) for i in range(n)])
+    add('Vec3Array.cross', lambda: vecs.cross(vecs))
+
+    quats = pyclid.QuatArray([pyclid.Quat(*_random_values(4, rng)).unit() for i in range(n)])
+    keys = pyclid.QuatArray([pyclid.Quat(*_random_values(4, rng)).unit() for i in range(n)])
+    slerp = pyclid.QuatSlerp(quats, keys)
+    pose = pyclid.QuatArray.zeros(n)
+    add('QuatArray.mul', lambda: quats*keys)
+    add('QuatArray.rotate', lambda: quats.rotate(vecs))
+    add('QuatArray.slerp', lambda: pyclid.QuatArray.slerp(quats, keys, 0.3))
+    add('QuatSlerp.sample_into', lambda: slerp.sample_into(pose, 0.3))
+
+    mat4 = pyclid.Mat4().load_identity().rotate_x(0.3).translate(1.0, 2.0, 3.0)
+    mat3 = pyclid.Mat3().load_identity().rotate(0.3)
+    points = array('d', _random_values(3*n, rng))
+    transformed = array('d', points)
+    add('Mat4.transform_points', lambda: mat4.transform_points(points, transformed))
+    add('Mat4.transform_points_divide', lambda: mat4.transform_points(points, transformed, divide=True))
+    add('Mat4.transform_directions', lambda: mat4.transform_directions(points, transformed))
+    add('Mat3.transform_points', lambda: mat3.transform_points(points, transformed))
+    mat3x4 = pyclid.Mat3x4.from_mat4(mat4)
+    add('Mat3x4.transform_points', lambda: mat3x4.transform_points(points, transformed))
+    return cases
+
+
+def time_case(func, min_time=0.02, repeat=5):
+    """ Best seconds per call over repeat runs, each run lasting around min_time
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time/10.0:
+            break
+        number *= 10
+    number = max(1, int(number*min_time/elapsed))
+    return min(timer.repeat(repeat, number))/number
+
+
+def run(batch_size=1000, min_time=0.02, repeat=5, match=None):
+    """ Times every case, returning {'meta': {..}, 'results': {name: seconds per call}}
+    """
+    results = {}
+    for name, func in timing_cases(batch_size):
+        if match and match not in name:
+            continue
+        results[name] = time_case(func, min_time, repeat)
+    meta = {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'batch_size': batch_size, 'backend': pyclid.backend.get_backend()}
+    return {'meta': meta, 'results': results}
+
+
+def compare(results, baseline, threshold=0.1):
+    """ Returns (name, baseline seconds, seconds, ratio) for every operation slower than
+        the baseline by more than threshold (0.1 is 10% slower)
+    """
+    regressions = []
+    base = baseline['results']
+    for name, seconds in sorted(results['results'].items()):
+        if name not in base or not base[name]:
+            continue
+        ratio = seconds/base[name]
+        if ratio > 1.0 + threshold:
+            regressions.append((name, base[name], seconds, ratio))
+    return regressions
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e3), ('us', 1e6)):
+        if seconds*scale >= 1.0:
+            return '{:.3f} {}'.format(seconds*scale, unit)
+    return '{:.1f} ns'.format(seconds*1e9)
+
+
+def _print_results(results, baseline=None):
+    base = baseline['results'] if baseline else {}
+    for name, seconds in sorted(results['results'].items()):
+        line = '{:<32} {:>12}'.format(name, _format_time(seconds))
+        if base.get(name):
+            line += ' {:>+8.1f}%'.format(100.0*(seconds/base[name] - 1.0))
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pyclid.bench', description='pyclid benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='time every operation')
+    run_parser.add_argument('--output', help='write the results as JSON to this file')
+    run_parser.add_argument('--baseline', help='JSON results to compare against')
+    run_parser.add_argument('--threshold', type=float, default=0.1,
+                            help='fail when an operation is slower than the baseline by more than this (0.1 is 10%%)')
+    run_parser.add_argument('--batch-size', type=int, default=1000, help='elements per batch operation')
+    run_parser.add_argument('--min-time', type=float, default=0.02, help='seconds per timing run')
+    run_parser.add_argument('--repeat', type=int, default=5, help='timing runs per operation, the best is kept')
+    run_parser.add_argument('--match', help='only time operations whose name contains this')
+    run_parser.add_argument('--backend', choices=pyclid.backend.BACKENDS, help='compute backend for batch operations')
+    memory_parser = commands.add_parser('memory', help='bytes per instance of each type')
+    memory_parser.add_argument('--count', type=int, default=10000, help='instances to allocate per type')
+    memory_parser.add_argument('--before', help='an earlier pyclid package directory to compare against')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        if args.backend:
+            pyclid.backend.set_backend(args.backend)
+        results = run(args.batch_size, args.min_time, args.repeat, args.match)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        _print_results(results, baseline)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        if baseline:
+            regressions = compare(results, baseline, args.threshold)
+            for name, before, after, ratio in regressions:
+                print('REGRESSION {}: {} -> {} ({:.2f}x)'.format(name, _format_time(before), _format_time(after), ratio))
+            return 1 if regressions else 0
+        return 0
+    if args.command == 'memory':
+        _print_memory(memory(args.count, args.before))
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
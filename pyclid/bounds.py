@@ -0,0 +1,464 @@
+""" Axis aligned bounding boxes and a bounding volume hierarchy
+"""
+import math
+from array import array
+
+import pyclid.matrix
+import pyclid.spatial
+import pyclid.vector
+
+# Stands in for 1/0 in the ray slab tests, large enough to put the slab at +-infinity
+# without the nan that 0*inf gives when the origin lies on a slab plane
+_BIG = 1e300
+
+
+def _inverse(d):
+    return 1.0/d if d else _BIG
+
+
+class AABB:
+    """ Axis aligned bounding box between two Vec3 corners
+
+        The default box is empty (min +inf, max -inf), so extending it by a point gives that point
+    """
+    __slots__ = ('min', 'max')
+
+    def __init__(self, min=None, max=None):
+        self.min = pyclid.vector.Vec3(math.inf, math.inf, math.inf) if min is None else \
+            pyclid.vector.Vec3(min.x, min.y, min.z)
+        self.max = pyclid.vector.Vec3(-math.inf, -math.inf, -math.inf) if max is None else \
+            pyclid.vector.Vec3(max.x, max.y, max.z)
+
+    @classmethod
+    def from_points(cls, points, dim=None):
+        # Bounds of a sequence of Vec3, a Vec3Array or a flat xyz buffer
+        dim, (xs, ys, zs) = pyclid.spatial._columns(points, dim or 3)
+        box = cls()
+        if xs:
+            box.min = pyclid.vector.Vec3(min(xs), min(ys), min(zs))
+            box.max = pyclid.vector.Vec3(max(xs), max(ys), max(zs))
+        return box
+
+    def __str__(self):
+        return '[' + str(self.min) + ', ' + str(self.max) + ']'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __eq__(self, other):
+        assert isinstance(other, AABB), 'Requires an AABB'
+        return self.min == other.min and self.max == other.max
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def is_empty(self):
+        return self.min.x > self.max.x or self.min.y > self.max.y or self.min.z > self.max.z
+
+    def extend(self, other):
+        # Grows the box in place to include a Vec3 or an AABB
+        assert isinstance(other, (pyclid.vector.Vec3, AABB)), 'Requires a Vec3 or AABB'
+        low, high = (other, other) if isinstance(other, pyclid.vector.Vec3) else (other.min, other.max)
+        self.min.x = min(self.min.x, low.x)
+        self.min.y = min(self.min.y, low.y)
+        self.min.z = min(self.min.z, low.z)
+        self.max.x = max(self.max.x, high.x)
+        self.max.y = max(self.max.y, high.y)
+        self.max.z = max(self.max.z, high.z)
+        return self
+
+    def overlaps(self, other):
+        # Touching boxes overlap
+        assert isinstance(other, AABB), 'Requires an AABB'
+        return (self.min.x <= other.max.x and other.min.x <= self.max.x and
+                self.min.y <= other.max.y and other.min.y <= self.max.y and
+                self.min.z <= other.max.z and other.min.z <= self.max.z)
+
+    def contains(self, point):
+        return (self.min.x <= point.x <= self.max.x and self.min.y <= point.y <= self.max.y and
+                self.min.z <= point.z <= self.max.z)
+
+    def center(self):
+        return (self.min + self.max)*0.5
+
+    def extent(self):
+        return self.max - self.min
+
+    def surface_area(self):
+        if self.is_empty():
+            return 0.0
+        dx, dy, dz = self.max.x - self.min.x, self.max.y - self.min.y, self.max.z - self.min.z
+        return 2.0*(dx*dy + dy*dz + dz*dx)
+
+    def intersect_ray(self, origin, direction, t_max=math.inf):
+        """ Distance along the ray (in units of direction) where it enters the box, 0 when the origin is inside,
+            or None when the ray misses the box before t_max
+        """
+        t0, t1 = 0.0, t_max
+        for o, d, low, high in ((origin.x, direction.x, self.min.x, self.max.x),
+                                (origin.y, direction.y, self.min.y, self.max.y),
+                                (origin.z, direction.z, self.min.z, self.max.z)):
+            inv = _inverse(d)
+            near, far = (low - o)*inv, (high - o)*inv
+            if near > far:
+                near, far = far, near
+            t0, t1 = max(t0, near), min(t1, far)
+            if t0 > t1:
+                return None
+        return t0
+
+
+def frustum_planes(mat):
+    """ The 6 planes (a, b, c, d) of the view frustum of a Mat4 projection (or projection*view) matrix,
+        left, right, bottom, top, near, far, normalized and facing inwards, so a point is inside when
+        a*x + b*y + c*z + d >= 0 for every plane. Assumes clip space -w <= x, y, z <= w
+    """
+    assert isinstance(mat, pyclid.matrix.Mat4), 'Requires a Mat4'
+    m = mat.values
+    rows = [m[0:4], m[4:8], m[8:12], m[12:16]]
+    planes = []
+    for r in range(3):
+        for sign in (1.0, -1.0):
+            plane = [w + sign*v for w, v in zip(rows[3], rows[r])]
+            length = math.sqrt(plane[0]**2 + plane[1]**2 + plane[2]**2) or 1.0
+            planes.append(tuple(value/length for value in plane))
+    return planes
+
+
+def _triangle_data(triangles):
+    # Flat array('d') of 9 floats per triangle, from a flat buffer, a Vec3Array or a sequence of Vec3 triples
+    if isinstance(triangles, pyclid.vector.Vec3Array):
+        assert len(triangles) % 3 == 0, 'Requires 3 vertices per triangle'
+        xs, ys, zs = triangles.columns()
+        data = array('d', [0.0])*(3*len(triangles))
+        data[0::3], data[1::3], data[2::3] = array('d', xs), array('d', ys), array('d', zs)
+        return data
+    try:
+        view = pyclid.matrix._float_view(triangles)
+    except TypeError:
+        view = None
+    if view is not None:
+        assert len(view) % 9 == 0, 'Requires 9 values per triangle'
+        return array('d', view.tolist())
+    return array('d', [value for triangle in triangles for vertex in triangle
+                       for value in (vertex.x, vertex.y, vertex.z)])
+
+
+def _box_data(boxes):
+    # Flat array('d') of minx, miny, minz, maxx, maxy, maxz per box, from a flat buffer or a sequence of AABB
+    try:
+        view = pyclid.matrix._float_view(boxes)
+    except TypeError:
+        view = None
+    if view is not None:
+        assert len(view) % 6 == 0, 'Requires 6 values per box'
+        return array('d', view.tolist())
+    return array('d', [value for box in boxes
+                       for value in (box.min.x, box.min.y, box.min.z, box.max.x, box.max.y, box.max.z)])
+
+
+class BVH:
+    """ Bounding volume hierarchy over triangles or boxes, built with binned SAH splits
+
+        Nodes are stored in flat arrays rather than node objects: node i has its bounds at bounds[6*i:6*i + 6]
+        (minx, miny, minz, maxx, maxy, maxz). A leaf has count > 0 and covers order[start:start + count].
+        An interior node has count 0, and its children are the nodes start and start + 1.
+        Primitives are referred to by their index in the input.
+
+        BVH(triangles) takes triangles as a flat buffer of 9 floats each, a Vec3Array of 3 vertices each, or a
+        sequence of (Vec3, Vec3, Vec3). BVH.from_boxes(boxes) takes AABBs, or a flat buffer of 6 floats each.
+    """
+    BINS = 12
+    LEAF_SIZE = 4
+    # SAH cost of a traversal step relative to a primitive test
+    TRAVERSAL_COST = 1.0
+
+    def __init__(self, triangles=()):
+        self.__triangles = _triangle_data(triangles)
+        t = self.__triangles
+        n = len(t)//9
+        bounds = array('d', [0.0])*(6*n)
+        for a in range(3):
+            v0, v1, v2 = t[a::9], t[3 + a::9], t[6 + a::9]
+            bounds[a::6] = array('d', map(min, v0, v1, v2))
+            bounds[3 + a::6] = array('d', map(max, v0, v1, v2))
+        self.__build(bounds)
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        bvh = cls.__new__(cls)
+        bvh.__triangles = None
+        bvh.__build(_box_data(boxes))
+        return bvh
+
+    def __len__(self):
+        return len(self.__primitive_bounds)//6
+
+    @property
+    def node_count(self):
+        return len(self.__count)
+
+    def __build(self, prims):
+        """ Top down build. Each node bins the centroids of its primitives into BINS buckets along each
+            axis of their centroid bounds, and splits at the bucket boundary with the lowest
+            surface area heuristic cost, or becomes a leaf when no split is cheaper than testing every primitive
+        """
+        self.__primitive_bounds = prims
+        n = len(prims)//6
+        centroids = [array('d', map(lambda low, high: (low + high)*0.5, prims[a::6], prims[3 + a::6]))
+                     for a in range(3)]
+        bounds = array('d')
+        start = array('q')
+        count = array('q')
+        order = array('q')
+        # (node, primitive indices)
+        stack = [(0, list(range(n)))]
+        bounds.extend([0.0]*6)
+        start.append(0)
+        count.append(0)
+        while stack:
+            node, indices = stack.pop()
+            box = [min(map(prims.__getitem__, [6*i + a for i in indices])) if indices else 0.0 for a in range(3)] + \
+                  [max(map(prims.__getitem__, [6*i + 3 + a for i in indices])) if indices else 0.0 for a in range(3)]
+            bounds[6*node:6*node + 6] = array('d', box)
+            split = self.__split(prims, centroids, indices, box) if len(indices) > self.LEAF_SIZE else None
+            if split is None:
+                start[node] = len(order)
+                count[node] = len(indices)
+                order.extend(indices)
+                continue
+            left, right = split
+            child = len(count)
+            start[node] = child
+            count[node] = 0
+            bounds.extend([0.0]*12)
+            start.extend([0, 0])
+            count.extend([0, 0])
+            stack.append((child, left))
+            stack.append((child + 1, right))
+        self.__bounds = bounds
+        self.__start = start
+        self.__count = count
+        self.__order = order
+
+    def __split(self, prims, centroids, indices, box):
+        # Returns (left, right) primitive indices, or None when a leaf is cheaper
+        bins = self.BINS
+        best = None
+        for axis in range(3):
+            values = list(map(centroids[axis].__getitem__, indices))
+            low, high = min(values), max(values)
+            if high - low <= 0.0:
+                continue
+            scale = bins/(high - low)
+            bin_of = [min(int((value - low)*scale), bins - 1) for value in values]
+            counts = [0]*bins
+            boxes = [[math.inf]*3 + [-math.inf]*3 for _ in range(bins)]
+            for i, b in zip(indices, bin_of):
+                counts[b] += 1
+                bin_box = boxes[b]
+                p = 6*i
+                for a in range(3):
+                    if prims[p + a] < bin_box[a]:
+                        bin_box[a] = prims[p + a]
+                    if prims[p + 3 + a] > bin_box[3 + a]:
+                        bin_box[3 + a] = prims[p + 3 + a]
+            # Area and count of every prefix and suffix of bins
+            left_area, left_count = self.__sweep(boxes, counts)
+            right_area, right_count = self.__sweep(boxes[::-1], counts[::-1])
+            for s in range(1, bins):
+                cost = left_area[s - 1]*left_count[s - 1] + right_area[bins - s - 1]*right_count[bins - s - 1]
+                if left_count[s - 1] and right_count[bins - s - 1] and (best is None or cost < best[0]):
+                    best = (cost, axis, s, bin_of)
+        if best is None:
+            return None
+        cost, axis, s, bin_of = best
+        # Small nodes stay leaves when splitting costs more than testing each primitive
+        node_area = self.__area(box)
+        if node_area > 0 and self.TRAVERSAL_COST + cost/node_area >= len(indices) and len(indices) <= 4*self.LEAF_SIZE:
+            return None
+        left = [i for i, b in zip(indices, bin_of) if b < s]
+        right = [i for i, b in zip(indices, bin_of) if b >= s]
+        return left, right
+
+    @staticmethod
+    def __area(box):
+        dx, dy, dz = box[3] - box[0], box[4] - box[1], box[5] - box[2]
+        return 2.0*(dx*dy + dy*dz + dz*dx)
+
+    @staticmethod
+    def __sweep(boxes, counts):
+        areas = []
+        totals = []
+        box = [math.inf]*3 + [-math.inf]*3
+        total = 0
+        for b, c in zip(boxes, counts):
+            if c:
+                box = [min(box[a], b[a]) for a in range(3)] + [max(box[a], b[a]) for a in range(3, 6)]
+            total += c
+            areas.append(BVH.__area(box) if total else 0.0)
+            totals.append(total)
+        return areas, totals
+
+    def __primitive_hit(self, i, ox, oy, oz, dx, dy, dz, ix, iy, iz, t_max):
+        # Distance to primitive i along the ray, or None
+        t = self.__triangles
+        if t is None:
+            p = self.__primitive_bounds
+            q = 6*i
+            return _slab(p[q], p[q + 1], p[q + 2], p[q + 3], p[q + 4], p[q + 5], ox, oy, oz, ix, iy, iz, t_max)
+        # Moller-Trumbore
+        q = 9*i
+        ax, ay, az = t[q], t[q + 1], t[q + 2]
+        e1x, e1y, e1z = t[q + 3] - ax, t[q + 4] - ay, t[q + 5] - az
+        e2x, e2y, e2z = t[q + 6] - ax, t[q + 7] - ay, t[q + 8] - az
+        px, py, pz = dy*e2z - dz*e2y, dz*e2x - dx*e2z, dx*e2y - dy*e2x
+        det = e1x*px + e1y*py + e1z*pz
+        if -1e-12 < det < 1e-12:
+            return None
+        inv = 1.0/det
+        sx, sy, sz = ox - ax, oy - ay, oz - az
+        u = (sx*px + sy*py + sz*pz)*inv
+        if u < 0.0 or u > 1.0:
+            return None
+        qx, qy, qz = sy*e1z - sz*e1y, sz*e1x - sx*e1z, sx*e1y - sy*e1x
+        v = (dx*qx + dy*qy + dz*qz)*inv
+        if v < 0.0 or u + v > 1.0:
+            return None
+        hit = (e2x*qx + e2y*qy + e2z*qz)*inv
+        return hit if 0.0 <= hit <= t_max else None
+
+    def __traverse(self, origin, direction, t_max, any_hit):
+        ox, oy, oz = origin.x, origin.y, origin.z
+        dx, dy, dz = direction.x, direction.y, direction.z
+        ix, iy, iz = _inverse(dx), _inverse(dy), _inverse(dz)
+        bounds = self.__bounds
+        start = self.__start
+        count = self.__count
+        order = self.__order
+        best = None
+        if not len(self):
+            return None
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            b = 6*node
+            if _slab(bounds[b], bounds[b + 1], bounds[b + 2], bounds[b + 3], bounds[b + 4], bounds[b + 5],
+                     ox, oy, oz, ix, iy, iz, t_max) is None:
+                continue
+            if count[node]:
+                for i in order[start[node]:start[node] + count[node]]:
+                    hit = self.__primitive_hit(i, ox, oy, oz, dx, dy, dz, ix, iy, iz, t_max)
+                    if hit is not None:
+                        best = (i, hit)
+                        t_max = hit
+                        if any_hit:
+                            return best
+                continue
+            # Visit the child nearer the origin first
+            left = start[node]
+            b = 6*left
+            near = _slab(bounds[b], bounds[b + 1], bounds[b + 2], bounds[b + 3], bounds[b + 4], bounds[b + 5],
+                         ox, oy, oz, ix, iy, iz, t_max)
+            b += 6
+            far = _slab(bounds[b], bounds[b + 1], bounds[b + 2], bounds[b + 3], bounds[b + 4], bounds[b + 5],
+                        ox, oy, oz, ix, iy, iz, t_max)
+            if near is not None and far is not None and far < near:
+                stack.append(left)
+                stack.append(left + 1)
+            else:
+                if far is not None:
+                    stack.append(left + 1)
+                if near is not None:
+                    stack.append(left)
+        return best
+
+    def closest_hit(self, origin, direction, t_max=math.inf):
+        """ (index, t) of the nearest primitive hit by the ray origin + t*direction, 0 <= t <= t_max, or None
+        """
+        return self.__traverse(origin, direction, t_max, False)
+
+    def any_hit(self, origin, direction, t_max=math.inf):
+        # (index, t) of the first hit found, not necessarily the nearest, or None. Cheaper for occlusion tests
+        return self.__traverse(origin, direction, t_max, True)
+
+    def closest_hit_batch(self, origins, directions, t_max=math.inf):
+        # closest_hit for each ray, origins and directions as Vec3 sequences, Vec3Arrays or flat xyz buffers
+        return [self.__traverse(o, d, t_max, False) for o, d in _rays(origins, directions)]
+
+    def any_hit_batch(self, origins, directions, t_max=math.inf):
+        return [self.__traverse(o, d, t_max, True) for o, d in _rays(origins, directions)]
+
+    def overlap(self, box):
+        """ Indices of the primitives whose bounds overlap an AABB, in index order
+        """
+        assert isinstance(box, AABB), 'Requires an AABB'
+        query = (box.min.x, box.min.y, box.min.z, box.max.x, box.max.y, box.max.z)
+        return self.__collect(lambda b: _overlaps(b, query))
+
+    def frustum(self, planes):
+        """ Indices of the primitives whose bounds are not fully outside any of the planes, in index order
+
+            planes are (a, b, c, d) tuples or Vec4 facing inwards, e.g. from frustum_planes(projection*view).
+            The test is conservative, a box near a frustum corner can be reported without being inside
+        """
+        planes = [(p.x, p.y, p.z, p.w) if isinstance(p, pyclid.vector.Vec4) else tuple(p) for p in planes]
+        return self.__collect(lambda b: _inside_planes(b, planes))
+
+    def frustum_batch(self, frustums):
+        return [self.frustum(planes) for planes in frustums]
+
+    def __collect(self, test):
+        # Indices of the primitives whose bounds pass test, pruning nodes whose bounds fail it
+        bounds = self.__bounds
+        prims = self.__primitive_bounds
+        found = []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            if not test(bounds[6*node:6*node + 6]):
+                continue
+            if self.__count[node]:
+                first = self.__start[node]
+                found.extend(i for i in self.__order[first:first + self.__count[node]] if test(prims[6*i:6*i + 6]))
+            else:
+                stack.append(self.__start[node])
+                stack.append(self.__start[node] + 1)
+        found.sort()
+        return found
+
+
+def _slab(x0, y0, z0, x1, y1, z1, ox, oy, oz, ix, iy, iz, t_max):
+    # Entry distance of a ray into a box given the inverse direction, or None
+    tx0, tx1 = (x0 - ox)*ix, (x1 - ox)*ix
+    if tx0 > tx1:
+        tx0, tx1 = tx1, tx0
+    ty0, ty1 = (y0 - oy)*iy, (y1 - oy)*iy
+    if ty0 > ty1:
+        ty0, ty1 = ty1, ty0
+    tz0, tz1 = (z0 - oz)*iz, (z1 - oz)*iz
+    if tz0 > tz1:
+        tz0, tz1 = tz1, tz0
+    t0 = max(tx0, ty0, tz0, 0.0)
+    t1 = min(tx1, ty1, tz1, t_max)
+    return t0 if t0 <= t1 else None
+
+
+def _overlaps(b, q):
+    return b[0] <= q[3] and q[0] <= b[3] and b[1] <= q[4] and q[1] <= b[4] and b[2] <= q[5] and q[2] <= b[5]
+
+
+def _inside_planes(b, planes):
+    # False when the box is entirely behind one of the planes, testing the corner furthest along each normal
+    for a, c, e, d in planes:
+        if (a*(b[3] if a > 0 else b[0]) + c*(b[4] if c > 0 else b[1]) + e*(b[5] if e > 0 else b[2]) + d) < 0:
+            return False
+    return True
+
+
+def _rays(origins, directions):
+    # Pairs of Vec3 (origin, direction) from any of the accepted point inputs
+    dim, origin_columns = pyclid.spatial._columns(origins, 3)
+    dim, direction_columns = pyclid.spatial._columns(directions, 3)
+    assert len(origin_columns[0]) == len(direction_columns[0]), 'Requires one direction per origin'
+    return zip(map(pyclid.vector.Vec3, *origin_columns), map(pyclid.vector.Vec3, *direction_columns))
@@ -0,0 +1,157 @@
+""" Opt in instrumentation of pyclid calls
+
+    import pyclid.instrument
+    pyclid.instrument.enable()
+    ...
+    print(pyclid.instrument.report(10))
+    pyclid.instrument.disable()
+
+While enabled, every public method and operator of the vector, matrix and quaternion classes
+(and their arrays) is replaced on the class by a wrapper counting calls, objects allocated and
+cumulative time. disable() puts the original methods back, so there is no cost when off.
+
+Allocations count the pyclid objects constructed during a call, including those made by
+nested calls, and times are inclusive of nested calls.
+"""
+import time
+
+import pyclid
+
+
+def _default_classes():
+    return [pyclid.Vec2, pyclid.Vec3, pyclid.Vec4, pyclid.Mat2, pyclid.Mat3, pyclid.Mat4, pyclid.Mat2x3,
+            pyclid.Mat3x4, pyclid.Quat, pyclid.Vec2Array, pyclid.Vec3Array, pyclid.Vec4Array, pyclid.QuatArray]
+
+
+# name -> [calls, allocations, seconds]
+_stats = {}
+# Running count of pyclid objects constructed while enabled
+_allocations = [0]
+# (cls, name, original class __dict__ entry or None when inherited)
+_patched = []
+
+
+def _is_constructor(name):
+    # __init__, and the classmethods building an object around existing storage without __init__
+    return name == '__init__' or name.endswith('_wrap')
+
+
+def _is_instrumented(name, raw):
+    if isinstance(raw, (staticmethod, classmethod)):
+        raw = raw.__func__
+    if not callable(raw) or not (getattr(raw, '__module__', None) or '').startswith('pyclid'):
+        return False
+    if name.startswith('__') and name.endswith('__'):
+        return True
+    return not name.startswith('_') or _is_constructor(name)
+
+
+def _wrap(key, func, constructor):
+    stats = _stats.setdefault(key, [0, 0, 0.0])
+    allocations = _allocations
+    clock = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        if constructor:
+            allocations[0] += 1
+        start_allocations = allocations[0]
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[2] += clock() - start
+            stats[1] += allocations[0] - start_allocations + constructor
+            stats[0] += 1
+
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def _raw_attribute(cls, name):
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+    return None
+
+
+def enabled():
+    return bool(_patched)
+
+
+def enable(classes=None):
+    """ Instruments every public method of classes (all vector, matrix and quaternion classes by default)
+    """
+    if _patched:
+        return
+    for cls in classes or _default_classes():
+        for name in dir(cls):
+            raw = _raw_attribute(cls, name)
+            if raw is None or not _is_instrumented(name, raw):
+                continue
+            key = cls.__name__ + '.' + name
+            constructor = _is_constructor(name)
+            if isinstance(raw, staticmethod):
+                wrapped = staticmethod(_wrap(key, raw.__func__, constructor))
+            elif isinstance(raw, classmethod):
+                wrapped = classmethod(_wrap(key, raw.__func__, constructor))
+            else:
+                wrapped = _wrap(key, raw, constructor)
+            _patched.append((cls, name, cls.__dict__.get(name)))
+            setattr(cls, name, wrapped)
+
+
+def disable():
+    # Restores the original methods, statistics are kept until reset()
+    while _patched:
+        cls, name, original = _patched.pop()
+        if original is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+
+
+def reset():
+    for stats in _stats.values():
+        stats[0] = 0
+        stats[1] = 0
+        stats[2] = 0.0
+
+
+def snapshot():
+    """ Returns {name: {'calls': int, 'allocations': int, 'seconds': float}} for every method called
+    """
+    return dict((name, {'calls': calls, 'allocations': allocations, 'seconds': seconds})
+                for name, (calls, allocations, seconds) in _stats.items() if calls)
+
+
+def top(n=10, key='seconds'):
+    # The n (name, stats) pairs with the largest key ('seconds', 'calls' or 'allocations')
+    ordered = sorted(snapshot().items(), key=lambda item: item[1][key], reverse=True)
+    return ordered[:n]
+
+
+def report(n=10, key='seconds'):
+    lines = ['{:<32} {:>10} {:>12} {:>12}'.format('method', 'calls', 'allocations', 'seconds')]
+    for name, stats in top(n, key):
+        lines.append('{:<32} {:>10} {:>12} {:>12.6f}'.format(name, stats['calls'], stats['allocations'],
+                                                           stats['seconds']))
+    return '\n'.join(lines)
+
+
+class instrumented:
+    """ Context manager enabling instrumentation for a block
+
+        with pyclid.instrument.instrumented():
+            ...
+    """
+    def __init__(self, classes=None):
+        self.classes = classes
+
+    def __enter__(self):
+        enable(self.classes)
+        return self
+
+    def __exit__(self, *exc_info):
+        disable()
+        return False
@@ -0,0 +1,125 @@
+""" Generated kernels for the general size MatN and VecN
+
+Each kernel is specialised to one shape, generated as Python source on first use and cached, so a 6x6 product
+is straight line code like the hand unrolled Mat4 product, with no loops or index arithmetic
+
+    def matmul_2x2x2(a, b):
+        a0, a1, a2, a3 = a
+        b0, b1, b2, b3 = b
+        return [a0*b0 + a1*b2, a0*b1 + a1*b3, a2*b0 + a3*b2, a2*b1 + a3*b3]
+
+Shapes past UNROLL_LIMIT multiply-adds (or elements for add/sub) use loop kernels instead, with the shape fixed
+as constants. The loop product gathers the columns of b once, then computes each output row as dot products of
+contiguous lists. Every kernel takes and returns flat row major lists and never writes to its inputs.
+"""
+import operator
+
+# Largest kernel, in multiply-adds for products and elements for add/sub, that is fully unrolled
+UNROLL_LIMIT = 4096
+
+# (kind, shape) -> function
+_kernels = {}
+# (kind, shape) -> generated source
+_sources = {}
+
+
+def _names(prefix, count):
+    return ', '.join(prefix + str(i) for i in range(count))
+
+
+def _unpack(prefix, name, count):
+    # 'a0, a1, = a' is valid for a single element too
+    return '    ' + _names(prefix, count) + (', ' if count == 1 else '') + ' = ' + name + '\n'
+
+
+def _compile(kind, shape, source):
+    name = kind + '_' + 'x'.join(str(i) for i in shape)
+    source = source.replace('def kernel(', 'def ' + name + '(', 1)
+    namespace = {'mul': operator.mul, 'add': operator.add, 'sub': operator.sub,
+                 'itemgetter': operator.itemgetter}
+    exec(compile(source, '<pyclid.kernels.' + name + '>', 'exec'), namespace)
+    _sources[(kind, shape)] = source
+    _kernels[(kind, shape)] = namespace[name]
+    return namespace[name]
+
+
+def _matmul_source(rows, inner, cols):
+    if rows*inner*cols <= UNROLL_LIMIT:
+        terms = [' + '.join('a%d*b%d' % (i*inner + k, k*cols + j) for k in range(inner))
+                 for i in range(rows) for j in range(cols)]
+        return ('def kernel(a, b):\n' + _unpack('a', 'a', rows*inner) + _unpack('b', 'b', inner*cols) +
+                '    return [' + ', '.join(terms) + ']\n')
+    return ('def kernel(a, b):\n'
+            '    columns = [b[j::%d] for j in range(%d)]\n'
+            '    out = []\n'
+            '    for i in range(0, %d, %d):\n'
+            '        row = a[i:i + %d]\n'
+            '        out += [sum(map(mul, row, column)) for column in columns]\n'
+            '    return out\n') % (cols, cols, rows*inner, inner, inner)
+
+
+def _matvec_source(rows, cols):
+    if rows*cols <= UNROLL_LIMIT:
+        terms = [' + '.join('m%d*v%d' % (i*cols + j, j) for j in range(cols)) for i in range(rows)]
+        return ('def kernel(m, v):\n' + _unpack('m', 'm', rows*cols) + _unpack('v', 'v', cols) +
+                '    return [' + ', '.join(terms) + ']\n')
+    return ('def kernel(m, v):\n'
+            '    return [sum(map(mul, m[i:i + %d], v)) for i in range(0, %d, %d)]\n') % (cols, rows*cols, cols)
+
+
+def _elementwise_source(op, size):
+    if size <= UNROLL_LIMIT:
+        terms = ['a%d %s b%d' % (i, op, i) for i in range(size)]
+        return ('def kernel(a, b):\n' + _unpack('a', 'a', size) + _unpack('b', 'b', size) +
+                '    return [' + ', '.join(terms) + ']\n')
+    return 'def kernel(a, b):\n    return list(map(%s, a, b))\n' % ('add' if op == '+' else 'sub')
+
+
+def _transpose_source(rows, cols):
+    # A single C level gather of the transposed positions
+    order = [i*cols + j for j in range(cols) for i in range(rows)]
+    if len(order) == 1:
+        return 'def kernel(a):\n    return list(a)\n'
+    return ('_get = itemgetter(' + ', '.join(str(i) for i in order) + ')\n\n'
+            'def kernel(a):\n    return list(_get(a))\n')
+
+
+def _kernel(kind, shape, generate):
+    key = (kind, shape)
+    if key not in _kernels:
+        return _compile(kind, shape, generate(*shape))
+    return _kernels[key]
+
+
+def matmul(rows, inner, cols):
+    # (rows x inner) * (inner x cols) product
+    return _kernel('matmul', (rows, inner, cols), _matmul_source)
+
+
+def matvec(rows, cols):
+    # (rows x cols) * vector of cols
+    return _kernel('matvec', (rows, cols), _matvec_source)
+
+
+def add(size):
+    return _kernel('add', (size,), lambda size: _elementwise_source('+', size))
+
+
+def sub(size):
+    return _kernel('sub', (size,), lambda size: _elementwise_source('-', size))
+
+
+def transpose(rows, cols):
+    return _kernel('transpose', (rows, cols), _transpose_source)
+
+
+def source(kind, *shape):
+    """ The generated source of a kernel, e.g. source('matmul', 6, 6, 6)
+    """
+    globals()[kind](*shape)
+    return _sources[(kind, shape)]
+
+
+def clear():
+    _kernels.clear()
+    _sources.clear()
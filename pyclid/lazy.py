@@ -0,0 +1,188 @@
+""" Lazy matrix products
+
+    import pyclid.lazy
+    result = (pyclid.lazy.lazy(projection) * view * model * vec).evaluate()
+
+Chaining * on matrices evaluates left to right, so P*V*M*v runs three 4x4 products (64 multiplies each)
+before the vector. A lazy product records its operands instead, and evaluates them in the association order with
+the fewest multiplies when the result is used, e.g. P*(V*(M*v)) with three matrix vector products (16 each).
+
+Results are cached by the structure of the product, and reused while every operand still holds the values it
+had, so an expression rebuilt each frame from unchanged matrices costs a comparison of their values.
+The cache keeps the CACHE_SIZE most recently used products.
+"""
+import operator
+from collections import OrderedDict
+
+import pyclid.matrix
+import pyclid.vector
+
+# Products cached, evicting the least recently used
+CACHE_SIZE = 256
+_cache = OrderedDict()
+# Chain shapes -> (multiplies, association)
+_plans = {}
+
+
+def set_cache_size(size):
+    # A size of 0 disables the cache
+    global CACHE_SIZE
+    CACHE_SIZE = size
+    while len(_cache) > size:
+        _cache.popitem(last=False)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _matrix_values(mat):
+    return mat.matrix
+
+
+# type -> (shape, values, copy), vectors are columns. values returns a tuple for Mat2, Mat3 and Mat4, so their
+# structure tags are kept, and the live list of a MatN, which is copied when it is kept as a snapshot
+_TYPES = {
+    pyclid.matrix.Mat2: ((2, 2), operator.attrgetter('values'), lambda m: pyclid.matrix.Mat2(list(m.values))),
+    pyclid.matrix.Mat3: ((3, 3), operator.attrgetter('values'), lambda m: pyclid.matrix.Mat3(list(m.values))),
+    pyclid.matrix.Mat4: ((4, 4), operator.attrgetter('values'), lambda m: pyclid.matrix.Mat4(list(m.values))),
+    pyclid.matrix.MatN: (None, _matrix_values, lambda m: pyclid.matrix.MatN(m.rows, m.cols, list(m.matrix))),
+    pyclid.vector.Vec2: ((2, 1), operator.attrgetter('x', 'y'), lambda v: pyclid.vector.Vec2(v.x, v.y)),
+    pyclid.vector.Vec3: ((3, 1), operator.attrgetter('x', 'y', 'z'), lambda v: pyclid.vector.Vec3(v.x, v.y, v.z)),
+    pyclid.vector.Vec4: ((4, 1), operator.attrgetter('x', 'y', 'z', 'w'),
+                         lambda v: pyclid.vector.Vec4(v.x, v.y, v.z, v.w)),
+    pyclid.vector.VecN: (None, operator.attrgetter('values'), lambda v: pyclid.vector.VecN(*v.values)),
+}
+
+
+def _shape(operand):
+    entry = _TYPES.get(type(operand))
+    assert entry is not None, 'Requires a Mat2, Mat3, Mat4, MatN, Vec2, Vec3, Vec4 or VecN'
+    if entry[0] is not None:
+        return entry[0]
+    if isinstance(operand, pyclid.matrix.MatN):
+        return operand.rows, operand.cols
+    return len(operand), 1
+
+
+def _copy(operand):
+    return _TYPES[type(operand)][2](operand)
+
+
+def _snapshot(operands):
+    # The current values of each operand, lists still shared with the operands
+    return [_TYPES[type(operand)][1](operand) for operand in operands]
+
+
+def _order(shapes):
+    """ Cheapest association of a chain of products by dynamic programming over its sub chains,
+        returns (multiplies, plan) where a plan is an operand index or a (left, right) pair of plans
+    """
+    plan = _plans.get(shapes)
+    if plan is None:
+        plan = _plans[shapes] = _solve(shapes)
+    return plan
+
+
+def _solve(shapes):
+    n = len(shapes)
+    best = {(i, i): (0, i) for i in range(n)}
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            candidates = []
+            for k in range(i, j):
+                cost = best[(i, k)][0] + best[(k + 1, j)][0] + shapes[i][0]*shapes[k][1]*shapes[j][1]
+                candidates.append((cost, k))
+            cost, k = min(candidates)
+            best[(i, j)] = (cost, (best[(i, k)][1], best[(k + 1, j)][1]))
+    return best[(0, n - 1)]
+
+
+def _run(plan, operands):
+    if isinstance(plan, int):
+        return operands[plan]
+    return _run(plan[0], operands)*_run(plan[1], operands)
+
+
+class Product:
+    """ A product of matrices, optionally ending with a vector, evaluated on use
+
+        Multiplying it by a matrix or vector (or another Product) on the right extends the chain.
+        evaluate() returns a new Mat or Vec, attributes of the result (matrix, x, ...) can be read from the
+        Product directly, and str() shows the result
+    """
+    __slots__ = ('__operands', '__shapes')
+
+    def __init__(self, *operands):
+        self.__operands = []
+        self.__shapes = ()
+        for operand in operands:
+            self.__append(operand)
+
+    def __append(self, operand):
+        if isinstance(operand, Product):
+            for other in operand.__operands:
+                self.__append(other)
+            return
+        shape = _shape(operand)
+        assert not self.__shapes or self.__shapes[-1][1] == shape[0], 'Requires operands of matching inner dimensions'
+        self.__operands.append(operand)
+        self.__shapes += (shape,)
+
+    def __mul__(self, other):
+        product = Product.__new__(Product)
+        product.__operands = list(self.__operands)
+        product.__shapes = self.__shapes
+        product.__append(other)
+        return product
+
+    def __len__(self):
+        return len(self.__operands)
+
+    @property
+    def operands(self):
+        return tuple(self.__operands)
+
+    def plan(self):
+        """ (multiplies, association) of the evaluation order, the association as nested pairs of operand indices,
+            e.g. (48, (0, (1, (2, 3)))) for P*(V*(M*v))
+        """
+        return _order(self.__shapes)
+
+    def evaluate(self):
+        operands = self.__operands
+        assert operands, 'Requires at least one operand'
+        if len(operands) == 1:
+            return _copy(operands[0])
+        if not CACHE_SIZE:
+            return _run(self.plan()[1], operands)
+        # ids are reused once an operand is collected, the types keep a new operand of another type
+        # with equal values from matching
+        key = tuple(map(id, operands)) + tuple(map(type, operands)) + self.__shapes
+        snapshot = _snapshot(operands)
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == snapshot:
+            _cache.move_to_end(key)
+            return _copy(cached[1])
+        result = _run(self.plan()[1], operands)
+        _cache[key] = ([list(values) if isinstance(values, list) else values for values in snapshot], _copy(result))
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+        return result
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.evaluate(), name)
+
+    def __str__(self):
+        return str(self.evaluate())
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def lazy(operand):
+    # Starts a lazy product, lazy(projection)*view*model*vec
+    return Product(operand)
@@ -1,6 +1,392 @@
 import math
+import operator
+from array import array
+from collections import OrderedDict
+from itertools import chain, repeat
 
+import pyclid.backend
+import pyclid.kernels
 import pyclid.vector
+import pyclid.storage
+
+
+def _float_view(buffer):
+    # Returns a flat memoryview of floats over a buffer (array, bytes, bytearray, memoryview..)
+    # float32 and float64 buffers keep their type, anything else is read as float64
+    view = memoryview(buffer)
+    if view.format in ('d', 'f') and view.ndim == 1:
+        return view
+    if view.format in ('d', 'f'):
+        return view.cast('B').cast(view.format)
+    return view.cast('B').cast('d')
+
+
+def _transform_row(coeffs, cols, offset):
+    # One output component for every tuple, coeffs[0]*cols[0] + coeffs[1]*cols[1] + .. + offset
+    row = map(operator.mul, cols[0], repeat(coeffs[0]))
+    for coeff, col in zip(coeffs[1:], cols[1:]):
+        row = map(operator.add, row, map(operator.mul, col, repeat(coeff)))
+    if offset:
+        row = map(operator.add, row, repeat(offset))
+    return row
+
+
+def _transform_buffer(mat, size, buffer, out, components, w, divide):
+    """ Applies a size x size row-major matrix to a flat buffer of tuples
+
+        When components == size - 1 the tuples are treated as homogeneous with an implicit w,
+        which is 1 for points and 0 for directions. divide applies the perspective divide
+        by the transformed w.
+    """
+    assert components in (size - 1, size), 'Requires components of ' + str(size - 1) + ' or ' + str(size)
+    assert not divide or components == size - 1, 'Perspective divide requires homogeneous tuples'
+    src = _float_view(buffer)
+    dst = src if out is None else _float_view(out)
+    assert not dst.readonly, 'Requires a writable buffer, or an out buffer'
+    assert len(src) % components == 0, 'Requires a buffer length that is a multiple of components'
+    assert len(dst) == len(src), 'Requires an out buffer the same length as the input'
+
+    if pyclid.backend.use_numpy(len(src)//components):
+        pyclid.backend.transform_buffer(mat, size, src, dst, components, w, divide)
+        return buffer if out is None else out
+
+    values = src.tolist()
+    cols = [values[c::components] for c in range(components)]
+    rows = []
+    for r in range(components):
+        coeffs = mat[r*size:r*size + components]
+        offset = mat[r*size + size - 1]*w if components < size else 0
+        rows.append(_transform_row(coeffs, cols, offset))
+
+    if divide:
+        ws = list(_transform_row(mat[(size - 1)*size:size*size - 1], cols, mat[size*size - 1]))
+        rows = [map(operator.truediv, row, ws) for row in rows]
+
+    for r, row in enumerate(rows):
+        dst[r::components] = array(dst.format, row)
+    return buffer if out is None else out
+
+
+# Memoized (cos, sin) for rotation angles, shared by every axis and matrix size
+# and bounded to ROTATION_CACHE_SIZE angles, evicting the least recently used
+ROTATION_CACHE_SIZE = 256
+_rotation_cache = OrderedDict()
+
+
+def set_rotation_cache_size(size):
+    # A size of 0 disables the cache
+    global ROTATION_CACHE_SIZE
+    ROTATION_CACHE_SIZE = size
+    while len(_rotation_cache) > size:
+        _rotation_cache.popitem(last=False)
+
+
+def clear_rotation_cache():
+    _rotation_cache.clear()
+
+
+def _rotation_cos_sin(angle):
+    cached = _rotation_cache.get(angle)
+    if cached is not None:
+        _rotation_cache.move_to_end(angle)
+        return cached
+    cached = (math.cos(angle), math.sin(angle))
+    if ROTATION_CACHE_SIZE:
+        _rotation_cache[angle] = cached
+        if len(_rotation_cache) > ROTATION_CACHE_SIZE:
+            _rotation_cache.popitem(last=False)
+    return cached
+
+
+def _rotate_columns(mat, size, p, q, cos_angle, r_pq, r_qp):
+    """ mat *= R in place, for a rotation R in the plane of axes p and q
+
+        R[p][p] = R[q][q] = cos, R[p][q] = r_pq, R[q][p] = r_qp and R is the identity elsewhere,
+        so only columns p and q of mat change. mat may leave out the bottom row, as a Mat2x3 or Mat3x4
+    """
+    for row in range(0, len(mat), size):
+        a = mat[row + p]
+        b = mat[row + q]
+        mat[row + p] = a*cos_angle + b*r_qp
+        mat[row + q] = a*r_pq + b*cos_angle
+
+
+def _mat2_mul_into(dst, a, b):
+    # dst = a*b for flat row-major lists, dst may be a or b
+    a0, a1, a2, a3 = a
+    b0, b1, b2, b3 = b
+    dst[0] = a0*b0 + a1*b2
+    dst[1] = a0*b1 + a1*b3
+
+    dst[2] = a2*b0 + a3*b2
+    dst[3] = a2*b1 + a3*b3
+    return dst
+
+
+def _mat3_mul_into(dst, a, b):
+    # dst = a*b for flat row-major lists, dst may be a or b
+    a0, a1, a2, a3, a4, a5, a6, a7, a8 = a
+    b0, b1, b2, b3, b4, b5, b6, b7, b8 = b
+    dst[0] = a0*b0 + a1*b3 + a2*b6
+    dst[1] = a0*b1 + a1*b4 + a2*b7
+    dst[2] = a0*b2 + a1*b5 + a2*b8
+
+    dst[3] = a3*b0 + a4*b3 + a5*b6
+    dst[4] = a3*b1 + a4*b4 + a5*b7
+    dst[5] = a3*b2 + a4*b5 + a5*b8
+
+    dst[6] = a6*b0 + a7*b3 + a8*b6
+    dst[7] = a6*b1 + a7*b4 + a8*b7
+    dst[8] = a6*b2 + a7*b5 + a8*b8
+    return dst
+
+
+def _mat4_mul_into(dst, a, b):
+    # dst = a*b for flat row-major lists, dst may be a or b
+    a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12, a13, a14, a15 = a
+    b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10, b11, b12, b13, b14, b15 = b
+    dst[0] = a0*b0 + a1*b4 + a2*b8 + a3*b12
+    dst[1] = a0*b1 + a1*b5 + a2*b9 + a3*b13
+    dst[2] = a0*b2 + a1*b6 + a2*b10 + a3*b14
+    dst[3] = a0*b3 + a1*b7 + a2*b11 + a3*b15
+
+    dst[4] = a4*b0 + a5*b4 + a6*b8 + a7*b12
+    dst[5] = a4*b1 + a5*b5 + a6*b9 + a7*b13
+    dst[6] = a4*b2 + a5*b6 + a6*b10 + a7*b14
+    dst[7] = a4*b3 + a5*b7 + a6*b11 + a7*b15
+
+    dst[8] = a8*b0 + a9*b4 + a10*b8 + a11*b12
+    dst[9] = a8*b1 + a9*b5 + a10*b9 + a11*b13
+    dst[10] = a8*b2 + a9*b6 + a10*b10 + a11*b14
+    dst[11] = a8*b3 + a9*b7 + a10*b11 + a11*b15
+
+    dst[12] = a12*b0 + a13*b4 + a14*b8 + a15*b12
+    dst[13] = a12*b1 + a13*b5 + a14*b9 + a15*b13
+    dst[14] = a12*b2 + a13*b6 + a14*b10 + a15*b14
+    dst[15] = a12*b3 + a13*b7 + a14*b11 + a15*b15
+    return dst
+
+
+def _mat3_affine_mul_into(dst, a, b):
+    # dst = a*b for 2D affine matrices (bottom rows 0, 0, 1), skipping the bottom row, dst may be a or b
+    a0, a1, a2, a3, a4, a5 = a[:6]
+    b0, b1, b2, b3, b4, b5 = b[:6]
+    dst[:] = (a0*b0 + a1*b3, a0*b1 + a1*b4, a0*b2 + a1*b5 + a2,
+              a3*b0 + a4*b3, a3*b1 + a4*b4, a3*b2 + a4*b5 + a5,
+              0, 0, 1)
+    return dst
+
+
+def _mat4_affine_mul_into(dst, a, b):
+    # dst = a*b for affine matrices (bottom rows 0, 0, 0, 1), skipping the bottom row, dst may be a or b
+    a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11 = a[:12]
+    b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10, b11 = b[:12]
+    dst[:] = (a0*b0 + a1*b4 + a2*b8, a0*b1 + a1*b5 + a2*b9, a0*b2 + a1*b6 + a2*b10, a0*b3 + a1*b7 + a2*b11 + a3,
+              a4*b0 + a5*b4 + a6*b8, a4*b1 + a5*b5 + a6*b9, a4*b2 + a5*b6 + a6*b10, a4*b3 + a5*b7 + a6*b11 + a7,
+              a8*b0 + a9*b4 + a10*b8, a8*b1 + a9*b5 + a10*b9, a8*b2 + a9*b6 + a10*b10, a8*b3 + a9*b7 + a10*b11 + a11,
+              0, 0, 0, 1)
+    return dst
+
+
+def _mat2x3_mul_into(dst, a, b):
+    # dst = a*b for the top two rows of 2D affine matrices, dst may be a or b
+    a0, a1, a2, a3, a4, a5 = a
+    b0, b1, b2, b3, b4, b5 = b
+    dst[:] = (a0*b0 + a1*b3, a0*b1 + a1*b4, a0*b2 + a1*b5 + a2,
+              a3*b0 + a4*b3, a3*b1 + a4*b4, a3*b2 + a4*b5 + a5)
+    return dst
+
+
+def _mat3x4_mul_into(dst, a, b):
+    # dst = a*b for the top three rows of affine matrices, dst may be a or b
+    a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11 = a
+    b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10, b11 = b
+    dst[:] = (a0*b0 + a1*b4 + a2*b8, a0*b1 + a1*b5 + a2*b9, a0*b2 + a1*b6 + a2*b10, a0*b3 + a1*b7 + a2*b11 + a3,
+              a4*b0 + a5*b4 + a6*b8, a4*b1 + a5*b5 + a6*b9, a4*b2 + a5*b6 + a6*b10, a4*b3 + a5*b7 + a6*b11 + a7,
+              a8*b0 + a9*b4 + a10*b8, a8*b1 + a9*b5 + a10*b9, a8*b2 + a9*b6 + a10*b10, a8*b3 + a9*b7 + a10*b11 + a11)
+    return dst
+
+
+# Structure tags of Mat2, Mat3 and Mat4, letting products, inverses and determinants use a cheaper kernel.
+# For Mat3 (2D) and Mat4 (3D) transforms:
+#   identity        the identity
+#   translation     identity upper block, any translation
+#   diagonal        a scale, diagonal upper block and no translation
+#   rigid           a rotation (orthonormal upper block), any translation
+#   affine          bottom row of 0, .., 0, 1
+#   general         anything else
+# Mat2 uses identity, diagonal, rigid (a rotation) and general.
+IDENTITY = 'identity'
+TRANSLATION = 'translation'
+DIAGONAL = 'diagonal'
+RIGID = 'rigid'
+AFFINE = 'affine'
+GENERAL = 'general'
+STRUCTURES = (IDENTITY, TRANSLATION, DIAGONAL, RIGID, AFFINE, GENERAL)
+
+# Largest difference of a quaternion's squared length from 1 for from_trs to tag its result rigid
+UNIT_TOLERANCE = 1e-9
+
+# Tags with a bottom row of 0, .., 0, 1
+_AFFINE_STRUCTURES = frozenset((IDENTITY, TRANSLATION, DIAGONAL, RIGID, AFFINE))
+_RIGID_STRUCTURES = frozenset((IDENTITY, TRANSLATION, RIGID))
+
+# size -> (bottom row, off diagonal, translation and diagonal positions of the upper block)
+_LAYOUTS = {3: ([0, 0, 1], (1, 3), (2, 5), (0, 4)),
+            4: ([0, 0, 0, 1], (1, 2, 4, 6, 8, 9), (3, 7, 11), (0, 5, 10))}
+
+
+def _product_structure(a, b):
+    # Tag of the product of two Mat3 or Mat4 tagged a and b
+    if a == IDENTITY:
+        return b
+    if b == IDENTITY or a == b:
+        return a
+    if a in _RIGID_STRUCTURES and b in _RIGID_STRUCTURES:
+        return RIGID
+    if a == GENERAL or b == GENERAL:
+        return GENERAL
+    return AFFINE
+
+
+def _mat2_product_structure(a, b):
+    structure = _product_structure(a, b)
+    return GENERAL if structure == AFFINE else structure
+
+
+def _classify(values, size):
+    """ Tag of Mat3 (size 3) or Mat4 values, read from the values so rigid is never inferred,
+        as that would need a tolerance
+    """
+    bottom, off_diagonal, translation, diagonal = _LAYOUTS[size]
+    if values[size*(size - 1):] != bottom:
+        return GENERAL
+    get = values.__getitem__
+    if any(map(get, off_diagonal)):
+        return AFFINE
+    translated = any(map(get, translation))
+    if all(get(i) == 1 for i in diagonal):
+        return TRANSLATION if translated else IDENTITY
+    return AFFINE if translated else DIAGONAL
+
+
+def _classify2(values):
+    m0, m1, m2, m3 = values
+    if m1 or m2:
+        return GENERAL
+    return IDENTITY if m0 == 1 and m3 == 1 else DIAGONAL
+
+
+class _MatrixView:
+    """ The values of a Mat2, Mat3 or Mat4 as a fixed length, list like view returned by their matrix property
+
+        Writes go through to the matrix and drop its structure tag to general, however long the view is kept.
+        The view is not a list: + and copy() give a list, and list(view) gives one for json or type checks
+    """
+    __slots__ = ('__values', '__changed')
+
+    def __init__(self, values, changed):
+        self.__values = values
+        self.__changed = changed
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __getitem__(self, index):
+        return self.__values[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            assert len(value) == len(range(*index.indices(len(self.__values)))), \
+                'Requires a slice assignment that keeps the size of the matrix'
+        self.__values[index] = value
+        self.__changed()
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __contains__(self, value):
+        return value in self.__values
+
+    def __eq__(self, other):
+        if isinstance(other, _MatrixView):
+            other = other.__values
+        return self.__values == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return self.__values + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.__values
+
+    def copy(self):
+        return list(self.__values)
+
+    def index(self, value):
+        return self.__values.index(value)
+
+    def count(self, value):
+        return self.__values.count(value)
+
+    def __str__(self):
+        return str(self.__values)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _trs_values(tx, ty, tz, w, x, y, z, sx, sy, sz):
+    """ Row major T*R*S for a unit quaternion (w, x, y, z), the rotation as Quat.to_mat3
+        with column j scaled by the scale on axis j
+    """
+    x2, y2, z2 = x + x, y + y, z + z
+    xx, yy, zz = x*x2, y*y2, z*z2
+    xy, xz, yz = x*y2, x*z2, y*z2
+    wx, wy, wz = w*x2, w*y2, w*z2
+    return [(1.0 - (yy + zz))*sx, (xy - wz)*sy, (xz + wy)*sz, tx,
+            (xy + wz)*sx, (1.0 - (xx + zz))*sy, (yz - wx)*sz, ty,
+            (xz - wy)*sx, (yz + wx)*sy, (1.0 - (xx + yy))*sz, tz,
+            0.0, 0.0, 0.0, 1.0]
+
+
+def _decompose_values(m):
+    """ (tx, ty, tz, w, x, y, z, sx, sy, sz) of an affine matrix without shear
+
+        The scales are the column lengths, with sx negated for a reflection. The quaternion comes from the
+        largest of w, x, y, z to keep it accurate (Shepperd), and has w >= 0
+    """
+    m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = m[:12]
+    sx = math.sqrt(m0*m0 + m4*m4 + m8*m8)
+    sy = math.sqrt(m1*m1 + m5*m5 + m9*m9)
+    sz = math.sqrt(m2*m2 + m6*m6 + m10*m10)
+    assert sx and sy and sz, 'Requires a matrix with non-zero scale'
+    if m0*(m5*m10 - m6*m9) - m1*(m4*m10 - m6*m8) + m2*(m4*m9 - m5*m8) < 0:
+        sx = -sx
+    r0, r3, r6 = m0/sx, m4/sx, m8/sx
+    r1, r4, r7 = m1/sy, m5/sy, m9/sy
+    r2, r5, r8 = m2/sz, m6/sz, m10/sz
+    trace = r0 + r4 + r8
+    if trace > 0:
+        t = math.sqrt(trace + 1.0)*2.0
+        w, x, y, z = 0.25*t, (r7 - r5)/t, (r2 - r6)/t, (r3 - r1)/t
+    elif r0 > r4 and r0 > r8:
+        t = math.sqrt(1.0 + r0 - r4 - r8)*2.0
+        w, x, y, z = (r7 - r5)/t, 0.25*t, (r1 + r3)/t, (r2 + r6)/t
+    elif r4 > r8:
+        t = math.sqrt(1.0 + r4 - r0 - r8)*2.0
+        w, x, y, z = (r2 - r6)/t, (r1 + r3)/t, 0.25*t, (r5 + r7)/t
+    else:
+        t = math.sqrt(1.0 + r8 - r0 - r4)*2.0
+        w, x, y, z = (r3 - r1)/t, (r2 + r6)/t, (r5 + r7)/t, 0.25*t
+    if w < 0:
+        w, x, y, z = -w, -x, -y, -z
+    return m3, m7, m11, w, x, y, z, sx, sy, sz
 
 
 class Mat2:
@@ -10,17 +396,18 @@ class Mat2:
         |2, 3|
 
     """
-    def __init__(self, mat=[]):
-        assert isinstance(mat, list) and len(mat) <= 4, 'Requires input to be a list and len <= 4'
-        self.__matrix = []
-        self.x_size = 2
-        self.y_size = 2
-        self.size = 4
+    __slots__ = ('__matrix', '__structure')
+
+    x_size = 2
+    y_size = 2
+    size = 4
 
+    def __init__(self, mat=[]):
+        assert isinstance(mat, (list, _MatrixView)) and len(mat) <= 4, 'Requires input to be a list and len <= 4'
         # Initialise the matrix to zero
-        for i in range(self.size):
-            self.__matrix.append(0)
+        self.__matrix = [0]*self.size
         self.__input_matrix_values(mat)
+        self.__structure = _classify2(self.__matrix)
 
     def __str__(self):
         max_size = 0
@@ -40,57 +427,125 @@ class Mat2:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (2, 2), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 4 values of a float32/float64 buffer, row major, e.g. a (2, 2) numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 4, 'Requires a buffer of at least 4 values'
+        return cls.__wrap(view[:4].tolist())
+
+    @classmethod
+    def __wrap(cls, values, structure=None):
+        # Builds a matrix around a list of cls.size values without copying it, tagged from the values by default
+        mat = cls.__new__(cls)
+        mat.__matrix = values
+        mat.__structure = _classify2(values) if structure is None else structure
+        return mat
+
     def __mul__(self, other):
         assert isinstance(other, (int, float, Mat2, pyclid.vector.Vec2)), 'Requires a int, float, Mat2 or Vec2'
-        if isinstance(other, Mat2):
-            new_matrix = []
-            sm = self.__matrix
-            om = other.__matrix
-
-            new_matrix.append(sm[0]*om[0] + sm[1]*om[2])
-            new_matrix.append(sm[0]*om[1] + sm[1]*om[3])
-
-            new_matrix.append(sm[2]*om[0] + sm[3]*om[2])
-            new_matrix.append(sm[2]*om[1] + sm[3]*om[3])
-
-            return Mat2(new_matrix)
         if isinstance(other, pyclid.vector.Vec2):
-            x = self.__matrix[0]*other.x + self.__matrix[1]*other.y
-            y = self.__matrix[2]*other.x + self.__matrix[3]*other.y
-            return pyclid.vector.Vec2(x, y)
-        else:
-            self.__matrix = [i*other for i in self.__matrix]
-            return self
+            return Mat2.mul_into(pyclid.vector.Vec2(), self, other)
+        return Mat2.mul_into(Mat2.__wrap([0]*self.size, GENERAL), self, other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
     def __div__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
-        self.__matrix = [i/other for i in self.__matrix]
-        return self
+        return Mat2.__wrap([i/other for i in self.__matrix])
+
+    __truediv__ = __div__
 
     def __add__(self, other):
         assert isinstance(other, Mat2), 'Requires a Mat2'
-        new_matrix = []
-        for i in range(self.size):
-            new_matrix.append(self.__matrix[i] + other.__matrix[i])
-        return Mat2(new_matrix)
+        return Mat2.__wrap(list(map(operator.add, self.__matrix, other.__matrix)))
 
     def __sub__(self, other):
         assert isinstance(other, Mat2), 'Requires a Mat2'
+        return Mat2.__wrap(list(map(operator.sub, self.__matrix, other.__matrix)))
 
-        new_matrix = []
-        for i in range(self.size):
-            new_matrix.append(self.__matrix[i] - other.__matrix[i])
-        return Mat2(new_matrix)
+    def __imul__(self, other):
+        assert isinstance(other, (int, float, Mat2)), 'Requires a int, float, Mat2'
+        return Mat2.mul_into(self, self, other)
+
+    def __idiv__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        self.__matrix[:] = [i/other for i in self.__matrix]
+        self.__structure = _classify2(self.__matrix)
+        return self
+
+    __itruediv__ = __idiv__
+
+    def __iadd__(self, other):
+        return Mat2.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Mat2.sub_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a Mat2 (out is a Mat2), a Vec2 (out is a Vec2) or a number. out may be a or b
+        """
+        if isinstance(b, Mat2):
+            structure = _mat2_product_structure(a.__structure, b.__structure)
+            if a.__structure == IDENTITY:
+                out.__matrix[:] = b.__matrix
+            elif b.__structure == IDENTITY:
+                out.__matrix[:] = a.__matrix
+            elif structure == DIAGONAL:
+                out.__matrix[:] = (a.__matrix[0]*b.__matrix[0], 0, 0, a.__matrix[3]*b.__matrix[3])
+            else:
+                _mat2_mul_into(out.__matrix, a.__matrix, b.__matrix)
+            out.__structure = structure
+        elif isinstance(b, pyclid.vector.Vec2):
+            m0, m1, m2, m3 = a.__matrix
+            x, y = b.x, b.y
+            if a.__structure == IDENTITY:
+                out.x, out.y = x, y
+            elif a.__structure == DIAGONAL:
+                out.x, out.y = m0*x, m3*y
+            else:
+                out.x = m0*x + m1*y
+                out.y = m2*x + m3*y
+        else:
+            assert isinstance(b, (int, float)), 'Requires a int, float, Mat2 or Vec2'
+            out.__matrix[:] = map(operator.mul, a.__matrix, repeat(b))
+            out.__structure = _classify2(out.__matrix)
+        return out
+
+    @staticmethod
+    def add_into(out, a, b):
+        assert isinstance(a, Mat2) and isinstance(b, Mat2), 'Requires a Mat2'
+        out.__matrix[:] = map(operator.add, a.__matrix, b.__matrix)
+        out.__structure = _classify2(out.__matrix)
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Mat2) and isinstance(b, Mat2), 'Requires a Mat2'
+        out.__matrix[:] = map(operator.sub, a.__matrix, b.__matrix)
+        out.__structure = _classify2(out.__matrix)
+        return out
 
     def __eq__(self, other):
         assert isinstance(other, Mat2), 'Requires a Mat2'
 
         is_equal = True
         for i in range(self.size):
-            if self.__matrix[i] != other.matrix[i]:
+            if self.__matrix[i] != other.__matrix[i]:
                 is_equal = False
                 break
 
@@ -101,11 +556,26 @@ class Mat2:
 
     @property
     def matrix(self):
-        return self.__matrix
+        # The values as a list like view, writing through it drops the structure tag to general, see values
+        return _MatrixView(self.__matrix, self.__set_general)
+
+    def __set_general(self):
+        self.__structure = GENERAL
+
+    @property
+    def values(self):
+        # The values as a tuple, keeping the structure tag
+        return tuple(self.__matrix)
+
+    @property
+    def structure(self):
+        # One of identity, diagonal, rigid or general, see pyclid.matrix.STRUCTURES
+        return self.__structure
 
     def load_zero(self):
         for i in range(self.size):
             self.__matrix[i] = 0
+        self.__structure = GENERAL
         return self
 
     def __input_matrix_values(self, values):
@@ -119,6 +589,7 @@ class Mat2:
         self.__matrix[2] = 0
         self.__matrix[3] = 1
 
+        self.__structure = IDENTITY
         return self
 
     def transpose(self):
@@ -129,20 +600,49 @@ class Mat2:
         self.__matrix[1], self.__matrix[2] = self.__matrix[2], self.__matrix[1]
         return self
 
+    def determinant(self):
+        m0, m1, m2, m3 = self.__matrix
+        if self.__structure == IDENTITY:
+            return 1
+        if self.__structure == DIAGONAL:
+            return m0*m3
+        return m0*m3 - m1*m2
+
+    def inverse(self):
+        return Mat2.inverse_into(self, self)
+
+    @staticmethod
+    def inverse_into(out, a):
+        # out may be a
+        m0, m1, m2, m3 = a.__matrix
+        structure = a.__structure
+        out.__structure = structure
+        if structure == IDENTITY:
+            out.__matrix[:] = a.__matrix
+            return out
+        if structure == DIAGONAL:
+            assert m0 and m3, 'Requires a non-singular matrix'
+            out.__matrix[:] = (1.0/m0, 0, 0, 1.0/m3)
+            return out
+        if structure == RIGID:
+            out.__matrix[:] = (m0, m2, m1, m3)
+            return out
+        det = m0*m3 - m1*m2
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        out.__matrix[:] = (m3*inv_det, -m1*inv_det, -m2*inv_det, m0*inv_det)
+        return out
+
     def rotate(self, angle):
-        rotation_matrix = self.__rotation_matrix(angle)
-        self *= rotation_matrix
-        return self
-
-    def __rotation_matrix(self, angle):
-        mat = Mat2([]).load_identity()
-        sin_angle = math.sin(angle)
-        cos_angle = math.cos(angle)
-        mat.set_value(cos_angle, 0)
-        mat.set_value(-sin_angle, 1)
-        mat.set_value(sin_angle, 2)
-        mat.set_value(cos_angle, 3)
-        return mat
+        """ self *= rotation matrix, updating only the two rotated columns
+
+            cos, -sin
+            sin,  cos
+        """
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 2, 0, 1, cos_angle, -sin_angle, sin_angle)
+        self.__structure = _mat2_product_structure(self.__structure, RIGID)
+        return self
 
 
 class Mat3:
@@ -153,18 +653,18 @@ class Mat3:
         |6, 7, 8|
 
     """
+    __slots__ = ('__matrix', '__structure')
 
-    def __init__(self, mat=[]):
-        assert isinstance(mat, list) and len(mat) <= 9, 'Requires input to be a list and len <= 9'
-        self.__matrix = []
-        self.__x_size = 3
-        self.__y_size = 3
-        self.size = 9
+    __x_size = 3
+    __y_size = 3
+    size = 9
 
+    def __init__(self, mat=[]):
+        assert isinstance(mat, (list, _MatrixView)) and len(mat) <= 9, 'Requires input to be a list and len <= 9'
         # Initialise the matrix to zero
-        for i in range(self.size):
-            self.__matrix.append(0)
+        self.__matrix = [0]*self.size
         self.__input_matrix_values(mat)
+        self.__structure = _classify(self.__matrix, 3)
 
     def __str__(self):
         max_size = 0
@@ -184,65 +684,136 @@ class Mat3:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (3, 3), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 9 values of a float32/float64 buffer, row major, e.g. a (3, 3) numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 9, 'Requires a buffer of at least 9 values'
+        return cls.__wrap(view[:9].tolist())
+
+    @classmethod
+    def __wrap(cls, values, structure=None):
+        # Builds a matrix around a list of cls.size values without copying it, tagged from the values by default
+        mat = cls.__new__(cls)
+        mat.__matrix = values
+        mat.__structure = _classify(values, 3) if structure is None else structure
+        return mat
+
     def __mul__(self, other):
         assert isinstance(other, (int, float, Mat3, pyclid.vector.Vec3)), 'Requires a int, float, Vec3, Mat3'
-        if isinstance(other, Mat3):
-            new_matrix = []
-            sm = self.__matrix
-            om = other.__matrix
-
-            new_matrix.append(sm[0]*om[0] + sm[1]*om[3] + sm[2]*om[6])
-            new_matrix.append(sm[0]*om[1] + sm[1]*om[4] + sm[2]*om[7])
-            new_matrix.append(sm[0]*om[2] + sm[1]*om[5] + sm[2]*om[8])
-
-            new_matrix.append(sm[3]*om[0] + sm[4]*om[3] + sm[5]*om[6])
-            new_matrix.append(sm[3]*om[1] + sm[4]*om[4] + sm[5]*om[7])
-            new_matrix.append(sm[3]*om[2] + sm[4]*om[5] + sm[5]*om[8])
-
-            new_matrix.append(sm[6]*om[0] + sm[7]*om[3] + sm[8]*om[6])
-            new_matrix.append(sm[6]*om[1] + sm[7]*om[4] + sm[8]*om[7])
-            new_matrix.append(sm[6]*om[2] + sm[7]*om[5] + sm[8]*om[8])
-
-            return Mat3(new_matrix)
         if isinstance(other, pyclid.vector.Vec3):
-            x = self.__matrix[0]*other.x + self.__matrix[1]*other.y + self.__matrix[2]*other.z
-            y = self.__matrix[3]*other.x + self.__matrix[4]*other.y + self.__matrix[5]*other.z
-            z = self.__matrix[6]*other.x + self.__matrix[7]*other.y + self.__matrix[8]*other.z
-
-            return pyclid.vector.Vec3(x, y, z)
-        else:
-            self.__matrix = [i*other for i in self.__matrix]
-            return self
+            return Mat3.mul_into(pyclid.vector.Vec3(), self, other)
+        return Mat3.mul_into(Mat3.__wrap([0]*self.size, GENERAL), self, other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
     def __div__(self, other):
-        assert isinstance(other, (int, float)), 'Requires a int or float'
-        self.__matrix = [i/other for i in self.__matrix]
-        return self
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return Mat3.__wrap([i/other for i in self.__matrix])
+
+    __truediv__ = __div__
 
     def __add__(self, other):
         assert isinstance(other, Mat3), 'Requires a Mat3'
-        new_matrix = []
-        for i in range(self.size):
-            new_matrix.append(self.__matrix[i] + other.__matrix[i])
-        return Mat3(new_matrix)
+        return Mat3.__wrap(list(map(operator.add, self.__matrix, other.__matrix)))
 
     def __sub__(self, other):
         assert isinstance(other, Mat3), 'Requires a Mat3'
+        return Mat3.__wrap(list(map(operator.sub, self.__matrix, other.__matrix)))
 
-        new_matrix = []
-        for i in range(self.size):
-            new_matrix.append(self.__matrix[i] - other.__matrix[i])
-        return Mat3(new_matrix)
+    def __imul__(self, other):
+        assert isinstance(other, (int, float, Mat3)), 'Requires a int, float, Mat3'
+        return Mat3.mul_into(self, self, other)
+
+    def __idiv__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        self.__matrix[:] = [i/other for i in self.__matrix]
+        self.__structure = _classify(self.__matrix, 3)
+        return self
+
+    __itruediv__ = __idiv__
+
+    def __iadd__(self, other):
+        return Mat3.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Mat3.sub_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a Mat3 (out is a Mat3), a Vec3 (out is a Vec3) or a number. out may be a or b
+        """
+        if isinstance(b, Mat3):
+            sa, sb = a.__structure, b.__structure
+            structure = _product_structure(sa, sb)
+            if sa == IDENTITY:
+                out.__matrix[:] = b.__matrix
+            elif sb == IDENTITY:
+                out.__matrix[:] = a.__matrix
+            elif structure == TRANSLATION:
+                m, n = a.__matrix, b.__matrix
+                out.__matrix[:] = (1, 0, m[2] + n[2], 0, 1, m[5] + n[5], 0, 0, 1)
+            elif structure == DIAGONAL:
+                m, n = a.__matrix, b.__matrix
+                out.__matrix[:] = (m[0]*n[0], 0, 0, 0, m[4]*n[4], 0, 0, 0, 1)
+            elif sa in _AFFINE_STRUCTURES and sb in _AFFINE_STRUCTURES:
+                _mat3_affine_mul_into(out.__matrix, a.__matrix, b.__matrix)
+            else:
+                _mat3_mul_into(out.__matrix, a.__matrix, b.__matrix)
+            out.__structure = structure
+        elif isinstance(b, pyclid.vector.Vec3):
+            m0, m1, m2, m3, m4, m5, m6, m7, m8 = a.__matrix
+            x, y, z = b.x, b.y, b.z
+            structure = a.__structure
+            if structure == IDENTITY:
+                out.x, out.y, out.z = x, y, z
+            elif structure == TRANSLATION:
+                out.x, out.y, out.z = x + m2*z, y + m5*z, z
+            elif structure in _AFFINE_STRUCTURES:
+                out.x, out.y, out.z = m0*x + m1*y + m2*z, m3*x + m4*y + m5*z, z
+            else:
+                out.x = m0*x + m1*y + m2*z
+                out.y = m3*x + m4*y + m5*z
+                out.z = m6*x + m7*y + m8*z
+        else:
+            assert isinstance(b, (int, float)), 'Requires a int, float, Vec3, Mat3'
+            out.__matrix[:] = map(operator.mul, a.__matrix, repeat(b))
+            out.__structure = _classify(out.__matrix, 3)
+        return out
+
+    @staticmethod
+    def add_into(out, a, b):
+        assert isinstance(a, Mat3) and isinstance(b, Mat3), 'Requires a Mat3'
+        out.__matrix[:] = map(operator.add, a.__matrix, b.__matrix)
+        out.__structure = _classify(out.__matrix, 3)
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Mat3) and isinstance(b, Mat3), 'Requires a Mat3'
+        out.__matrix[:] = map(operator.sub, a.__matrix, b.__matrix)
+        out.__structure = _classify(out.__matrix, 3)
+        return out
 
     def __eq__(self, other):
         assert isinstance(other, Mat3), 'Requires a Mat3'
 
         is_equal = True
         for i in range(self.size):
-            if self.__matrix[i] != other.matrix[i]:
+            if self.__matrix[i] != other.__matrix[i]:
                 is_equal = False
                 break
 
@@ -253,18 +824,71 @@ class Mat3:
 
     @property
     def matrix(self):
-        return self.__matrix
+        # The values as a list like view, writing through it drops the structure tag to general, see values
+        return _MatrixView(self.__matrix, self.__set_general)
+
+    def __set_general(self):
+        self.__structure = GENERAL
+
+    @property
+    def values(self):
+        # The values as a tuple, keeping the structure tag
+        return tuple(self.__matrix)
+
+    @property
+    def structure(self):
+        # One of pyclid.matrix.STRUCTURES
+        return self.__structure
 
     def __input_matrix_values(self, values):
         for i, element in enumerate(values):
             self.__matrix[i] = element
 
+    def transform_points(self, buffer, out=None, components=3, divide=False):
+        """ Transforms a flat buffer of xyz tuples, as Mat3*Vec3, without creating a Vec3 per tuple
+
+            With components=2 the buffer holds xy points, transformed with an implicit w = 1.
+            divide applies the perspective divide to xy points.
+            Results are written into out, or back into buffer when out is None.
+        """
+        return _transform_buffer(self.__matrix, 3, buffer, out, components, 1, divide)
+
+    def transform_directions(self, buffer, out=None, components=3):
+        """ As transform_points, with xy directions using an implicit w = 0 so translation is ignored
+        """
+        return _transform_buffer(self.__matrix, 3, buffer, out, components, 0, False)
+
+    def transform_point(self, vec, divide=False):
+        assert isinstance(vec, pyclid.vector.Vec2), 'Requires a Vec2'
+        sm = self.__matrix
+        structure = self.__structure
+        if structure == IDENTITY:
+            return pyclid.vector.Vec2(vec.x, vec.y)
+        if structure == TRANSLATION:
+            return pyclid.vector.Vec2(vec.x + sm[2], vec.y + sm[5])
+        # w is 1 for affine matrices, so there is nothing to divide
+        divide = divide and structure not in _AFFINE_STRUCTURES
+        x = sm[0]*vec.x + sm[1]*vec.y + sm[2]
+        y = sm[3]*vec.x + sm[4]*vec.y + sm[5]
+        if divide:
+            w = sm[6]*vec.x + sm[7]*vec.y + sm[8]
+            return pyclid.vector.Vec2(x/w, y/w)
+        return pyclid.vector.Vec2(x, y)
+
+    def transform_direction(self, vec):
+        assert isinstance(vec, pyclid.vector.Vec2), 'Requires a Vec2'
+        sm = self.__matrix
+        if self.__structure in (IDENTITY, TRANSLATION):
+            return pyclid.vector.Vec2(vec.x, vec.y)
+        return pyclid.vector.Vec2(sm[0]*vec.x + sm[1]*vec.y, sm[3]*vec.x + sm[4]*vec.y)
+
     def set_value(self, value, position):
         # Can take in a 1d position or 2d position
         coord = position
         if isinstance(position, list) and len(position) == 2:
             coord = self.convert_2d(position[0], position[1])
         self.__matrix[coord] = value
+        self.__structure = _classify(self.__matrix, 3)
 
     def convert_2d(self, x, y):
         # This is used to convert a 2D matrix coords into the 1D representation used in self.__matrix
@@ -278,6 +902,7 @@ class Mat3:
     def load_zero(self):
         for i in range(self.size):
             self.__matrix[i] = 0
+        self.__structure = GENERAL
         return self
 
     def load_identity(self):
@@ -293,6 +918,7 @@ class Mat3:
         self.__matrix[7] = 0
         self.__matrix[8] = 1
 
+        self.__structure = IDENTITY
         return self
 
     def transpose(self):
@@ -305,8 +931,96 @@ class Mat3:
         self.__matrix[2], self.__matrix[6] = self.__matrix[6], self.__matrix[2]
         self.__matrix[5], self.__matrix[7] = self.__matrix[7], self.__matrix[5]
 
+        if self.__structure not in (IDENTITY, DIAGONAL):
+            self.__structure = _classify(self.__matrix, 3)
         return self
 
+    def determinant(self):
+        m0, m1, m2, m3, m4, m5, m6, m7, m8 = self.__matrix
+        structure = self.__structure
+        if structure in (IDENTITY, TRANSLATION):
+            return 1
+        if structure == DIAGONAL:
+            return m0*m4
+        if structure in _AFFINE_STRUCTURES:
+            return m0*m4 - m1*m3
+        return m0*(m4*m8 - m5*m7) - m1*(m3*m8 - m5*m6) + m2*(m3*m7 - m4*m6)
+
+    def inverse(self):
+        return Mat3.inverse_into(self, self)
+
+    def inverse_affine(self):
+        return Mat3.inverse_affine_into(self, self)
+
+    def inverse_rigid(self):
+        return Mat3.inverse_rigid_into(self, self)
+
+    @staticmethod
+    def inverse_into(out, a):
+        """ Inverse from the unrolled cofactors, out may be a
+
+            0, 1, 2
+            3, 4, 5
+            6, 7, 8
+        """
+        structure = a.__structure
+        if structure == RIGID:
+            return Mat3.inverse_rigid_into(out, a)
+        if structure != GENERAL:
+            return Mat3.inverse_affine_into(out, a)
+        m0, m1, m2, m3, m4, m5, m6, m7, m8 = a.__matrix
+        c0 = m4*m8 - m5*m7
+        c1 = m5*m6 - m3*m8
+        c2 = m3*m7 - m4*m6
+        det = m0*c0 + m1*c1 + m2*c2
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        out.__matrix[:] = (c0*inv_det, (m2*m7 - m1*m8)*inv_det, (m1*m5 - m2*m4)*inv_det,
+                           c1*inv_det, (m0*m8 - m2*m6)*inv_det, (m2*m3 - m0*m5)*inv_det,
+                           c2*inv_det, (m1*m6 - m0*m7)*inv_det, (m0*m4 - m1*m3)*inv_det)
+        return out
+
+    @staticmethod
+    def inverse_affine_into(out, a):
+        """ Inverse of a 2D affine matrix, with a bottom row of 0, 0, 1
+
+            A, t            inv(A), -inv(A)*t
+            0, 1     ->     0,       1
+        """
+        m0, m1, m2, m3, m4, m5 = a.__matrix[:6]
+        structure = a.__structure
+        out.__structure = structure if structure in _AFFINE_STRUCTURES else AFFINE
+        if structure == IDENTITY:
+            out.__matrix[:] = a.__matrix
+            return out
+        if structure == TRANSLATION:
+            out.__matrix[:] = (1, 0, -m2, 0, 1, -m5, 0, 0, 1)
+            return out
+        if structure == DIAGONAL:
+            assert m0 and m4, 'Requires a non-singular matrix'
+            out.__matrix[:] = (1.0/m0, 0, 0, 0, 1.0/m4, 0, 0, 0, 1)
+            return out
+        det = m0*m4 - m1*m3
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        i0, i1, i3, i4 = m4*inv_det, -m1*inv_det, -m3*inv_det, m0*inv_det
+        out.__matrix[:] = (i0, i1, -(i0*m2 + i1*m5),
+                           i3, i4, -(i3*m2 + i4*m5),
+                           0, 0, 1)
+        return out
+
+    @staticmethod
+    def inverse_rigid_into(out, a):
+        """ Inverse of a 2D rotation and translation, the rotation is transposed
+            and the translation rotated back and negated
+        """
+        m0, m1, m2, m3, m4, m5 = a.__matrix[:6]
+        out.__structure = a.__structure if a.__structure in _RIGID_STRUCTURES else AFFINE
+        out.__matrix[:] = (m0, m3, -(m0*m2 + m3*m5),
+                           m1, m4, -(m1*m2 + m4*m5),
+                           0, 0, 1)
+        return out
+
     def translate(self, x, y):
         """
             0, 1, 2         0, 0, x
@@ -319,8 +1033,15 @@ class Mat3:
         return self
 
     def rotate(self, angle):
-        rotation_matrix = self.__rotation_matrix(angle)
-        self *= rotation_matrix
+        """ self *= rotation matrix, updating only the two rotated columns
+
+            cos, -sin, 0
+            sin,  cos, 0
+              0,    0, 1
+        """
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 3, 0, 1, cos_angle, -sin_angle, sin_angle)
+        self.__structure = _product_structure(self.__structure, RIGID)
         return self
 
     def scale(self, x, y):
@@ -357,17 +1078,6 @@ class Mat3:
         mat.set_value(y, 5)
         return mat
 
-    def __rotation_matrix(self, angle):
-        mat = Mat3([]).load_identity()
-        sin_angle = math.sin(angle)
-        cos_angle = math.cos(angle)
-        mat.set_value(cos_angle, 0)
-        mat.set_value(-sin_angle, 1)
-        mat.set_value(sin_angle, 3)
-        mat.set_value(cos_angle, 4)
-        print mat
-        return mat
-
 
 class Mat4:
     """ Creates a 4x4 matrix
@@ -378,68 +1088,131 @@ class Mat4:
         |12, 13, 14, 15|
 
     """
+    __slots__ = ('__matrix', '__structure')
 
-    def __init__(self, mat=[]):
-        assert isinstance(mat, list) and len(mat) <= 16, 'Requires input to be a list and len <= 16'
-        self.__matrix = []
-        self.__x_size = 4
-        self.__y_size = 4
-        self.size = 16
+    __x_size = 4
+    __y_size = 4
+    size = 16
 
+    def __init__(self, mat=[]):
+        assert isinstance(mat, (list, _MatrixView)) and len(mat) <= 16, 'Requires input to be a list and len <= 16'
         # Initialise the matrix to zero
-        for i in range(self.size):
-            self.__matrix.append(0)
+        self.__matrix = [0]*self.size
         self.__input_matrix_values(mat)
+        self.__structure = _classify(self.__matrix, 4)
+
+    @classmethod
+    def __wrap(cls, values, structure=None):
+        # Builds a matrix around a list of cls.size values without copying it, tagged from the values by default
+        mat = cls.__new__(cls)
+        mat.__matrix = values
+        mat.__structure = _classify(values, 4) if structure is None else structure
+        return mat
 
     def __mul__(self, other):
         assert isinstance(other, (int, float, Mat4, pyclid.vector.Vec4)), 'Requires an int, float, long, Vec4 or Mat4'
-        if isinstance(other, Mat4):
-            new_matrix = []
-            sm = self.__matrix
-            om = other.__matrix
-
-            # | 0,  1,  2,  3|
-            # | 4,  5,  6,  7|
-            # | 8,  9, 10, 11|
-            # |12, 13, 14, 15|
-
-            new_matrix.append(sm[0]*om[0] + sm[1]*om[4] + sm[2]*om[8] + sm[3]*om[12])
-            new_matrix.append(sm[0]*om[1] + sm[1]*om[5] + sm[2]*om[9] + sm[3]*om[13])
-            new_matrix.append(sm[0]*om[2] + sm[1]*om[6] + sm[2]*om[10] + sm[3]*om[14])
-            new_matrix.append(sm[0]*om[3] + sm[1]*om[7] + sm[2]*om[11] + sm[3]*om[15])
-
-            new_matrix.append(sm[4]*om[0] + sm[5]*om[4] + sm[6]*om[8] + sm[7]*om[12])
-            new_matrix.append(sm[4]*om[1] + sm[5]*om[5] + sm[6]*om[9] + sm[7]*om[13])
-            new_matrix.append(sm[4]*om[2] + sm[5]*om[6] + sm[6]*om[10] + sm[7]*om[14])
-            new_matrix.append(sm[4]*om[3] + sm[5]*om[7] + sm[6]*om[11] + sm[7]*om[15])
-
-            new_matrix.append(sm[8]*om[0] + sm[9]*om[4] + sm[10]*om[8] + sm[11]*om[12])
-            new_matrix.append(sm[8]*om[1] + sm[9]*om[5] + sm[10]*om[9] + sm[11]*om[13])
-            new_matrix.append(sm[8]*om[2] + sm[9]*om[6] + sm[10]*om[10] + sm[11]*om[14])
-            new_matrix.append(sm[8]*om[3] + sm[9]*om[7] + sm[10]*om[11] + sm[11]*om[15])
-
-            new_matrix.append(sm[12]*om[0] + sm[13]*om[4] + sm[14]*om[8] + sm[15]*om[12])
-            new_matrix.append(sm[12]*om[1] + sm[13]*om[5] + sm[14]*om[9] + sm[15]*om[13])
-            new_matrix.append(sm[12]*om[2] + sm[13]*om[6] + sm[14]*om[10] + sm[15]*om[14])
-            new_matrix.append(sm[12]*om[3] + sm[13]*om[7] + sm[14]*om[11] + sm[15]*om[15])
-
-            return Mat4(new_matrix)
-
-        elif isinstance(other, pyclid.vector.Vec4):
-            sm = self.__matrix
-            v = [sm[0]*other.x  + sm[1]*other.y  + sm[2]*other.z  + sm[3]*other.w,
-                 sm[4]*other.x  + sm[5]*other.y  + sm[6]*other.z  + sm[7]*other.w,
-                 sm[8]*other.x  + sm[9]*other.y  + sm[10]*other.z + sm[11]*other.w,
-                 sm[12]*other.x + sm[13]*other.y + sm[14]*other.z + sm[15]*other.w]
-
-            return pyclid.vector.Vec4(v[0], v[1], v[2], v[3])
-        else:
-            self.__matrix = [i*other for i in self.__matrix]
-            return self
+        if isinstance(other, pyclid.vector.Vec4):
+            return Mat4.mul_into(pyclid.vector.Vec4(), self, other)
+        return Mat4.mul_into(Mat4.__wrap([0]*self.size, GENERAL), self, other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
+    def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return Mat4.__wrap([i/other for i in self.__matrix])
+
+    __truediv__ = __div__
+
+    def __add__(self, other):
+        assert isinstance(other, Mat4), 'Requires a Mat4'
+        return Mat4.__wrap(list(map(operator.add, self.__matrix, other.__matrix)))
+
+    def __sub__(self, other):
+        assert isinstance(other, Mat4), 'Requires a Mat4'
+        return Mat4.__wrap(list(map(operator.sub, self.__matrix, other.__matrix)))
+
+    def __imul__(self, other):
+        assert isinstance(other, (int, float, Mat4)), 'Requires a int, float, Mat4'
+        return Mat4.mul_into(self, self, other)
+
+    def __idiv__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        self.__matrix[:] = [i/other for i in self.__matrix]
+        self.__structure = _classify(self.__matrix, 4)
+        return self
+
+    __itruediv__ = __idiv__
+
+    def __iadd__(self, other):
+        return Mat4.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Mat4.sub_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a Mat4 (out is a Mat4), a Vec4 (out is a Vec4) or a number. out may be a or b
+        """
+        if isinstance(b, Mat4):
+            sa, sb = a.__structure, b.__structure
+            structure = _product_structure(sa, sb)
+            if sa == IDENTITY:
+                out.__matrix[:] = b.__matrix
+            elif sb == IDENTITY:
+                out.__matrix[:] = a.__matrix
+            elif structure == TRANSLATION:
+                m, n = a.__matrix, b.__matrix
+                out.__matrix[:] = (1, 0, 0, m[3] + n[3], 0, 1, 0, m[7] + n[7], 0, 0, 1, m[11] + n[11], 0, 0, 0, 1)
+            elif structure == DIAGONAL:
+                m, n = a.__matrix, b.__matrix
+                out.__matrix[:] = (m[0]*n[0], 0, 0, 0, 0, m[5]*n[5], 0, 0, 0, 0, m[10]*n[10], 0, 0, 0, 0, 1)
+            elif sa in _AFFINE_STRUCTURES and sb in _AFFINE_STRUCTURES:
+                _mat4_affine_mul_into(out.__matrix, a.__matrix, b.__matrix)
+            else:
+                _mat4_mul_into(out.__matrix, a.__matrix, b.__matrix)
+            out.__structure = structure
+        elif isinstance(b, pyclid.vector.Vec4):
+            m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11, m12, m13, m14, m15 = a.__matrix
+            x, y, z, w = b.x, b.y, b.z, b.w
+            structure = a.__structure
+            if structure == IDENTITY:
+                out.x, out.y, out.z, out.w = x, y, z, w
+            elif structure == TRANSLATION:
+                out.x, out.y, out.z, out.w = x + m3*w, y + m7*w, z + m11*w, w
+            elif structure == DIAGONAL:
+                out.x, out.y, out.z, out.w = m0*x, m5*y, m10*z, w
+            elif structure in _AFFINE_STRUCTURES:
+                out.x = m0*x + m1*y + m2*z + m3*w
+                out.y = m4*x + m5*y + m6*z + m7*w
+                out.z = m8*x + m9*y + m10*z + m11*w
+                out.w = w
+            else:
+                out.x = m0*x + m1*y + m2*z + m3*w
+                out.y = m4*x + m5*y + m6*z + m7*w
+                out.z = m8*x + m9*y + m10*z + m11*w
+                out.w = m12*x + m13*y + m14*z + m15*w
+        else:
+            assert isinstance(b, (int, float)), 'Requires an int, float, long, Vec4 or Mat4'
+            out.__matrix[:] = map(operator.mul, a.__matrix, repeat(b))
+            out.__structure = _classify(out.__matrix, 4)
+        return out
+
+    @staticmethod
+    def add_into(out, a, b):
+        assert isinstance(a, Mat4) and isinstance(b, Mat4), 'Requires a Mat4'
+        out.__matrix[:] = map(operator.add, a.__matrix, b.__matrix)
+        out.__structure = _classify(out.__matrix, 4)
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Mat4) and isinstance(b, Mat4), 'Requires a Mat4'
+        out.__matrix[:] = map(operator.sub, a.__matrix, b.__matrix)
+        out.__structure = _classify(out.__matrix, 4)
+        return out
+
     def __str__(self):
         max_size = 0
         for i in self.__matrix:
@@ -458,12 +1231,30 @@ class Mat4:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (4, 4), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 16 values of a float32/float64 buffer, row major, e.g. a (4, 4) numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 16, 'Requires a buffer of at least 16 values'
+        return cls.__wrap(view[:16].tolist())
+
     def __eq__(self, other):
         assert isinstance(other, Mat4), 'Requires a Mat4'
 
         is_equal = True
         for i in range(self.size):
-            if self.__matrix[i] != other.matrix[i]:
+            if self.__matrix[i] != other.__matrix[i]:
                 is_equal = False
                 break
 
@@ -474,7 +1265,21 @@ class Mat4:
 
     @property
     def matrix(self):
-        return self.__matrix
+        # The values as a list like view, writing through it drops the structure tag to general, see values
+        return _MatrixView(self.__matrix, self.__set_general)
+
+    def __set_general(self):
+        self.__structure = GENERAL
+
+    @property
+    def values(self):
+        # The values as a tuple, keeping the structure tag
+        return tuple(self.__matrix)
+
+    @property
+    def structure(self):
+        # One of pyclid.matrix.STRUCTURES
+        return self.__structure
 
     def __input_matrix_values(self, values):
         for i, element in enumerate(values):
@@ -501,13 +1306,76 @@ class Mat4:
         self.__matrix[14] = 0
         self.__matrix[15] = 1
 
+        self.__structure = IDENTITY
         return self
 
     def load_zero(self):
         for i in range(self.size):
             self.__matrix[i] = 0
+        self.__structure = GENERAL
+        return self
+
+    def transpose(self):
+        """
+             0,  1,  2,  3          0,  4,  8, 12
+             4,  5,  6,  7     ->   1,  5,  9, 13
+             8,  9, 10, 11          2,  6, 10, 14
+            12, 13, 14, 15          3,  7, 11, 15
+        """
+        m = self.__matrix
+        m[1], m[4] = m[4], m[1]
+        m[2], m[8] = m[8], m[2]
+        m[3], m[12] = m[12], m[3]
+        m[6], m[9] = m[9], m[6]
+        m[7], m[13] = m[13], m[7]
+        m[11], m[14] = m[14], m[11]
+        if self.__structure not in (IDENTITY, DIAGONAL):
+            self.__structure = _classify(m, 4)
         return self
 
+    def transform_points(self, buffer, out=None, components=3, divide=False):
+        """ Transforms a flat buffer of xyz points without creating a vector per point
+
+            xyz points are transformed with an implicit w = 1, divide applies the perspective divide.
+            With components=4 the buffer holds xyzw tuples, transformed as Mat4*Vec4.
+            Results are written into out, or back into buffer when out is None.
+        """
+        return _transform_buffer(self.__matrix, 4, buffer, out, components, 1, divide)
+
+    def transform_directions(self, buffer, out=None, components=3):
+        """ As transform_points, with xyz directions using an implicit w = 0 so translation is ignored
+        """
+        return _transform_buffer(self.__matrix, 4, buffer, out, components, 0, False)
+
+    def transform_point(self, vec, divide=False):
+        # Vec3 point with an implicit w = 1
+        assert isinstance(vec, pyclid.vector.Vec3), 'Requires a Vec3'
+        sm = self.__matrix
+        structure = self.__structure
+        if structure == IDENTITY:
+            return pyclid.vector.Vec3(vec.x, vec.y, vec.z)
+        if structure == TRANSLATION:
+            return pyclid.vector.Vec3(vec.x + sm[3], vec.y + sm[7], vec.z + sm[11])
+        # w is 1 for affine matrices, so there is nothing to divide
+        divide = divide and structure not in _AFFINE_STRUCTURES
+        x = sm[0]*vec.x + sm[1]*vec.y + sm[2]*vec.z + sm[3]
+        y = sm[4]*vec.x + sm[5]*vec.y + sm[6]*vec.z + sm[7]
+        z = sm[8]*vec.x + sm[9]*vec.y + sm[10]*vec.z + sm[11]
+        if divide:
+            w = sm[12]*vec.x + sm[13]*vec.y + sm[14]*vec.z + sm[15]
+            return pyclid.vector.Vec3(x/w, y/w, z/w)
+        return pyclid.vector.Vec3(x, y, z)
+
+    def transform_direction(self, vec):
+        # Vec3 direction with an implicit w = 0
+        assert isinstance(vec, pyclid.vector.Vec3), 'Requires a Vec3'
+        sm = self.__matrix
+        if self.__structure in (IDENTITY, TRANSLATION):
+            return pyclid.vector.Vec3(vec.x, vec.y, vec.z)
+        return pyclid.vector.Vec3(sm[0]*vec.x + sm[1]*vec.y + sm[2]*vec.z,
+                                  sm[4]*vec.x + sm[5]*vec.y + sm[6]*vec.z,
+                                  sm[8]*vec.x + sm[9]*vec.y + sm[10]*vec.z)
+
     # TODO - Set value should be setter for the matrix
     # TODO - Reverse order, it makes more sense to have index then value like an array a[index] = value
     def set_value(self, value, position):
@@ -516,22 +1384,174 @@ class Mat4:
         if isinstance(position, list) and len(position) == 2:
             coord = self.convert_2d(position[0], position[1])
         self.__matrix[coord] = value
+        self.__structure = _classify(self.__matrix, 4)
+
+    def determinant(self):
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11, m12, m13, m14, m15 = self.__matrix
+        structure = self.__structure
+        if structure in (IDENTITY, TRANSLATION):
+            return 1
+        if structure == DIAGONAL:
+            return m0*m5*m10
+        if structure in _AFFINE_STRUCTURES:
+            return m0*(m5*m10 - m6*m9) - m1*(m4*m10 - m6*m8) + m2*(m4*m9 - m5*m8)
+        # 2x2 determinants of the top two and bottom two rows
+        s0 = m0*m5 - m4*m1
+        s1 = m0*m6 - m4*m2
+        s2 = m0*m7 - m4*m3
+        s3 = m1*m6 - m5*m2
+        s4 = m1*m7 - m5*m3
+        s5 = m2*m7 - m6*m3
+        c0 = m8*m13 - m12*m9
+        c1 = m8*m14 - m12*m10
+        c2 = m8*m15 - m12*m11
+        c3 = m9*m14 - m13*m10
+        c4 = m9*m15 - m13*m11
+        c5 = m10*m15 - m14*m11
+        return s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0
+
+    def inverse(self):
+        return Mat4.inverse_into(self, self)
+
+    def inverse_affine(self):
+        return Mat4.inverse_affine_into(self, self)
+
+    def inverse_rigid(self):
+        return Mat4.inverse_rigid_into(self, self)
+
+    @staticmethod
+    def inverse_into(out, a):
+        """ Inverse from the unrolled cofactors, out may be a
+
+            The cofactors are built from the 2x2 determinants of the top two rows (s)
+            and the bottom two rows (c)
+        """
+        structure = a.__structure
+        if structure == RIGID:
+            return Mat4.inverse_rigid_into(out, a)
+        if structure != GENERAL:
+            return Mat4.inverse_affine_into(out, a)
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11, m12, m13, m14, m15 = a.__matrix
+        s0 = m0*m5 - m4*m1
+        s1 = m0*m6 - m4*m2
+        s2 = m0*m7 - m4*m3
+        s3 = m1*m6 - m5*m2
+        s4 = m1*m7 - m5*m3
+        s5 = m2*m7 - m6*m3
+        c0 = m8*m13 - m12*m9
+        c1 = m8*m14 - m12*m10
+        c2 = m8*m15 - m12*m11
+        c3 = m9*m14 - m13*m10
+        c4 = m9*m15 - m13*m11
+        c5 = m10*m15 - m14*m11
+        det = s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        out.__matrix[:] = ((m5*c5 - m6*c4 + m7*c3)*inv_det,
+                           (-m1*c5 + m2*c4 - m3*c3)*inv_det,
+                           (m13*s5 - m14*s4 + m15*s3)*inv_det,
+                           (-m9*s5 + m10*s4 - m11*s3)*inv_det,
+
+                           (-m4*c5 + m6*c2 - m7*c1)*inv_det,
+                           (m0*c5 - m2*c2 + m3*c1)*inv_det,
+                           (-m12*s5 + m14*s2 - m15*s1)*inv_det,
+                           (m8*s5 - m10*s2 + m11*s1)*inv_det,
+
+                           (m4*c4 - m5*c2 + m7*c0)*inv_det,
+                           (-m0*c4 + m1*c2 - m3*c0)*inv_det,
+                           (m12*s4 - m13*s2 + m15*s0)*inv_det,
+                           (-m8*s4 + m9*s2 - m11*s0)*inv_det,
+
+                           (-m4*c3 + m5*c1 - m6*c0)*inv_det,
+                           (m0*c3 - m1*c1 + m2*c0)*inv_det,
+                           (-m12*s3 + m13*s1 - m14*s0)*inv_det,
+                           (m8*s3 - m9*s1 + m10*s0)*inv_det)
+        return out
+
+    @staticmethod
+    def inverse_affine_into(out, a):
+        """ Inverse of an affine matrix, with a bottom row of 0, 0, 0, 1
+
+            A, t            inv(A), -inv(A)*t
+            0, 1     ->     0,       1
+        """
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = a.__matrix[:12]
+        structure = a.__structure
+        out.__structure = structure if structure in _AFFINE_STRUCTURES else AFFINE
+        if structure == IDENTITY:
+            out.__matrix[:] = a.__matrix
+            return out
+        if structure == TRANSLATION:
+            out.__matrix[:] = (1, 0, 0, -m3, 0, 1, 0, -m7, 0, 0, 1, -m11, 0, 0, 0, 1)
+            return out
+        if structure == DIAGONAL:
+            assert m0 and m5 and m10, 'Requires a non-singular matrix'
+            out.__matrix[:] = (1.0/m0, 0, 0, 0, 0, 1.0/m5, 0, 0, 0, 0, 1.0/m10, 0, 0, 0, 0, 1)
+            return out
+        c0 = m5*m10 - m6*m9
+        c1 = m6*m8 - m4*m10
+        c2 = m4*m9 - m5*m8
+        det = m0*c0 + m1*c1 + m2*c2
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        i0, i1, i2 = c0*inv_det, (m2*m9 - m1*m10)*inv_det, (m1*m6 - m2*m5)*inv_det
+        i4, i5, i6 = c1*inv_det, (m0*m10 - m2*m8)*inv_det, (m2*m4 - m0*m6)*inv_det
+        i8, i9, i10 = c2*inv_det, (m1*m8 - m0*m9)*inv_det, (m0*m5 - m1*m4)*inv_det
+        out.__matrix[:] = (i0, i1, i2, -(i0*m3 + i1*m7 + i2*m11),
+                           i4, i5, i6, -(i4*m3 + i5*m7 + i6*m11),
+                           i8, i9, i10, -(i8*m3 + i9*m7 + i10*m11),
+                           0, 0, 0, 1)
+        return out
+
+    @staticmethod
+    def inverse_rigid_into(out, a):
+        """ Inverse of a rotation and translation, such as those built with rotate_x/y/z and translate.
+            The rotation is transposed and the translation rotated back and negated
+        """
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = a.__matrix[:12]
+        out.__structure = a.__structure if a.__structure in _RIGID_STRUCTURES else AFFINE
+        out.__matrix[:] = (m0, m4, m8, -(m0*m3 + m4*m7 + m8*m11),
+                           m1, m5, m9, -(m1*m3 + m5*m7 + m9*m11),
+                           m2, m6, m10, -(m2*m3 + m6*m7 + m10*m11),
+                           0, 0, 0, 1)
+        return out
 
     # TODO - Multiple axis
+    # The rotations below multiply in place, self *= rotation matrix, touching only the two rotated columns
     def rotate_x(self, angle):
-        rotation_matrix = self.__rotation_matrix_x(angle)
-        self *= rotation_matrix
-
+        """
+            1,    0,   0, 0
+            0,  cos, sin, 0
+            0, -sin, cos, 0
+            0,    0,   0, 1
+        """
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 1, 2, cos_angle, sin_angle, -sin_angle)
+        self.__structure = _product_structure(self.__structure, RIGID)
         return self
 
     def rotate_y(self, angle):
-        rotation_matrix = self.__rotation_matrix_y(angle)
-        self *= rotation_matrix
+        """
+            cos, 0, -sin, 0
+              0, 1,    0, 0
+            sin, 0,  cos, 0
+              0, 0,    0, 1
+        """
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 0, 2, cos_angle, -sin_angle, sin_angle)
+        self.__structure = _product_structure(self.__structure, RIGID)
         return self
 
     def rotate_z(self, angle):
-        rotation_matrix = self.__rotation_matrix_z(angle)
-        self *= rotation_matrix
+        """
+             cos, sin, 0, 0
+            -sin, cos, 0, 0
+               0,   0, 1, 0
+               0,   0, 0, 1
+        """
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 0, 1, cos_angle, sin_angle, -sin_angle)
+        self.__structure = _product_structure(self.__structure, RIGID)
         return self
 
     def translate(self, x, y, z):
@@ -543,41 +1563,642 @@ class Mat4:
         # self.__matrix[13] -= y
         # self.__matrix[14] -= z
 
+        # The same as translation*self for the affine tags
+        self.__structure = _product_structure(TRANSLATION, self.__structure)
         return self
 
-    def __rotation_matrix_x(self, angle):
-        mat = Mat4([]).load_identity()
-        sin_angle = math.sin(angle)
-        cos_angle = math.cos(angle)
-        # mat.set_value(cos_angle, 5)
-        # mat.set_value(-sin_angle, 6)
-        # mat.set_value(sin_angle, 9)
-        # mat.set_value(cos_angle, 10)
-        mat.set_value(cos_angle, 5)
-        mat.set_value(sin_angle, 6)
-        mat.set_value(-sin_angle, 9)
-        mat.set_value(cos_angle, 10)
-        mat.set_value(0, 15)
+    @classmethod
+    def from_trs(cls, translation, rotation, scale=None):
+        """ T*R*S from a Vec3 translation, a unit Quat rotation and a Vec3 scale (default 1, 1, 1),
+            written entry by entry with no matrix products
+        """
+        assert isinstance(translation, pyclid.vector.Vec3), 'Requires a Vec3 translation'
+        assert scale is None or isinstance(scale, pyclid.vector.Vec3), 'Requires a Vec3 scale'
+        sx, sy, sz = (1.0, 1.0, 1.0) if scale is None else (scale.x, scale.y, scale.z)
+        w, x, y, z = rotation.q0, rotation.q1, rotation.q2, rotation.q3
+        # Only a unit quaternion gives a rotation, so anything else can't use the rigid inverse
+        rigid = sx == sy == sz == 1 and abs(w*w + x*x + y*y + z*z - 1.0) <= UNIT_TOLERANCE
+        return cls.__wrap(_trs_values(translation.x, translation.y, translation.z, w, x, y, z, sx, sy, sz),
+                          RIGID if rigid else AFFINE)
+
+    def decompose(self):
+        """ (translation, rotation, scale) as Vec3, Quat and Vec3 with from_trs(*decompose()) == self,
+            for an affine matrix without shear. A reflection is returned as a negative x scale
+        """
+        import pyclid.quaternion
+        tx, ty, tz, w, x, y, z, sx, sy, sz = _decompose_values(self.__matrix)
+        return (pyclid.vector.Vec3(tx, ty, tz), pyclid.quaternion.Quat(w, x, y, z), pyclid.vector.Vec3(sx, sy, sz))
+
+    @staticmethod
+    def from_trs_batch(translations, rotations, scales=None, out=None):
+        """ from_trs for each element of a Vec3Array, QuatArray and Vec3Array (or None), as a flat buffer of
+            16 row major values per matrix, written into out when given, or a new array('d')
+        """
+        n = len(translations)
+        assert isinstance(translations, pyclid.vector.Vec3Array), 'Requires a Vec3Array of translations'
+        assert isinstance(rotations, pyclid.vector._VecArray) and rotations.dim == 4 and len(rotations) == n, \
+            'Requires a QuatArray of rotations the same length as the translations'
+        assert scales is None or isinstance(scales, pyclid.vector.Vec3Array) and len(scales) == n, \
+            'Requires a Vec3Array of scales the same length as the translations'
+        if pyclid.backend.use_numpy(n):
+            values = pyclid.backend.trs_compose(translations.data, rotations.data,
+                                                None if scales is None else scales.data, n)
+        else:
+            columns = list(translations.columns()) + list(rotations.columns())
+            columns += list(scales.columns()) if scales is not None else [repeat(1.0, n) for i in range(3)]
+            values = array('d', chain.from_iterable(map(_trs_values, *columns)))
+        if out is None:
+            return values
+        view = _float_view(out)
+        assert len(view) == 16*n, 'Requires an out buffer of 16 values per matrix'
+        view[:] = values if view.format == 'd' else array(view.format, values)
+        return out
+
+    @staticmethod
+    def decompose_batch(buffer):
+        """ decompose for each matrix of a flat buffer of 16 row major values per matrix,
+            returns (Vec3Array, QuatArray, Vec3Array)
+        """
+        import pyclid.quaternion
+        view = _float_view(buffer)
+        assert len(view) % 16 == 0, 'Requires 16 values per matrix'
+        n = len(view)//16
+        if pyclid.backend.use_numpy(n):
+            translations, rotations, scales = pyclid.backend.trs_decompose(view, n)
+        else:
+            values = view.tolist()
+            rows = [_decompose_values(values[i:i + 12]) for i in range(0, 16*n, 16)]
+            planar = [array('d', column) for column in zip(*rows)] if rows else [array('d')]*10
+            translations = planar[0] + planar[1] + planar[2]
+            rotations = planar[3] + planar[4] + planar[5] + planar[6]
+            scales = planar[7] + planar[8] + planar[9]
+        return (pyclid.vector.Vec3Array._wrap(translations, n), pyclid.quaternion.QuatArray._wrap(rotations, n),
+                pyclid.vector.Vec3Array._wrap(scales, n))
+
+
+class Mat2x3:
+    """ Creates a 2D affine matrix, the top two rows of a Mat3 with an implied bottom row of 0, 0, 1
+
+        |0, 1, 2|
+        |3, 4, 5|
+
+        Products and transforms skip the bottom row, 12 multiplies for a product rather than 27 for a Mat3
+    """
+    __slots__ = ('__matrix',)
+
+    x_size = 3
+    y_size = 2
+    size = 6
+
+    def __init__(self, mat=[]):
+        assert isinstance(mat, list) and len(mat) <= 6, 'Requires input to be a list and len <= 6'
+        # Initialise the matrix to zero
+        self.__matrix = [0]*self.size
+        for i, element in enumerate(mat):
+            self.__matrix[i] = element
+
+    def __str__(self):
+        max_size = max(len(str(i)) for i in self.__matrix)
+        str_out = ''
+        for j in range(self.y_size):
+            str_out += '| '
+            for i in range(self.x_size):
+                str_out += str('{:>'+str(max_size)+'}').format(str(self.__matrix[i+(j*self.x_size)])) + ' '
+            str_out += "|\n"
+        return str_out
+
+    def __repr__(self):
+        return self.__str__()
+
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (2, 3), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 6 values of a float32/float64 buffer, row major, e.g. a (2, 3) numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 6, 'Requires a buffer of at least 6 values'
+        return cls.__wrap(view[:6].tolist())
+
+    @classmethod
+    def __wrap(cls, values):
+        # Builds a matrix around a list of cls.size values without copying it
+        mat = cls.__new__(cls)
+        mat.__matrix = values
         return mat
 
-    def __rotation_matrix_y(self, angle):
-        mat = Mat4([]).load_identity()
-        sin_angle = math.sin(angle)
-        cos_angle = math.cos(angle)
-        mat.set_value(cos_angle, 0)
-        mat.set_value(-sin_angle, 2)
-        mat.set_value(sin_angle, 8)
-        mat.set_value(cos_angle, 10)
-        mat.set_value(0, 15)
+    @classmethod
+    def from_mat3(cls, mat):
+        # The top two rows of an affine Mat3
+        assert isinstance(mat, Mat3), 'Requires a Mat3'
+        values = mat.values
+        assert values[6:] == (0, 0, 1), 'Requires an affine Mat3, with a bottom row of 0, 0, 1'
+        return cls.__wrap(list(values[:6]))
+
+    def to_mat3(self):
+        return Mat3(self.__matrix + [0, 0, 1])
+
+    def __mul__(self, other):
+        assert isinstance(other, (Mat2x3, pyclid.vector.Vec3)), 'Requires a Mat2x3, Vec3'
+        if isinstance(other, pyclid.vector.Vec3):
+            return Mat2x3.mul_into(pyclid.vector.Vec3(), self, other)
+        return Mat2x3.mul_into(Mat2x3.__wrap([0]*self.size), self, other)
+
+    def __imul__(self, other):
+        assert isinstance(other, Mat2x3), 'Requires a Mat2x3'
+        return Mat2x3.mul_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a Mat2x3 (out is a Mat2x3) or a homogeneous Vec3 (out is a Vec3). out may be a or b
+        """
+        if isinstance(b, Mat2x3):
+            _mat2x3_mul_into(out.__matrix, a.__matrix, b.__matrix)
+        else:
+            assert isinstance(b, pyclid.vector.Vec3), 'Requires a Mat2x3, Vec3'
+            m0, m1, m2, m3, m4, m5 = a.__matrix
+            x, y, z = b.x, b.y, b.z
+            out.x, out.y, out.z = m0*x + m1*y + m2*z, m3*x + m4*y + m5*z, z
+        return out
+
+    def __eq__(self, other):
+        assert isinstance(other, Mat2x3), 'Requires a Mat2x3'
+        return self.__matrix == other.__matrix
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    @property
+    def matrix(self):
+        return self.__matrix
+
+    @property
+    def values(self):
+        return tuple(self.__matrix)
+
+    def transform_points(self, buffer, out=None):
+        """ Transforms a flat buffer of xy points without creating a Vec2 per point.
+            Results are written into out, or back into buffer when out is None.
+        """
+        return _transform_buffer(self.__matrix, 3, buffer, out, 2, 1, False)
+
+    def transform_directions(self, buffer, out=None):
+        # As transform_points, ignoring the translation
+        return _transform_buffer(self.__matrix, 3, buffer, out, 2, 0, False)
+
+    def transform_point(self, vec):
+        assert isinstance(vec, pyclid.vector.Vec2), 'Requires a Vec2'
+        m0, m1, m2, m3, m4, m5 = self.__matrix
+        return pyclid.vector.Vec2(m0*vec.x + m1*vec.y + m2, m3*vec.x + m4*vec.y + m5)
+
+    def transform_direction(self, vec):
+        assert isinstance(vec, pyclid.vector.Vec2), 'Requires a Vec2'
+        m0, m1, _, m3, m4, _ = self.__matrix
+        return pyclid.vector.Vec2(m0*vec.x + m1*vec.y, m3*vec.x + m4*vec.y)
+
+    def load_zero(self):
+        self.__matrix[:] = (0, 0, 0, 0, 0, 0)
+        return self
+
+    def load_identity(self):
+        self.__matrix[:] = (1, 0, 0, 0, 1, 0)
+        return self
+
+    def determinant(self):
+        m0, m1, _, m3, m4, _ = self.__matrix
+        return m0*m4 - m1*m3
+
+    def inverse(self):
+        return Mat2x3.inverse_into(self, self)
+
+    @staticmethod
+    def inverse_into(out, a):
+        """ Inverse of the affine transform, out may be a
+
+            A, t            inv(A), -inv(A)*t
+        """
+        m0, m1, m2, m3, m4, m5 = a.__matrix
+        det = m0*m4 - m1*m3
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        i0, i1, i3, i4 = m4*inv_det, -m1*inv_det, -m3*inv_det, m0*inv_det
+        out.__matrix[:] = (i0, i1, -(i0*m2 + i1*m5),
+                           i3, i4, -(i3*m2 + i4*m5))
+        return out
+
+    # As the Mat3 methods of the same name, self *= transform, touching only the columns that change
+    def translate(self, x, y):
+        m = self.__matrix
+        m[2] += m[0]*x + m[1]*y
+        m[5] += m[3]*x + m[4]*y
+        return self
+
+    def rotate(self, angle):
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 3, 0, 1, cos_angle, -sin_angle, sin_angle)
+        return self
+
+    def scale(self, x, y):
+        m = self.__matrix
+        m[0] *= x
+        m[3] *= x
+        m[1] *= y
+        m[4] *= y
+        return self
+
+    def share(self, x, y):
+        # 1, x
+        # y, 1
+        m0, m1, _, m3, m4, _ = self.__matrix
+        self.__matrix[0:2] = (m0 + m1*y, m0*x + m1)
+        self.__matrix[3:5] = (m3 + m4*y, m3*x + m4)
+        return self
+
+
+class Mat3x4:
+    """ Creates a 3D affine matrix, the top three rows of a Mat4 with an implied bottom row of 0, 0, 0, 1
+
+        | 0,  1,  2,  3|
+        | 4,  5,  6,  7|
+        | 8,  9, 10, 11|
+
+        Products and transforms skip the bottom row, 36 multiplies for a product rather than 64 for a Mat4
+    """
+    __slots__ = ('__matrix',)
+
+    x_size = 4
+    y_size = 3
+    size = 12
+
+    def __init__(self, mat=[]):
+        assert isinstance(mat, list) and len(mat) <= 12, 'Requires input to be a list and len <= 12'
+        # Initialise the matrix to zero
+        self.__matrix = [0]*self.size
+        for i, element in enumerate(mat):
+            self.__matrix[i] = element
+
+    def __str__(self):
+        max_size = max(len(str(i)) for i in self.__matrix)
+        str_out = ''
+        for j in range(self.y_size):
+            str_out += '| '
+            for i in range(self.x_size):
+                str_out += str('{:>'+str(max_size)+'}').format(str(self.__matrix[i+(j*self.x_size)])) + ' '
+            str_out += "|\n"
+        return str_out
+
+    def __repr__(self):
+        return self.__str__()
+
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (3, 4), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 12 values of a float32/float64 buffer, row major, e.g. a (3, 4) numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 12, 'Requires a buffer of at least 12 values'
+        return cls.__wrap(view[:12].tolist())
+
+    @classmethod
+    def __wrap(cls, values):
+        # Builds a matrix around a list of cls.size values without copying it
+        mat = cls.__new__(cls)
+        mat.__matrix = values
         return mat
 
-    def __rotation_matrix_z(self, angle):
-        mat = Mat4([]).load_identity()
-        sin_angle = math.sin(angle)
-        cos_angle = math.cos(angle)
-        mat.set_value(cos_angle, 0)
-        mat.set_value(sin_angle, 1)
-        mat.set_value(-sin_angle, 4)
-        mat.set_value(cos_angle, 5)
-        mat.set_value(0, 15)
+    @classmethod
+    def from_mat4(cls, mat):
+        # The top three rows of an affine Mat4
+        assert isinstance(mat, Mat4), 'Requires a Mat4'
+        values = mat.values
+        assert values[12:] == (0, 0, 0, 1), 'Requires an affine Mat4, with a bottom row of 0, 0, 0, 1'
+        return cls.__wrap(list(values[:12]))
+
+    def to_mat4(self):
+        return Mat4(self.__matrix + [0, 0, 0, 1])
+
+    @classmethod
+    def from_trs(cls, translation, rotation, scale=None):
+        # As Mat4.from_trs
+        assert isinstance(translation, pyclid.vector.Vec3), 'Requires a Vec3 translation'
+        sx, sy, sz = (1.0, 1.0, 1.0) if scale is None else (scale.x, scale.y, scale.z)
+        return cls.__wrap(_trs_values(translation.x, translation.y, translation.z,
+                                      rotation.q0, rotation.q1, rotation.q2, rotation.q3, sx, sy, sz)[:12])
+
+    def __mul__(self, other):
+        assert isinstance(other, (Mat3x4, pyclid.vector.Vec4)), 'Requires a Mat3x4, Vec4'
+        if isinstance(other, pyclid.vector.Vec4):
+            return Mat3x4.mul_into(pyclid.vector.Vec4(), self, other)
+        return Mat3x4.mul_into(Mat3x4.__wrap([0]*self.size), self, other)
+
+    def __imul__(self, other):
+        assert isinstance(other, Mat3x4), 'Requires a Mat3x4'
+        return Mat3x4.mul_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a Mat3x4 (out is a Mat3x4) or a homogeneous Vec4 (out is a Vec4). out may be a or b
+        """
+        if isinstance(b, Mat3x4):
+            _mat3x4_mul_into(out.__matrix, a.__matrix, b.__matrix)
+        else:
+            assert isinstance(b, pyclid.vector.Vec4), 'Requires a Mat3x4, Vec4'
+            m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = a.__matrix
+            x, y, z, w = b.x, b.y, b.z, b.w
+            out.x = m0*x + m1*y + m2*z + m3*w
+            out.y = m4*x + m5*y + m6*z + m7*w
+            out.z = m8*x + m9*y + m10*z + m11*w
+            out.w = w
+        return out
+
+    def __eq__(self, other):
+        assert isinstance(other, Mat3x4), 'Requires a Mat3x4'
+        return self.__matrix == other.__matrix
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    @property
+    def matrix(self):
+        return self.__matrix
+
+    @property
+    def values(self):
+        return tuple(self.__matrix)
+
+    def transform_points(self, buffer, out=None):
+        """ Transforms a flat buffer of xyz points without creating a Vec3 per point.
+            Results are written into out, or back into buffer when out is None.
+        """
+        return _transform_buffer(self.__matrix, 4, buffer, out, 3, 1, False)
+
+    def transform_directions(self, buffer, out=None):
+        # As transform_points, ignoring the translation
+        return _transform_buffer(self.__matrix, 4, buffer, out, 3, 0, False)
+
+    def transform_point(self, vec):
+        assert isinstance(vec, pyclid.vector.Vec3), 'Requires a Vec3'
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = self.__matrix
+        x, y, z = vec.x, vec.y, vec.z
+        return pyclid.vector.Vec3(m0*x + m1*y + m2*z + m3, m4*x + m5*y + m6*z + m7, m8*x + m9*y + m10*z + m11)
+
+    def transform_direction(self, vec):
+        assert isinstance(vec, pyclid.vector.Vec3), 'Requires a Vec3'
+        m0, m1, m2, _, m4, m5, m6, _, m8, m9, m10, _ = self.__matrix
+        x, y, z = vec.x, vec.y, vec.z
+        return pyclid.vector.Vec3(m0*x + m1*y + m2*z, m4*x + m5*y + m6*z, m8*x + m9*y + m10*z)
+
+    def load_zero(self):
+        self.__matrix[:] = (0,)*12
+        return self
+
+    def load_identity(self):
+        self.__matrix[:] = (1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0)
+        return self
+
+    def determinant(self):
+        m0, m1, m2, _, m4, m5, m6, _, m8, m9, m10, _ = self.__matrix
+        return m0*(m5*m10 - m6*m9) - m1*(m4*m10 - m6*m8) + m2*(m4*m9 - m5*m8)
+
+    def inverse(self):
+        return Mat3x4.inverse_into(self, self)
+
+    def inverse_rigid(self):
+        return Mat3x4.inverse_rigid_into(self, self)
+
+    @staticmethod
+    def inverse_into(out, a):
+        """ Inverse of the affine transform, out may be a
+
+            A, t            inv(A), -inv(A)*t
+        """
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = a.__matrix
+        c0 = m5*m10 - m6*m9
+        c1 = m6*m8 - m4*m10
+        c2 = m4*m9 - m5*m8
+        det = m0*c0 + m1*c1 + m2*c2
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        i0, i1, i2 = c0*inv_det, (m2*m9 - m1*m10)*inv_det, (m1*m6 - m2*m5)*inv_det
+        i4, i5, i6 = c1*inv_det, (m0*m10 - m2*m8)*inv_det, (m2*m4 - m0*m6)*inv_det
+        i8, i9, i10 = c2*inv_det, (m1*m8 - m0*m9)*inv_det, (m0*m5 - m1*m4)*inv_det
+        out.__matrix[:] = (i0, i1, i2, -(i0*m3 + i1*m7 + i2*m11),
+                           i4, i5, i6, -(i4*m3 + i5*m7 + i6*m11),
+                           i8, i9, i10, -(i8*m3 + i9*m7 + i10*m11))
+        return out
+
+    @staticmethod
+    def inverse_rigid_into(out, a):
+        # As Mat4.inverse_rigid_into, for a rotation and translation
+        m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11 = a.__matrix
+        out.__matrix[:] = (m0, m4, m8, -(m0*m3 + m4*m7 + m8*m11),
+                           m1, m5, m9, -(m1*m3 + m5*m7 + m9*m11),
+                           m2, m6, m10, -(m2*m3 + m6*m7 + m10*m11))
+        return out
+
+    # self *= transform, touching only the columns that change. Unlike Mat4.translate, translate moves points
+    # by (x, y, z) before the existing transform, as Mat3.translate does in 2D
+    def translate(self, x, y, z):
+        m = self.__matrix
+        m[3] += m[0]*x + m[1]*y + m[2]*z
+        m[7] += m[4]*x + m[5]*y + m[6]*z
+        m[11] += m[8]*x + m[9]*y + m[10]*z
+        return self
+
+    def rotate_x(self, angle):
+        # As Mat4.rotate_x
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 1, 2, cos_angle, sin_angle, -sin_angle)
+        return self
+
+    def rotate_y(self, angle):
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 0, 2, cos_angle, -sin_angle, sin_angle)
+        return self
+
+    def rotate_z(self, angle):
+        cos_angle, sin_angle = _rotation_cos_sin(angle)
+        _rotate_columns(self.__matrix, 4, 0, 1, cos_angle, sin_angle, -sin_angle)
+        return self
+
+    def scale(self, x, y, z):
+        m = self.__matrix
+        for row in (0, 4, 8):
+            m[row] *= x
+            m[row + 1] *= y
+            m[row + 2] *= z
+        return self
+
+
+class MatN:
+    """ Matrix of any rows x cols, row major, e.g. a 6x6 covariance or a 12x6 Jacobian
+
+        Products, addition, subtraction and transpose use kernels generated for the shape, see pyclid.kernels
+    """
+    __slots__ = ('rows', 'cols', '__matrix')
+
+    def __init__(self, rows, cols=None, mat=[]):
+        cols = rows if cols is None else cols
+        assert isinstance(mat, list) and len(mat) <= rows*cols, 'Requires input to be a list and len <= rows*cols'
+        self.rows = rows
+        self.cols = cols
+        # Initialise the matrix to zero
+        self.__matrix = [0]*(rows*cols)
+        self.__matrix[:len(mat)] = mat
+
+    @classmethod
+    def identity(cls, size):
+        return cls(size).load_identity()
+
+    @classmethod
+    def __wrap(cls, rows, cols, values):
+        # Builds a matrix around a list of rows*cols values without copying it
+        mat = cls.__new__(cls)
+        mat.rows = rows
+        mat.cols = cols
+        mat.__matrix = values
         return mat
+
+    @property
+    def size(self):
+        return self.rows*self.cols
+
+    @property
+    def matrix(self):
+        return self.__matrix
+
+    def __mul__(self, other):
+        assert isinstance(other, (int, float, MatN, pyclid.vector.VecN)), 'Requires an int, float, VecN or MatN'
+        if isinstance(other, pyclid.vector.VecN):
+            return MatN.mul_into(pyclid.vector.VecN.zeros(self.rows), self, other)
+        if isinstance(other, MatN):
+            return MatN.mul_into(MatN.__wrap(self.rows, other.cols, [0]*(self.rows*other.cols)), self, other)
+        return MatN.mul_into(MatN.__wrap(self.rows, self.cols, [0]*self.size), self, other)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return MatN.__wrap(self.rows, self.cols, [i/other for i in self.__matrix])
+
+    __truediv__ = __div__
+
+    def __add__(self, other):
+        return MatN.add_into(MatN.__wrap(self.rows, self.cols, [0]*self.size), self, other)
+
+    def __sub__(self, other):
+        return MatN.sub_into(MatN.__wrap(self.rows, self.cols, [0]*self.size), self, other)
+
+    def __imul__(self, other):
+        assert isinstance(other, (int, float, MatN)), 'Requires a int, float, MatN'
+        return MatN.mul_into(self, self, other)
+
+    def __idiv__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        self.__matrix[:] = [i/other for i in self.__matrix]
+        return self
+
+    __itruediv__ = __idiv__
+
+    def __iadd__(self, other):
+        return MatN.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return MatN.sub_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, written into out without allocating a new matrix
+            b can be a MatN (out is a rows x b.cols MatN), a VecN (out is a VecN) or a number. out may be a or b
+        """
+        if isinstance(b, MatN):
+            assert a.cols == b.rows, 'Requires a MatN with ' + str(a.cols) + ' rows'
+            assert out.rows == a.rows and out.cols == b.cols, 'Requires an out MatN of the product shape'
+            out.__matrix[:] = pyclid.kernels.matmul(a.rows, a.cols, b.cols)(a.__matrix, b.__matrix)
+        elif isinstance(b, pyclid.vector.VecN):
+            assert len(b) == a.cols and len(out) == a.rows, 'Requires a VecN of size ' + str(a.cols)
+            out.values[:] = pyclid.kernels.matvec(a.rows, a.cols)(a.__matrix, b.values)
+        else:
+            assert isinstance(b, (int, float)), 'Requires an int, float, VecN or MatN'
+            out.__matrix[:] = map(operator.mul, a.__matrix, repeat(b))
+        return out
+
+    @staticmethod
+    def add_into(out, a, b):
+        assert isinstance(b, MatN) and (a.rows, a.cols) == (b.rows, b.cols), 'Requires a MatN of the same shape'
+        out.__matrix[:] = pyclid.kernels.add(a.size)(a.__matrix, b.__matrix)
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(b, MatN) and (a.rows, a.cols) == (b.rows, b.cols), 'Requires a MatN of the same shape'
+        out.__matrix[:] = pyclid.kernels.sub(a.size)(a.__matrix, b.__matrix)
+        return out
+
+    def __str__(self):
+        max_size = max(len(str(i)) for i in self.__matrix)
+        str_out = ''
+        for j in range(self.rows):
+            row = self.__matrix[j*self.cols:(j + 1)*self.cols]
+            str_out += '| ' + ''.join(str('{:>' + str(max_size) + '}').format(str(i)) + ' ' for i in row) + "|\n"
+        return str_out
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array(self.__matrix, (self.rows, self.cols), dtype, copy)
+
+    def __eq__(self, other):
+        assert isinstance(other, MatN), 'Requires a MatN'
+        return (self.rows, self.cols) == (other.rows, other.cols) and self.__matrix == other.__matrix
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def set_value(self, value, position):
+        # Can take in a 1d position or 2d position
+        coord = position
+        if isinstance(position, list) and len(position) == 2:
+            coord = self.convert_2d(position[0], position[1])
+        self.__matrix[coord] = value
+
+    def convert_2d(self, x, y):
+        # Column x of row y to the 1D position in self.__matrix, as for the fixed size matrices
+        return y*self.cols + x
+
+    def load_identity(self):
+        assert self.rows == self.cols, 'Requires a square matrix'
+        self.__matrix[:] = [0]*self.size
+        self.__matrix[::self.cols + 1] = [1]*self.rows
+        return self
+
+    def load_zero(self):
+        self.__matrix[:] = [0]*self.size
+        return self
+
+    def transpose(self):
+        # In place, a rows x cols matrix becomes cols x rows
+        self.__matrix[:] = pyclid.kernels.transpose(self.rows, self.cols)(self.__matrix)
+        self.rows, self.cols = self.cols, self.rows
+        return self
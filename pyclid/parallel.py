@@ -0,0 +1,141 @@
+""" Parallel buffer transforms over a process pool
+
+    import pyclid.parallel
+    pyclid.parallel.transform_points(mat, points)
+
+The flat point buffer is copied once into a shared memory block and split into chunks of CHUNK_SIZE tuples.
+Each worker is started with the matrix and the name of the block, so tasks only carry (start, stop) offsets
+and no point data is pickled. Workers transform their chunks in place with the same code as
+Mat4.transform_points (including the NumPy backend when it is selected), then the result is copied to out.
+
+Buffers smaller than PARALLEL_THRESHOLD tuples, or a single process, are transformed in process.
+"""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import pyclid.matrix
+
+# Tuples per task
+CHUNK_SIZE = 1 << 18
+# Tuples below which the transform runs in process, where starting workers would cost more than it saves
+PARALLEL_THRESHOLD = 1 << 20
+
+# Worker state, set once per worker by _init_worker
+_worker = {}
+
+
+def _init_worker(name, nbytes, fmt, mat, size, components, w, divide):
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['view'] = shm.buf[:nbytes].cast(fmt)
+    _worker['args'] = (mat, size, components, w, divide)
+
+
+def _transform_chunk(bounds):
+    start, stop = bounds
+    mat, size, components, w, divide = _worker['args']
+    begin = time.perf_counter()
+    pyclid.matrix._transform_buffer(mat, size, _worker['view'][start:stop], None, components, w, divide)
+    return os.getpid(), (stop - start)//components, time.perf_counter() - begin
+
+
+def _cpu_count():
+    # CPUs this process may run on, which can be fewer than os.cpu_count() in containers
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _matrix_size(mat):
+    assert isinstance(mat, (pyclid.matrix.Mat3, pyclid.matrix.Mat4)), 'Requires a Mat3 or Mat4'
+    return 3 if isinstance(mat, pyclid.matrix.Mat3) else 4
+
+
+class ParallelTransform:
+    """ Transforms flat buffers of tuples by a Mat3 or Mat4 over a pool of processes
+
+        After each call stats holds one dict per worker, {'pid', 'chunks', 'points', 'seconds',
+        'points_per_second'}, with seconds the time the worker spent transforming, and the seconds
+        attribute holds the wall time of the call
+    """
+    def __init__(self, processes=None, chunk_size=None, threshold=None):
+        self.processes = processes or _cpu_count()
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.threshold = PARALLEL_THRESHOLD if threshold is None else threshold
+        self.stats = []
+        self.seconds = 0.0
+
+    def transform_points(self, mat, buffer, out=None, components=3, divide=False):
+        # As Mat3/Mat4.transform_points
+        return self.__transform(mat, buffer, out, components, 1, divide)
+
+    def transform_directions(self, mat, buffer, out=None, components=3):
+        # As Mat3/Mat4.transform_directions
+        return self.__transform(mat, buffer, out, components, 0, False)
+
+    def __transform(self, mat, buffer, out, components, w, divide):
+        size = _matrix_size(mat)
+        values = list(mat.values)
+        src = pyclid.matrix._float_view(buffer)
+        dst = src if out is None else pyclid.matrix._float_view(out)
+        assert components in (size - 1, size), 'Requires components of ' + str(size - 1) + ' or ' + str(size)
+        assert not divide or components == size - 1, 'Perspective divide requires homogeneous tuples'
+        assert not dst.readonly, 'Requires a writable buffer, or an out buffer'
+        assert len(src) % components == 0, 'Requires a buffer length that is a multiple of components'
+        assert len(dst) == len(src), 'Requires an out buffer the same length as the input'
+        assert dst.format == src.format, 'Requires an out buffer of the same float type as the input'
+        count = len(src)//components
+        start = time.perf_counter()
+        if self.processes == 1 or count < max(self.threshold, 1):
+            pyclid.matrix._transform_buffer(values, size, src, out, components, w, divide)
+            seconds = time.perf_counter() - start
+            self.stats = [self.__worker_stats(os.getpid(), 1 if count else 0, count, seconds)]
+        else:
+            self.stats = self.__run_pool(values, size, src, dst, components, w, divide)
+        self.seconds = time.perf_counter() - start
+        return buffer if out is None else out
+
+    def __run_pool(self, mat, size, src, dst, components, w, divide):
+        step = self.chunk_size*components
+        chunks = [(i, min(i + step, len(src))) for i in range(0, len(src), step)]
+        nbytes = len(src)*src.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        shared = shm.buf[:nbytes].cast(src.format)
+        workers = {}
+        try:
+            shared[:] = src
+            initargs = (shm.name, nbytes, src.format, mat, size, components, w, divide)
+            processes = min(self.processes, len(chunks))
+            with multiprocessing.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+                for pid, points, seconds in pool.imap_unordered(_transform_chunk, chunks):
+                    chunk_count, total, busy = workers.get(pid, (0, 0, 0.0))
+                    workers[pid] = (chunk_count + 1, total + points, busy + seconds)
+            dst[:] = shared
+        finally:
+            shared.release()
+            shm.close()
+            shm.unlink()
+        return [self.__worker_stats(pid, *workers[pid]) for pid in sorted(workers)]
+
+    @staticmethod
+    def __worker_stats(pid, chunks, points, seconds):
+        return {'pid': pid, 'chunks': chunks, 'points': points, 'seconds': seconds,
+                'points_per_second': points/seconds if seconds else 0.0}
+
+    def report(self):
+        lines = ['{:>8} {:>8} {:>12} {:>10} {:>16}'.format('pid', 'chunks', 'points', 'seconds', 'points/second')]
+        for stats in self.stats:
+            lines.append('{pid:>8} {chunks:>8} {points:>12} {seconds:>10.4f} {points_per_second:>16.0f}'.format(**stats))
+        lines.append('{} points in {:.4f} seconds'.format(sum(stats['points'] for stats in self.stats), self.seconds))
+        return '\n'.join(lines)
+
+
+def transform_points(mat, buffer, out=None, components=3, divide=False, processes=None, chunk_size=None):
+    return ParallelTransform(processes, chunk_size).transform_points(mat, buffer, out, components, divide)
+
+
+def transform_directions(mat, buffer, out=None, components=3, processes=None, chunk_size=None):
+    return ParallelTransform(processes, chunk_size).transform_directions(mat, buffer, out, components)
@@ -1,10 +1,21 @@
 import math
+import operator
+from array import array
+from itertools import chain, repeat
 
+import pyclid.backend
 import pyclid.vector
 import pyclid.matrix
+import pyclid.storage
+
+
+# Above this |dot| the quaternions are treated as parallel and slerp falls back to nlerp
+SLERP_THRESHOLD = 0.9995
 
 
 class Quat:
+    __slots__ = ('q0', 'q1', 'q2', 'q3')
+
     def __init__(self, q0=0, q1=0, q2=0, q3=0):
         self.q0 = q0
         self.q1 = q1
@@ -22,21 +33,17 @@ class Quat:
 
     def __add__(self, other):
         assert isinstance(other, Quat), 'Cannot call addition on a non-Quaternion'
-        self.q0 = self.q0 + other.q0
-        self.q1 = self.q1 + other.q1
-        self.q2 = self.q2 + other.q2
-        self.q3 = self.q3 + other.q3
-
-        return self
+        return Quat(self.q0 + other.q0, self.q1 + other.q1, self.q2 + other.q2, self.q3 + other.q3)
 
     def __sub__(self, other):
         assert isinstance(other, Quat), 'Cannot call subtraction on a non-Quaternion'
-        self.q0 = self.q0 - other.q0
-        self.q1 = self.q1 - other.q1
-        self.q2 = self.q2 - other.q2
-        self.q3 = self.q3 - other.q3
+        return Quat(self.q0 - other.q0, self.q1 - other.q1, self.q2 - other.q2, self.q3 - other.q3)
 
-        return self
+    def __iadd__(self, other):
+        return Quat.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Quat.sub_into(self, self, other)
 
     def __str__(self):
         return '<' + str(self.q0) + ', ' + str(self.q1) + ', ' + str(self.q2) + ', ' + str(self.q3) + '>'
@@ -44,39 +51,78 @@ class Quat:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return pyclid.vector._numpy_array((self.q0, self.q1, self.q2, self.q3), (4,), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 4 values of a float32/float64 buffer, e.g. a numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 4, 'Requires a buffer of at least 4 values'
+        return cls(*view[:4])
+
     def __mul__(self, other):
         assert isinstance(other, (Quat, int, float)), 'Cannot call multiplication on non-Quaternion or non-number'
-
-        if isinstance(other, Quat):
-            # In matrix form
-            # Self
-            # p0, -p1, -p2, -p3
-            # p1, p0, -p3, p2
-            # p2, p3, p0, -p1
-            # p3, -p2, p1, p0
-
-            # multiply by
-            # Other
-            # q0, q1, q2, q3
-
-            mat = pyclid.matrix.Mat4([self.q0, -self.q1, -self.q2, -self.q3,
-                               self.q1,  self.q0, -self.q3,  self.q2,
-                               self.q2,  self.q3,  self.q0, -self.q1,
-                               self.q3, -self.q2,  self.q1,  self.q0])
-            vec = pyclid.vector.Vec4(other.q0, other.q1, other.q2, other.q3)
-
-            quat = mat*vec
-            return Quat(quat.x, quat.y, quat.z, quat.w)
-        else:
-            self.q0 *= other
-            self.q1 *= other
-            self.q2 *= other
-            self.q3 *= other
-        return self
+        return Quat.mul_into(Quat(), self, other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
+    def __imul__(self, other):
+        return Quat.mul_into(self, self, other)
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out
+        assert isinstance(a, Quat) and isinstance(b, Quat), 'Cannot call addition on a non-Quaternion'
+        out.q0 = a.q0 + b.q0
+        out.q1 = a.q1 + b.q1
+        out.q2 = a.q2 + b.q2
+        out.q3 = a.q3 + b.q3
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Quat) and isinstance(b, Quat), 'Cannot call subtraction on a non-Quaternion'
+        out.q0 = a.q0 - b.q0
+        out.q1 = a.q1 - b.q1
+        out.q2 = a.q2 - b.q2
+        out.q3 = a.q3 - b.q3
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b, where b is a Quat or a number. out may be a or b
+
+            The quaternion product, with q0 as the real part, in matrix form is
+            p0, -p1, -p2, -p3     q0
+            p1,  p0, -p3,  p2  *  q1
+            p2,  p3,  p0, -p1     q2
+            p3, -p2,  p1,  p0     q3
+        """
+        if isinstance(b, Quat):
+            p0, p1, p2, p3 = a.q0, a.q1, a.q2, a.q3
+            q0, q1, q2, q3 = b.q0, b.q1, b.q2, b.q3
+            out.q0 = p0*q0 - p1*q1 - p2*q2 - p3*q3
+            out.q1 = p1*q0 + p0*q1 - p3*q2 + p2*q3
+            out.q2 = p2*q0 + p3*q1 + p0*q2 - p1*q3
+            out.q3 = p3*q0 - p2*q1 + p1*q2 + p0*q3
+        else:
+            assert isinstance(b, (int, float)), 'Cannot call multiplication on non-Quaternion or non-number'
+            out.q0 = a.q0*b
+            out.q1 = a.q1*b
+            out.q2 = a.q2*b
+            out.q3 = a.q3*b
+        return out
+
     def __abs__(self):
         return math.sqrt(self.q0**2 + self.q1**2 + self.q2**2 + self.q3**2)
 
@@ -98,3 +144,273 @@ class Quat:
     # Consider rename - normalize is similar to norm, but returns a unit quaternion
     def normalize(self):
         return self.unit()
+
+    @staticmethod
+    def nlerp(a, b, t):
+        # Normalized linear interpolation along the shortest path
+        if a.q0*b.q0 + a.q1*b.q1 + a.q2*b.q2 + a.q3*b.q3 < 0:
+            t = -t
+        s = 1.0 - abs(t)
+        return Quat(a.q0*s + b.q0*t, a.q1*s + b.q1*t, a.q2*s + b.q2*t, a.q3*s + b.q3*t).unit()
+
+    @staticmethod
+    def slerp(a, b, t):
+        # Spherical linear interpolation between unit quaternions, along the shortest path
+        dot = a.q0*b.q0 + a.q1*b.q1 + a.q2*b.q2 + a.q3*b.q3
+        sign = -1.0 if dot < 0 else 1.0
+        dot = abs(dot)
+        if dot > SLERP_THRESHOLD:
+            return Quat.nlerp(a, b, t)
+        theta = math.acos(dot)
+        inv_sin = 1.0/math.sin(theta)
+        wa = math.sin((1.0 - t)*theta)*inv_sin
+        wb = math.sin(t*theta)*inv_sin*sign
+        return Quat(a.q0*wa + b.q0*wb, a.q1*wa + b.q1*wb, a.q2*wa + b.q2*wb, a.q3*wa + b.q3*wb)
+
+    def conjugate(self):
+        self.q1 = -self.q1
+        self.q2 = -self.q2
+        self.q3 = -self.q3
+        return self
+
+    def inverse(self):
+        norm_sq = self.q0*self.q0 + self.q1*self.q1 + self.q2*self.q2 + self.q3*self.q3
+        assert norm_sq != 0, 'Cannot invert a zero quaternion'
+        self.q0 /= norm_sq
+        self.q1 /= -norm_sq
+        self.q2 /= -norm_sq
+        self.q3 /= -norm_sq
+        return self
+
+    @classmethod
+    def from_axis_angle(cls, axis, angle):
+        # Rotation of angle radians about axis, axis is normalized here
+        assert isinstance(axis, pyclid.vector.Vec3), 'Requires a Vec3 axis'
+        mag = axis.magnitude()
+        assert mag, 'Requires a non-zero axis'
+        s = math.sin(angle/2.0)/mag
+        return cls(math.cos(angle/2.0), axis.x*s, axis.y*s, axis.z*s)
+
+    @classmethod
+    def from_euler(cls, x, y, z):
+        """ Rotation about the x axis, then y, then z (radians)
+
+            Equal to from_axis_angle(z)*from_axis_angle(y)*from_axis_angle(x) without the products
+        """
+        cx, sx = math.cos(x/2.0), math.sin(x/2.0)
+        cy, sy = math.cos(y/2.0), math.sin(y/2.0)
+        cz, sz = math.cos(z/2.0), math.sin(z/2.0)
+        return cls(cx*cy*cz + sx*sy*sz,
+                   sx*cy*cz - cx*sy*sz,
+                   cx*sy*cz + sx*cy*sz,
+                   cx*cy*sz - sx*sy*cz)
+
+    def rotate(self, vec):
+        # Rotates a Vec3 by this unit quaternion, returning a new Vec3
+        return Quat.rotate_into(pyclid.vector.Vec3(), self, vec)
+
+    @staticmethod
+    def rotate_into(out, q, vec):
+        """ out = q*vec*conjugate(q) for a unit quaternion q, out may be vec
+
+            Uses the expanded sandwich product, with u = (q1, q2, q3)
+            t = 2*cross(u, vec)
+            out = vec + q0*t + cross(u, t)
+        """
+        assert isinstance(vec, pyclid.vector.Vec3), 'Requires a Vec3'
+        w, x, y, z = q.q0, q.q1, q.q2, q.q3
+        vx, vy, vz = vec.x, vec.y, vec.z
+        tx = 2.0*(y*vz - z*vy)
+        ty = 2.0*(z*vx - x*vz)
+        tz = 2.0*(x*vy - y*vx)
+        out.x = vx + w*tx + (y*tz - z*ty)
+        out.y = vy + w*ty + (z*tx - x*tz)
+        out.z = vz + w*tz + (x*ty - y*tx)
+        return out
+
+    def __rotation_values(self):
+        # Row-major 3x3 rotation for a unit quaternion, so that to_mat3()*vec == rotate(vec)
+        w, x, y, z = self.q0, self.q1, self.q2, self.q3
+        x2, y2, z2 = x + x, y + y, z + z
+        xx, yy, zz = x*x2, y*y2, z*z2
+        xy, xz, yz = x*y2, x*z2, y*z2
+        wx, wy, wz = w*x2, w*y2, w*z2
+        return (1.0 - (yy + zz), xy - wz, xz + wy,
+                xy + wz, 1.0 - (xx + zz), yz - wx,
+                xz - wy, yz + wx, 1.0 - (xx + yy))
+
+    def to_mat3(self):
+        return pyclid.matrix.Mat3(list(self.__rotation_values()))
+
+    def to_mat4(self):
+        r0, r1, r2, r3, r4, r5, r6, r7, r8 = self.__rotation_values()
+        return pyclid.matrix.Mat4([r0, r1, r2, 0,
+                                   r3, r4, r5, 0,
+                                   r6, r7, r8, 0,
+                                   0, 0, 0, 1])
+
+
+class QuatArray(pyclid.vector._VecArray):
+    """ Contiguous array of Quat, stored planar
+
+        [q0_0, .. q0_n-1, q1_0, .. q1_n-1, q2_0, .. q2_n-1, q3_0, .. q3_n-1]
+
+        Addition, subtraction, scale, dot, magnitude and normalize behave as for the vector arrays,
+        multiplication by a QuatArray or Quat is the element wise quaternion product
+    """
+    __slots__ = ()
+
+    dim = 4
+    components = ('q0', 'q1', 'q2', 'q3')
+    vec_type = Quat
+
+    def __mul__(self, other):
+        assert isinstance(other, (QuatArray, Quat, int, float)), 'Requires a QuatArray, Quat, int or float'
+        return QuatArray.mul_into(QuatArray.zeros(len(self)), self, other)
+
+    def __rmul__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return self.__mul__(other)
+
+    def __imul__(self, other):
+        return QuatArray.mul_into(self, self, other)
+
+    @staticmethod
+    def mul_into(out, a, b):
+        """ out = a*b element wise, where b is a QuatArray, a Quat applied to every element, or a number
+        """
+        if isinstance(b, (int, float)):
+            return pyclid.vector._VecArray.mul_into(out, a, b)
+        assert isinstance(out, QuatArray) and len(out) == len(a), 'Requires a QuatArray of the same length'
+        assert isinstance(b, Quat) or (isinstance(b, QuatArray) and len(b) == len(a)), \
+            'Requires a Quat or a QuatArray of the same length'
+        if pyclid.backend.use_numpy(len(a)):
+            values = (b.q0, b.q1, b.q2, b.q3) if isinstance(b, Quat) else b.data
+            pyclid.backend.quat_mul_into(out.data, a.data, values, len(a))
+            return out
+        if isinstance(b, Quat):
+            q0, q1, q2, q3 = b.q0, b.q1, b.q2, b.q3
+            r0 = [p0*q0 - p1*q1 - p2*q2 - p3*q3 for p0, p1, p2, p3 in zip(*a.columns())]
+            r1 = [p1*q0 + p0*q1 - p3*q2 + p2*q3 for p0, p1, p2, p3 in zip(*a.columns())]
+            r2 = [p2*q0 + p3*q1 + p0*q2 - p1*q3 for p0, p1, p2, p3 in zip(*a.columns())]
+            r3 = [p3*q0 - p2*q1 + p1*q2 + p0*q3 for p0, p1, p2, p3 in zip(*a.columns())]
+        else:
+            values = list(zip(*(a.columns() + b.columns())))
+            r0 = [p0*q0 - p1*q1 - p2*q2 - p3*q3 for p0, p1, p2, p3, q0, q1, q2, q3 in values]
+            r1 = [p1*q0 + p0*q1 - p3*q2 + p2*q3 for p0, p1, p2, p3, q0, q1, q2, q3 in values]
+            r2 = [p2*q0 + p3*q1 + p0*q2 - p1*q3 for p0, p1, p2, p3, q0, q1, q2, q3 in values]
+            r3 = [p3*q0 - p2*q1 + p1*q2 + p0*q3 for p0, p1, p2, p3, q0, q1, q2, q3 in values]
+        out.data[:] = array('d', chain(r0, r1, r2, r3))
+        return out
+
+    def conjugate(self):
+        n = len(self)
+        self.data[n:] = array('d', map(operator.neg, self.data[n:]))
+        return self
+
+    def rotate(self, vecs):
+        # Rotates each Vec3 in a Vec3Array by the matching unit quaternion, returning a new Vec3Array
+        return QuatArray.rotate_into(pyclid.vector.Vec3Array.zeros(len(vecs)), self, vecs)
+
+    @staticmethod
+    def rotate_into(out, quats, vecs):
+        """ out = q*v*conjugate(q) for each pair, using the same expanded sandwich product as Quat.rotate_into
+            out may be vecs
+        """
+        assert isinstance(vecs, pyclid.vector.Vec3Array) and len(vecs) == len(quats), \
+            'Requires a Vec3Array of the same length'
+        if pyclid.backend.use_numpy(len(quats)):
+            pyclid.backend.quat_rotate_into(out.data, quats.data, vecs.data, len(quats))
+            return out
+        xs = []
+        ys = []
+        zs = []
+        for w, x, y, z, vx, vy, vz in zip(*(quats.columns() + vecs.columns())):
+            tx = 2.0*(y*vz - z*vy)
+            ty = 2.0*(z*vx - x*vz)
+            tz = 2.0*(x*vy - y*vx)
+            xs.append(vx + w*tx + (y*tz - z*ty))
+            ys.append(vy + w*ty + (z*tx - x*tz))
+            zs.append(vz + w*tz + (x*ty - y*tx))
+        out.data[:] = array('d', chain(xs, ys, zs))
+        return out
+
+    @staticmethod
+    def nlerp(a, b, t):
+        # t is a number, or a sequence with one value per element
+        return QuatSlerp(a, b, threshold=-1.0).sample(t)
+
+    @staticmethod
+    def slerp(a, b, t):
+        # t is a number, or a sequence with one value per element
+        return QuatSlerp(a, b).sample(t)
+
+
+class QuatSlerp:
+    """ Interpolates between two keyframe QuatArrays of unit quaternions
+
+        The shortest path sign and the angle between each pair are computed once, so sampling
+        repeatedly between the same keys only costs the sin weights and one pass over the data.
+        Pairs with |dot| above threshold are nearly parallel and use nlerp instead
+    """
+    __slots__ = ('a', 'b', '_theta', '_inv_sin', '_nlerp')
+
+    def __init__(self, a, b, threshold=SLERP_THRESHOLD):
+        assert isinstance(a, QuatArray) and isinstance(b, QuatArray), 'Requires a QuatArray'
+        assert len(a) == len(b), 'Requires arrays of the same length'
+        dots = a.dot(b)
+        signs = array('d', [-1.0 if dot < 0 else 1.0 for dot in dots])
+        self.a = a
+        # b is flipped where needed so every pair interpolates along the shortest path
+        self.b = QuatArray._wrap(array('d', map(operator.mul, b.data, signs*4)), len(b))
+        self._theta = array('d', [0.0])*len(a)
+        self._inv_sin = array('d', [0.0])*len(a)
+        self._nlerp = []
+        for i, dot in enumerate(dots):
+            dot = abs(dot)
+            if dot > threshold:
+                self._nlerp.append(i)
+            else:
+                theta = math.acos(dot)
+                self._theta[i] = theta
+                self._inv_sin[i] = 1.0/math.sin(theta)
+
+    def __weights(self, t):
+        # Slerp weights sin((1 - t)*theta)/sin(theta) and sin(t*theta)/sin(theta), then linear weights for nlerp pairs
+        n = len(self.a)
+        if isinstance(t, (int, float)):
+            ts = [t]*n
+            a_angles = map(operator.mul, self._theta, repeat(1.0 - t))
+            b_angles = map(operator.mul, self._theta, repeat(t))
+        else:
+            assert len(t) == n, 'Requires one t value per element'
+            ts = t
+            a_angles = map(operator.mul, self._theta, map(operator.sub, repeat(1.0), ts))
+            b_angles = map(operator.mul, self._theta, ts)
+        wa = array('d', map(operator.mul, map(math.sin, a_angles), self._inv_sin))
+        wb = array('d', map(operator.mul, map(math.sin, b_angles), self._inv_sin))
+        for i in self._nlerp:
+            wa[i] = 1.0 - ts[i]
+            wb[i] = ts[i]
+        return wa, wb
+
+    def sample(self, t):
+        return self.sample_into(QuatArray.zeros(len(self.a)), t)
+
+    def sample_into(self, out, t):
+        # t is a number, or a sequence with one value per element
+        assert isinstance(out, QuatArray) and len(out) == len(self.a), 'Requires a QuatArray of the same length'
+        wa, wb = self.__weights(t)
+        # Each per element weight is repeated for the 4 planar components
+        a_part = map(operator.mul, self.a.data, wa*4)
+        b_part = map(operator.mul, self.b.data, wb*4)
+        out.data[:] = array('d', map(operator.add, a_part, b_part))
+        # Only the nlerp results need normalizing
+        n = len(out)
+        for i in self._nlerp:
+            q = out.data[i::n]
+            mag = math.sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2] + q[3]*q[3])
+            if mag:
+                out.data[i::n] = array('d', [value/mag for value in q])
+        return out
+
@@ -0,0 +1,172 @@
+""" Transform hierarchy with incremental world matrix updates
+
+    import pyclid.scene
+    scene = pyclid.scene.TransformHierarchy()
+    root = scene.add()
+    arm = scene.add(root, translation=pyclid.Vec3(0, 1, 0))
+    scene.set_rotation(root, pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 1, 0), angle))
+    for start, stop in scene.changed_ranges(scene.update()):
+        upload(scene.world_values()[16*start:16*stop])
+
+Nodes are indices. Their local translation, rotation (a unit Quat) and scale, parent and world matrix are kept in
+flat arrays, with no node objects. A parent is always added before its children, so index order is a topological
+order of the hierarchy.
+
+Setting a local transform marks the node dirty. update() marks the subtrees under the dirty nodes, then recomputes
+the world matrices of those nodes only, in index order so every parent is done before its children, and returns
+their indices. A frame where a few nodes move costs a few world matrices rather than the whole hierarchy.
+"""
+from array import array
+
+import pyclid.matrix
+import pyclid.quaternion
+import pyclid.vector
+
+
+class TransformHierarchy:
+    """ Nodes with a local translation, rotation and scale, and a world matrix of parent world * T*R*S
+
+        World matrices are row major Mat4 values, 16 floats per node in world_values()
+    """
+    def __init__(self):
+        self.__parents = array('q')
+        self.__children = []
+        self.__translations = array('d')
+        self.__rotations = array('d')
+        self.__scales = array('d')
+        self.__worlds = array('d')
+        self.__dirty = bytearray()
+        # Dirty nodes since the last update
+        self.__pending = []
+        self.changed = []
+
+    def __len__(self):
+        return len(self.__parents)
+
+    def add(self, parent=-1, translation=None, rotation=None, scale=None):
+        """ Adds a node under parent (-1 for a root) and returns its index
+        """
+        index = len(self.__parents)
+        assert -1 <= parent < index, 'Requires the index of an existing parent, or -1'
+        self.__parents.append(parent)
+        self.__children.append([])
+        if parent >= 0:
+            self.__children[parent].append(index)
+        self.__translations.extend((0.0, 0.0, 0.0) if translation is None else
+                                   (translation.x, translation.y, translation.z))
+        self.__rotations.extend((1.0, 0.0, 0.0, 0.0) if rotation is None else
+                                (rotation.q0, rotation.q1, rotation.q2, rotation.q3))
+        self.__scales.extend((1.0, 1.0, 1.0) if scale is None else (scale.x, scale.y, scale.z))
+        self.__worlds.extend((1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0))
+        self.__dirty.append(0)
+        self.__mark(index)
+        return index
+
+    def parent(self, index):
+        return self.__parents[index]
+
+    def children(self, index):
+        return list(self.__children[index])
+
+    def __mark(self, index):
+        if not self.__dirty[index]:
+            self.__dirty[index] = 1
+            self.__pending.append(index)
+
+    def is_dirty(self, index):
+        # True when the node has changed since the last update, not counting changes above it
+        return bool(self.__dirty[index])
+
+    def set_translation(self, index, x, y, z):
+        self.__translations[3*index:3*index + 3] = array('d', (x, y, z))
+        self.__mark(index)
+
+    def set_rotation(self, index, quat):
+        assert isinstance(quat, pyclid.quaternion.Quat), 'Requires a Quat'
+        self.__rotations[4*index:4*index + 4] = array('d', (quat.q0, quat.q1, quat.q2, quat.q3))
+        self.__mark(index)
+
+    def set_scale(self, index, x, y, z):
+        self.__scales[3*index:3*index + 3] = array('d', (x, y, z))
+        self.__mark(index)
+
+    def translation(self, index):
+        return pyclid.vector.Vec3(*self.__translations[3*index:3*index + 3])
+
+    def rotation(self, index):
+        return pyclid.quaternion.Quat(*self.__rotations[4*index:4*index + 4])
+
+    def scale(self, index):
+        return pyclid.vector.Vec3(*self.__scales[3*index:3*index + 3])
+
+    def world(self, index):
+        # The world matrix as of the last update, as a new Mat4
+        return pyclid.matrix.Mat4(self.__worlds[16*index:16*index + 16].tolist())
+
+    def world_values(self):
+        """ Memoryview of every world matrix, 16 floats per node. The hierarchy can't grow while it is held
+        """
+        return memoryview(self.__worlds)
+
+    def update(self):
+        """ Recomputes the world matrices of the dirty nodes and their descendants,
+            returns their indices in ascending order, also kept as changed
+        """
+        dirty = self.__dirty
+        children = self.__children
+        changed = []
+        stack = self.__pending
+        # Pending nodes are already marked, so a subtree under two pending nodes is only walked once
+        while stack:
+            index = stack.pop()
+            changed.append(index)
+            for child in children[index]:
+                if not dirty[child]:
+                    dirty[child] = 1
+                    stack.append(child)
+        changed.sort()
+        for index in changed:
+            self.__update_world(index)
+            dirty[index] = 0
+        self.changed = changed
+        return changed
+
+    def __update_world(self, index):
+        # world = parent world * T*R*S, both affine so the bottom rows are left as 0, 0, 0, 1
+        tx, ty, tz = self.__translations[3*index:3*index + 3]
+        w, x, y, z = self.__rotations[4*index:4*index + 4]
+        sx, sy, sz = self.__scales[3*index:3*index + 3]
+        # Rotation as in Quat.to_mat3, with column j scaled by the scale on axis j
+        x2, y2, z2 = x + x, y + y, z + z
+        xx, yy, zz = x*x2, y*y2, z*z2
+        xy, xz, yz = x*y2, x*z2, y*z2
+        wx, wy, wz = w*x2, w*y2, w*z2
+        l0, l1, l2 = (1.0 - (yy + zz))*sx, (xy - wz)*sy, (xz + wy)*sz
+        l4, l5, l6 = (xy + wz)*sx, (1.0 - (xx + zz))*sy, (yz - wx)*sz
+        l8, l9, l10 = (xz - wy)*sx, (yz + wx)*sy, (1.0 - (xx + yy))*sz
+        worlds = self.__worlds
+        parent = self.__parents[index]
+        o = 16*index
+        if parent < 0:
+            worlds[o:o + 12] = array('d', (l0, l1, l2, tx, l4, l5, l6, ty, l8, l9, l10, tz))
+            return
+        p0, p1, p2, p3, p4, p5, p6, p7, p8, p9, p10, p11 = worlds[16*parent:16*parent + 12]
+        worlds[o:o + 12] = array('d', (p0*l0 + p1*l4 + p2*l8, p0*l1 + p1*l5 + p2*l9, p0*l2 + p1*l6 + p2*l10,
+                                       p0*tx + p1*ty + p2*tz + p3,
+                                       p4*l0 + p5*l4 + p6*l8, p4*l1 + p5*l5 + p6*l9, p4*l2 + p5*l6 + p6*l10,
+                                       p4*tx + p5*ty + p6*tz + p7,
+                                       p8*l0 + p9*l4 + p10*l8, p8*l1 + p9*l5 + p10*l9, p8*l2 + p9*l6 + p10*l10,
+                                       p8*tx + p9*ty + p10*tz + p11))
+
+    @staticmethod
+    def changed_ranges(indices):
+        """ Sorted indices coalesced into [start, stop) ranges, e.g. for uploading changed world matrices
+            as a few contiguous blocks
+        """
+        ranges = []
+        for index in indices:
+            if ranges and ranges[-1][1] == index:
+                ranges[-1][1] = index + 1
+            else:
+                ranges.append([index, index + 1])
+        return [tuple(r) for r in ranges]
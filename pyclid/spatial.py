@@ -0,0 +1,492 @@
+""" Spatial indexes over Vec2/Vec3 points
+
+Points can be given as a sequence of Vec2/Vec3, a Vec2Array/Vec3Array, or a flat float32/float64 buffer of
+xy or xyz tuples with dim=2 or dim=3. Points are identified by their position in the input.
+"""
+import heapq
+import math
+from array import array
+
+import pyclid.matrix
+import pyclid.vector
+
+
+def _columns(points, dim=None):
+    """ Returns (dim, [xs, ys(, zs)]) as lists of floats, for any of the accepted point inputs
+    """
+    if isinstance(points, pyclid.vector._VecArray):
+        assert points.dim in (2, 3), 'Requires a Vec2Array or Vec3Array'
+        return points.dim, [column.tolist() for column in points.columns()]
+    try:
+        view = pyclid.matrix._float_view(points)
+    except TypeError:
+        view = None
+    if view is not None:
+        assert dim in (2, 3), 'Requires dim=2 or dim=3 for a flat buffer'
+        assert len(view) % dim == 0, 'Requires a buffer length that is a multiple of dim'
+        return dim, [view[c::dim].tolist() for c in range(dim)]
+    points = list(points)
+    if dim is None:
+        dim = len(points[0]) if points else 3
+    assert dim in (2, 3), 'Requires Vec2 or Vec3 points'
+    return dim, [[getattr(point, name) for point in points] for name in ('x', 'y', 'z')[:dim]]
+
+
+def _point_dim(point):
+    # 2 or 3, for a Vec2/Vec3 or a sequence of coordinates
+    if hasattr(point, 'x'):
+        return 3 if hasattr(point, 'z') else 2
+    return 3 if len(point) > 2 else 2
+
+
+def _has_dim(points):
+    # True for point inputs that carry their dimension, unlike a flat buffer
+    if isinstance(points, pyclid.vector._VecArray):
+        return True
+    try:
+        pyclid.matrix._float_view(points)
+    except TypeError:
+        return True
+    return False
+
+
+def _query_point(point, dim):
+    # (x, y, z) of a Vec2/Vec3 or a sequence of coordinates, z is 0 in 2D
+    if hasattr(point, 'x'):
+        return (point.x, point.y, point.z if dim == 3 else 0.0)
+    return (point[0], point[1], point[2] if dim == 3 else 0.0)
+
+
+def _query_points(points, dim):
+    query_dim, columns = _columns(points, dim)
+    assert dim is None or query_dim == dim, 'Requires query points of the index dimension'
+    return zip(*columns)
+
+
+class KDTree:
+    """ k-d tree for nearest neighbour and radius queries over Vec2/Vec3 points
+
+        The tree is balanced and implicit: the points are reordered so that the node of a range [lo, hi)
+        is at (lo + hi)//2, with its left subtree in [lo, mid) and right subtree in [mid + 1, hi).
+        Ranges of at most LEAF_SIZE points are leaves, scanned linearly. Coordinates are kept in one array('d')
+        per axis, with the split axis of each node in a bytearray, so there are no node objects. Queries compare
+        squared distances and only take the square root of the distances returned.
+
+        insert() adds points to a pending list that queries scan linearly, and the tree is rebuilt
+        once the pending points pass REBUILD_FRACTION of the tree. A tree built empty without dim takes
+        the dimension of the first point inserted
+    """
+    LEAF_SIZE = 8
+    REBUILD_FRACTION = 0.25
+    REBUILD_MIN = 64
+
+    def __init__(self, points=(), dim=None):
+        self.dim, columns = _columns(points, dim)
+        # dim is only a default until the first insert
+        self.__infer_dim = dim is None and not columns[0]
+        self.__build(columns)
+
+    def __query_dim(self, point):
+        return _point_dim(point) if self.__infer_dim else self.dim
+
+    def __len__(self):
+        return len(self.__index) + len(self.__pending)
+
+    def __build(self, columns):
+        """ Bulk build in O(N log N)
+
+            The indices are sorted once along each axis. Each node splits at the median of the sorted list of
+            its widest axis, and the other sorted lists are partitioned stably in O(n), so they stay sorted
+        """
+        n = len(columns[0])
+        leaf_size = max(1, self.LEAF_SIZE)
+        order = [0]*n
+        axes = bytearray(n)
+        stack = [(0, n, [sorted(range(n), key=column.__getitem__) for column in columns])]
+        while stack:
+            lo, hi, lists = stack.pop()
+            count = hi - lo
+            if count <= leaf_size:
+                order[lo:hi] = lists[0]
+                continue
+            axis = max(range(self.dim), key=lambda a: columns[a][lists[a][-1]] - columns[a][lists[a][0]])
+            m = count//2
+            mid = lo + m
+            split = lists[axis]
+            order[mid] = split[m]
+            axes[mid] = axis
+            left_set = set(split[:m])
+            right_set = set(split[m + 1:])
+            left = []
+            right = []
+            for a, indices in enumerate(lists):
+                if a == axis:
+                    left.append(split[:m])
+                    right.append(split[m + 1:])
+                else:
+                    left.append(list(filter(left_set.__contains__, indices)))
+                    right.append(list(filter(right_set.__contains__, indices)))
+            stack.append((lo, mid, left))
+            stack.append((mid + 1, hi, right))
+
+        self.__leaf_size = leaf_size
+        self.__index = array('q', order)
+        self.__axes = axes
+        self.__coords = [array('d', [column[i] for i in order]) for column in columns]
+        if self.dim == 2:
+            self.__coords.append(array('d', [0.0])*n)
+        self.__pending = []
+
+    def rebuild(self):
+        # Builds the tree again with the pending points included
+        n = len(self)
+        columns = [[0.0]*n for a in range(self.dim)]
+        for a in range(self.dim):
+            column = columns[a]
+            for i, value in zip(self.__index, self.__coords[a]):
+                column[i] = value
+            for pending in self.__pending:
+                column[pending[0]] = pending[1 + a]
+        self.__build(columns)
+
+    def insert(self, point):
+        # Adds a point, returning its index
+        if self.__infer_dim:
+            self.dim = _point_dim(point)
+            self.__infer_dim = False
+            self.__build([[] for a in range(self.dim)])
+        index = len(self)
+        self.__pending.append((index,) + _query_point(point, self.dim))
+        if len(self.__pending) > max(self.REBUILD_MIN, self.REBUILD_FRACTION*len(self.__index)):
+            self.rebuild()
+        return index
+
+    def nearest(self, point, k=1):
+        """ The k nearest points as a list of (index, distance), nearest first
+        """
+        q = _query_point(point, self.__query_dim(point))
+        qx, qy, qz = q
+        xs, ys, zs = coords = self.__coords
+        axes = self.__axes
+        index = self.__index
+        leaf_size = self.__leaf_size
+        # Max heap of (-squared distance, index) holding the best k so far
+        heap = []
+        worst = math.inf
+        stack = [(0, len(index), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= worst:
+                continue
+            while lo < hi:
+                if hi - lo <= leaf_size:
+                    for j in range(lo, hi):
+                        dx = qx - xs[j]
+                        dy = qy - ys[j]
+                        dz = qz - zs[j]
+                        d2 = dx*dx + dy*dy + dz*dz
+                        if d2 < worst:
+                            if len(heap) < k:
+                                heapq.heappush(heap, (-d2, index[j]))
+                            else:
+                                heapq.heapreplace(heap, (-d2, index[j]))
+                            if len(heap) == k:
+                                worst = -heap[0][0]
+                    break
+                mid = (lo + hi) >> 1
+                dx = qx - xs[mid]
+                dy = qy - ys[mid]
+                dz = qz - zs[mid]
+                d2 = dx*dx + dy*dy + dz*dz
+                if d2 < worst:
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, index[mid]))
+                    else:
+                        heapq.heapreplace(heap, (-d2, index[mid]))
+                    if len(heap) == k:
+                        worst = -heap[0][0]
+                axis = axes[mid]
+                diff = q[axis] - coords[axis][mid]
+                if diff < 0:
+                    if diff*diff < worst:
+                        stack.append((mid + 1, hi, diff*diff))
+                    hi = mid
+                else:
+                    if diff*diff < worst:
+                        stack.append((lo, mid, diff*diff))
+                    lo = mid + 1
+        for i, x, y, z in self.__pending:
+            d2 = (qx - x)**2 + (qy - y)**2 + (qz - z)**2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, i))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, i))
+        return [(i, math.sqrt(-d2)) for d2, i in sorted(heap, reverse=True)]
+
+    def within(self, point, radius):
+        """ Indices of the points within radius (inclusive), in index order
+        """
+        q = _query_point(point, self.__query_dim(point))
+        qx, qy, qz = q
+        xs, ys, zs = coords = self.__coords
+        axes = self.__axes
+        index = self.__index
+        leaf_size = self.__leaf_size
+        r2 = radius*radius
+        found = []
+        stack = [(0, len(index))]
+        while stack:
+            lo, hi = stack.pop()
+            while lo < hi:
+                if hi - lo <= leaf_size:
+                    for j in range(lo, hi):
+                        dx = qx - xs[j]
+                        dy = qy - ys[j]
+                        dz = qz - zs[j]
+                        if dx*dx + dy*dy + dz*dz <= r2:
+                            found.append(index[j])
+                    break
+                mid = (lo + hi) >> 1
+                dx = qx - xs[mid]
+                dy = qy - ys[mid]
+                dz = qz - zs[mid]
+                if dx*dx + dy*dy + dz*dz <= r2:
+                    found.append(index[mid])
+                axis = axes[mid]
+                diff = q[axis] - coords[axis][mid]
+                if diff < 0:
+                    if diff*diff <= r2:
+                        stack.append((mid + 1, hi))
+                    hi = mid
+                else:
+                    if diff*diff <= r2:
+                        stack.append((lo, mid))
+                    lo = mid + 1
+        found.extend(i for i, x, y, z in self.__pending if (qx - x)**2 + (qy - y)**2 + (qz - z)**2 <= r2)
+        found.sort()
+        return found
+
+    def nearest_batch(self, points, k=1):
+        # nearest for every query point, points in any of the accepted point inputs
+        return [self.nearest(q, k) for q in _query_points(points, self.__batch_dim(points))]
+
+    def within_batch(self, points, radius):
+        return [self.within(q, radius) for q in _query_points(points, self.__batch_dim(points))]
+
+    def __batch_dim(self, points):
+        return None if self.__infer_dim and _has_dim(points) else self.dim
+
+
+def _cell_offsets(reach, dim, forward=False):
+    """ Cell offsets (dx, dy, dz) within reach cells, dz is 0 in 2D
+        forward only keeps the offsets after (0, 0, 0), so each pair of cells is visited once
+    """
+    z_reach = reach if dim == 3 else 0
+    offsets = [(dx, dy, dz) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)
+               for dz in range(-z_reach, z_reach + 1)]
+    if forward:
+        return [offset for offset in offsets if offset > (0, 0, 0)]
+    return offsets
+
+
+class HashGrid:
+    """ Uniform grid hashing Vec2/Vec3 points to cells of cell_size, for neighbours within a fixed radius
+
+        Each cell is a dict entry keyed on the quantized (x, y, z) of its points (z is 0 in 2D), holding
+        a set of point ids, so insert, remove and update are O(1) expected. Queries visit the cells
+        within the radius, best when the radius is close to cell_size.
+
+        Points passed to the constructor get the ids 0..n-1, in input order, and insert returns the next id.
+        A grid built empty without dim takes the dimension of the first points inserted
+    """
+    def __init__(self, cell_size, points=(), dim=None):
+        assert cell_size > 0, 'Requires a cell_size > 0'
+        self.cell_size = cell_size
+        self.__inv = 1.0/cell_size
+        # cell key -> set of ids
+        self.__cells = {}
+        # id -> (x, y, z, cell key)
+        self.__points = {}
+        self.__next = 0
+        self.dim, columns = _columns(points, dim)
+        # dim is only a default until the first insert
+        self.__infer_dim = dim is None and not columns[0]
+        self.__insert_columns(columns)
+
+    def __len__(self):
+        return len(self.__points)
+
+    def __contains__(self, id):
+        return id in self.__points
+
+    def __key(self, x, y, z):
+        inv = self.__inv
+        return (math.floor(x*inv), math.floor(y*inv), math.floor(z*inv))
+
+    def __insert_columns(self, columns):
+        start = self.__next
+        if self.dim == 2:
+            columns = columns + [[0.0]*len(columns[0])]
+        cells = self.__cells
+        points = self.__points
+        for id, (x, y, z) in enumerate(zip(*columns), start):
+            key = self.__key(x, y, z)
+            points[id] = (x, y, z, key)
+            if key in cells:
+                cells[key].add(id)
+            else:
+                cells[key] = {id}
+        self.__next = start + len(columns[0])
+        return range(start, self.__next)
+
+    def __query_dim(self, point):
+        return _point_dim(point) if self.__infer_dim else self.dim
+
+    def insert(self, point):
+        # Adds a Vec2/Vec3 (or coordinate sequence), returning its id
+        if self.__infer_dim:
+            self.dim = _point_dim(point)
+            self.__infer_dim = False
+        return self.__insert_columns([[value] for value in _query_point(point, self.dim)[:self.dim]])[0]
+
+    def insert_many(self, points):
+        # Adds points in any of the accepted point inputs, returning the range of their ids
+        if self.__infer_dim and _has_dim(points):
+            dim, columns = _columns(points)
+            if not columns[0]:
+                return range(self.__next, self.__next)
+            self.dim = dim
+            self.__infer_dim = False
+        else:
+            dim, columns = _columns(points, self.dim)
+        assert dim == self.dim, 'Requires points of the grid dimension'
+        return self.__insert_columns(columns)
+
+    def remove(self, id):
+        key = self.__points.pop(id)[3]
+        cell = self.__cells[key]
+        cell.discard(id)
+        if not cell:
+            del self.__cells[key]
+
+    def update(self, id, point):
+        # Moves a point, only changing cells when it crosses a cell boundary
+        x, y, z = _query_point(point, self.dim)
+        key = self.__key(x, y, z)
+        old_key = self.__points[id][3]
+        self.__points[id] = (x, y, z, key)
+        if key != old_key:
+            cell = self.__cells[old_key]
+            cell.discard(id)
+            if not cell:
+                del self.__cells[old_key]
+            if key in self.__cells:
+                self.__cells[key].add(id)
+            else:
+                self.__cells[key] = {id}
+
+    def position(self, id):
+        # (x, y) or (x, y, z) of a point
+        return self.__points[id][:self.dim]
+
+    def query(self, point, radius):
+        """ Ids of the points within radius (inclusive) of point, in id order
+        """
+        qx, qy, qz = _query_point(point, self.__query_dim(point))
+        kx, ky, kz = self.__key(qx, qy, qz)
+        r2 = radius*radius
+        cells = self.__cells
+        points = self.__points
+        found = []
+        for dx, dy, dz in _cell_offsets(math.ceil(radius*self.__inv), self.dim):
+            cell = cells.get((kx + dx, ky + dy, kz + dz))
+            if cell:
+                for id in cell:
+                    x, y, z = points[id][:3]
+                    if (qx - x)**2 + (qy - y)**2 + (qz - z)**2 <= r2:
+                        found.append(id)
+        found.sort()
+        return found
+
+    def pairs(self, radius=None):
+        """ Every pair of ids (i, j), i < j, of points within radius (inclusive, cell_size by default) of each other
+
+            Each cell is paired with itself and the cells at the forward offsets, so each pair is tested once
+        """
+        radius = self.cell_size if radius is None else radius
+        r2 = radius*radius
+        offsets = _cell_offsets(math.ceil(radius*self.__inv), self.dim, forward=True)
+        cells = self.__cells
+        points = self.__points
+        # The members of each cell with their coordinates, gathered once
+        members = dict((key, [(id,) + points[id][:3] for id in cell]) for key, cell in cells.items())
+        found = []
+        for (kx, ky, kz), cell in members.items():
+            for a, (i, x, y, z) in enumerate(cell):
+                for j, x2, y2, z2 in cell[a + 1:]:
+                    if (x - x2)**2 + (y - y2)**2 + (z - z2)**2 <= r2:
+                        found.append((i, j) if i < j else (j, i))
+            for dx, dy, dz in offsets:
+                other = members.get((kx + dx, ky + dy, kz + dz))
+                if not other:
+                    continue
+                for i, x, y, z in cell:
+                    for j, x2, y2, z2 in other:
+                        if (x - x2)**2 + (y - y2)**2 + (z - z2)**2 <= r2:
+                            found.append((i, j) if i < j else (j, i))
+        return found
+
+
+def weld(points, eps, dim=None):
+    """ Deduplicates points closer than eps (inclusive)
+
+        Returns remap, where remap[i] is the index of the kept point that point i was merged into,
+        or i when point i is kept. Points are visited in order, so the first point of a cluster is kept.
+        The kept indices are [i for i, j in enumerate(remap) if i == j]
+    """
+    dim, columns = _columns(points, dim)
+    n = len(columns[0])
+    if dim == 2:
+        columns.append([0.0]*n)
+    remap = list(range(n))
+    if eps <= 0:
+        # Exact duplicates only
+        first = {}
+        for i, key in enumerate(zip(*columns)):
+            remap[i] = first.setdefault(key, i)
+        return remap
+    # Cells are 2*eps wide, so a point within eps is in the point's own cell, or the neighbour on the
+    # nearer side along each axis: 2**dim cells to check rather than 3**dim
+    inv = 0.5/eps
+    eps2 = eps*eps
+    floor = math.floor
+    xs, ys, zs = columns
+    neighbours = 2**dim
+    # cell key -> indices of the kept points in it
+    cells = {}
+    for i in range(n):
+        x, y, z = xs[i], ys[i], zs[i]
+        tx, ty, tz = x*inv, y*inv, z*inv
+        kx, ky, kz = floor(tx), floor(ty), floor(tz)
+        sx = -1 if tx - kx < 0.5 else 1
+        sy = -1 if ty - ky < 0.5 else 1
+        sz = (-1 if tz - kz < 0.5 else 1) if dim == 3 else 0
+        keys = ((kx, ky, kz), (kx + sx, ky, kz), (kx, ky + sy, kz), (kx + sx, ky + sy, kz),
+                (kx, ky, kz + sz), (kx + sx, ky, kz + sz), (kx, ky + sy, kz + sz), (kx + sx, ky + sy, kz + sz))
+        match = -1
+        for key in keys[:neighbours]:
+            cell = cells.get(key)
+            if cell:
+                for j in cell:
+                    if (x - xs[j])**2 + (y - ys[j])**2 + (z - zs[j])**2 <= eps2:
+                        match = j
+                        break
+                if match >= 0:
+                    break
+        if match >= 0:
+            remap[i] = match
+        elif (kx, ky, kz) in cells:
+            cells[(kx, ky, kz)].append(i)
+        else:
+            cells[(kx, ky, kz)] = [i]
+    return remap
@@ -0,0 +1,221 @@
+""" Matrix stack for push/pop transform hierarchies
+
+    stack = pyclid.stack.MatrixStack()
+    with stack.push():
+        stack.translate(1, 2, 3)
+        stack.rotate_y(angle)
+        draw(stack.top, stack.normal)
+
+Every level of the stack lives in one preallocated array('d'), doubled when the stack gets deeper than its
+capacity, and each operation rewrites the top level in place through a memoryview of it, so walking a hierarchy
+creates no matrix objects. top and normal return a Mat4 (or Mat3) owned by the stack and refreshed on each call,
+copy them to keep the values.
+
+The normal matrix, the inverse transpose of the upper 3x3 (2x2 for a Mat3 stack), is computed on demand and kept
+per level until the top changes. translate leaves it valid, as it doesn't change the upper part.
+"""
+from array import array
+
+import pyclid.matrix
+
+# Levels allocated up front
+CAPACITY = 32
+
+
+class MatrixStack:
+    """ Stack of Mat4 (size=4), or of 2D Mat3 (size=3), starting with the identity, or a copy of mat
+
+        Operations multiply the top on the right, as Mat4.rotate_x and friends, so the last one applied is
+        the first applied to a point
+    """
+    def __init__(self, size=4, mat=None, capacity=None):
+        assert size in (3, 4), 'Requires a size of 3 (Mat3) or 4 (Mat4)'
+        self.size = size
+        self.__n = size*size
+        self.__normal_n = (size - 1)*(size - 1)
+        self.__depth = 0
+        self.__block = None
+        self.__allocate(capacity or CAPACITY)
+        self.__top = pyclid.matrix.Mat4() if size == 4 else pyclid.matrix.Mat3()
+        self.__normal = pyclid.matrix.Mat3() if size == 4 else pyclid.matrix.Mat2()
+        if mat is None:
+            self.load_identity()
+        else:
+            self.load(mat)
+
+    def __allocate(self, capacity):
+        # (Re)allocates the blocks, keeping the current levels
+        n, normal_n = self.__n, self.__normal_n
+        block = array('d', [0.0])*(capacity*n)
+        normals = array('d', [0.0])*(capacity*normal_n)
+        valid = bytearray(capacity)
+        if self.__block is not None:
+            used = self.__depth + 1
+            block[:used*n] = self.__block[:used*n]
+            normals[:used*normal_n] = self.__normals[:used*normal_n]
+            valid[:used] = self.__valid[:used]
+        self.__block, self.__normals, self.__valid = block, normals, valid
+        view, normal_view = memoryview(block), memoryview(normals)
+        self.__levels = [view[i*n:(i + 1)*n] for i in range(capacity)]
+        self.__normal_levels = [normal_view[i*normal_n:(i + 1)*normal_n] for i in range(capacity)]
+
+    @property
+    def capacity(self):
+        return len(self.__levels)
+
+    @property
+    def depth(self):
+        # Levels pushed above the base
+        return self.__depth
+
+    def __len__(self):
+        return self.__depth + 1
+
+    def push(self):
+        """ Copies the top to a new level. Returns the stack, which pops on leaving a with block
+        """
+        depth = self.__depth + 1
+        if depth == len(self.__levels):
+            self.__allocate(2*len(self.__levels))
+        self.__levels[depth][:] = self.__levels[depth - 1]
+        if self.__valid[depth - 1]:
+            self.__normal_levels[depth][:] = self.__normal_levels[depth - 1]
+        self.__valid[depth] = self.__valid[depth - 1]
+        self.__depth = depth
+        return self
+
+    def pop(self):
+        assert self.__depth > 0, 'Requires a pushed level to pop'
+        self.__depth -= 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.pop()
+        return False
+
+    @property
+    def top(self):
+        # The top as a Mat4 (or Mat3) owned by the stack
+        self.__top.matrix[:] = self.__levels[self.__depth]
+        return self.__top
+
+    def values(self):
+        # Memoryview of the top's row major values, e.g. to upload without a copy. Writing to it skips the normal cache
+        return self.__levels[self.__depth]
+
+    @property
+    def normal(self):
+        # Inverse transpose of the top's upper 3x3 (2x2), as a Mat3 (Mat2) owned by the stack
+        depth = self.__depth
+        if not self.__valid[depth]:
+            self.__normal_levels[depth][:] = self.__normal_values(self.__levels[depth])
+            self.__valid[depth] = 1
+        self.__normal.matrix[:] = self.__normal_levels[depth]
+        return self.__normal
+
+    def __normal_values(self, m):
+        if self.size == 3:
+            m0, m1, _, m3, m4 = m[:5]
+            det = m0*m4 - m1*m3
+            assert det != 0, 'Requires a non-singular matrix'
+            inv_det = 1.0/det
+            return array('d', (m4*inv_det, -m3*inv_det, -m1*inv_det, m0*inv_det))
+        m0, m1, m2, _, m3, m4, m5, _, m6, m7, m8 = m[:11]
+        c0 = m4*m8 - m5*m7
+        c1 = m5*m6 - m3*m8
+        c2 = m3*m7 - m4*m6
+        det = m0*c0 + m1*c1 + m2*c2
+        assert det != 0, 'Requires a non-singular matrix'
+        inv_det = 1.0/det
+        # The cofactor matrix over the determinant, the transpose of the inverse
+        return array('d', (c0*inv_det, c1*inv_det, c2*inv_det,
+                           (m2*m7 - m1*m8)*inv_det, (m0*m8 - m2*m6)*inv_det, (m1*m6 - m0*m7)*inv_det,
+                           (m1*m5 - m2*m4)*inv_det, (m2*m3 - m0*m5)*inv_det, (m0*m4 - m1*m3)*inv_det))
+
+    def __changed(self):
+        self.__valid[self.__depth] = 0
+        return self
+
+    def load(self, mat):
+        # Replaces the top with the values of a Mat4 (Mat3)
+        assert isinstance(mat, pyclid.matrix.Mat4 if self.size == 4 else pyclid.matrix.Mat3), \
+            'Requires a Mat4' if self.size == 4 else 'Requires a Mat3'
+        self.__levels[self.__depth][:] = array('d', mat.values)
+        return self.__changed()
+
+    def load_identity(self):
+        top = self.__levels[self.__depth]
+        size = self.size
+        for i in range(self.__n):
+            top[i] = 1.0 if i % (size + 1) == 0 else 0.0
+        return self.__changed()
+
+    def multiply(self, mat):
+        # top = top*mat
+        top = self.__levels[self.__depth]
+        if self.size == 4:
+            assert isinstance(mat, pyclid.matrix.Mat4), 'Requires a Mat4'
+            pyclid.matrix._mat4_mul_into(top, top, mat.values)
+        else:
+            assert isinstance(mat, pyclid.matrix.Mat3), 'Requires a Mat3'
+            pyclid.matrix._mat3_mul_into(top, top, mat.values)
+        return self.__changed()
+
+    def translate(self, x, y, z=0.0):
+        # top = top*T, adding the translation through the top's columns, the normal matrix stays valid
+        top = self.__levels[self.__depth]
+        size = self.size
+        for row in range(0, self.__n, size):
+            if size == 4:
+                top[row + 3] += top[row]*x + top[row + 1]*y + top[row + 2]*z
+            else:
+                top[row + 2] += top[row]*x + top[row + 1]*y
+        return self
+
+    def scale(self, x, y, z=1.0):
+        # top = top*S, scaling the top's columns
+        top = self.__levels[self.__depth]
+        size = self.size
+        factors = (x, y, z) if size == 4 else (x, y)
+        for row in range(0, self.__n, size):
+            for column, factor in enumerate(factors):
+                top[row + column] *= factor
+        return self.__changed()
+
+    def rotate_x(self, angle):
+        # As Mat4.rotate_x
+        assert self.size == 4, 'Requires a Mat4 stack'
+        cos_angle, sin_angle = pyclid.matrix._rotation_cos_sin(angle)
+        pyclid.matrix._rotate_columns(self.__levels[self.__depth], 4, 1, 2, cos_angle, sin_angle, -sin_angle)
+        return self.__changed()
+
+    def rotate_y(self, angle):
+        assert self.size == 4, 'Requires a Mat4 stack'
+        cos_angle, sin_angle = pyclid.matrix._rotation_cos_sin(angle)
+        pyclid.matrix._rotate_columns(self.__levels[self.__depth], 4, 0, 2, cos_angle, -sin_angle, sin_angle)
+        return self.__changed()
+
+    def rotate_z(self, angle):
+        assert self.size == 4, 'Requires a Mat4 stack'
+        cos_angle, sin_angle = pyclid.matrix._rotation_cos_sin(angle)
+        pyclid.matrix._rotate_columns(self.__levels[self.__depth], 4, 0, 1, cos_angle, sin_angle, -sin_angle)
+        return self.__changed()
+
+    def rotate(self, angle):
+        # As Mat3.rotate, for a Mat3 stack
+        assert self.size == 3, 'Requires a Mat3 stack, see rotate_x, rotate_y and rotate_z'
+        cos_angle, sin_angle = pyclid.matrix._rotation_cos_sin(angle)
+        pyclid.matrix._rotate_columns(self.__levels[self.__depth], 3, 0, 1, cos_angle, -sin_angle, sin_angle)
+        return self.__changed()
+
+    def transform_point(self, vec, divide=False):
+        return self.top.transform_point(vec, divide)
+
+    def transform_points(self, buffer, out=None, components=None, divide=False):
+        # As Mat4 (Mat3).transform_points by the top, components defaults to size - 1
+        components = components or self.size - 1
+        return pyclid.matrix._transform_buffer(self.__levels[self.__depth], self.size, buffer, out, components, 1,
+                                               divide)
@@ -0,0 +1,239 @@
+""" Compact binary storage for vectors, matrices and quaternions
+
+Each value is stored as its components, little endian, as float64 ('d') or float32 ('f')
+
+    Vec2, Vec3, Vec4    x, y, (z, (w))
+    Quat                q0, q1, q2, q3
+    Mat2, Mat3, Mat4    row major
+    Mat2x3, Mat3x4      row major, the top rows of a Mat3, Mat4
+
+MatN and VecN have no fixed size, so they are not supported.
+
+A sequence is its elements back to back with a fixed stride and no header, so n Mat4 in float32 take
+n*64 bytes and can be read by anything that knows the type and format. Vector and quaternion arrays
+are written element by element in the same layout (x0, y0, z0, x1, ..), not in their planar layout.
+"""
+import mmap
+import operator
+import os
+import struct
+import sys
+from array import array
+from itertools import chain, islice
+
+import pyclid.vector
+import pyclid.matrix
+
+FLOAT64 = 'd'
+FLOAT32 = 'f'
+
+# Elements written to a file per chunk
+WRITE_CHUNK_SIZE = 65536
+
+_swap = sys.byteorder != 'little'
+# (width, fmt) -> struct.Struct
+_structs = {}
+
+
+def _check_format(fmt):
+    assert fmt in (FLOAT64, FLOAT32), 'Requires format d (float64) or f (float32)'
+
+
+def _is_matrix(cls):
+    return cls in (pyclid.matrix.Mat2, pyclid.matrix.Mat3, pyclid.matrix.Mat4, pyclid.matrix.Mat2x3,
+                   pyclid.matrix.Mat3x4)
+
+
+def _is_array(cls):
+    return isinstance(cls, type) and issubclass(cls, pyclid.vector._VecArray)
+
+
+def _check_fixed_size(cls):
+    # The layout has no header, so a type has to give the size of every element
+    assert cls not in (pyclid.matrix.MatN, pyclid.vector.VecN), \
+        'Requires a fixed size type, MatN and VecN are not supported'
+
+
+def _width(cls):
+    # Number of components of one element
+    _check_fixed_size(cls)
+    if _is_matrix(cls):
+        return cls.size
+    if _is_array(cls):
+        return cls.dim
+    # Vec2, Vec3, Vec4 and Quat slots are their components in order
+    assert cls.__module__ in ('pyclid.vector', 'pyclid.quaternion') and hasattr(cls, '__slots__'), \
+        'Requires a vector, matrix or quaternion type'
+    return len(cls.__slots__)
+
+
+def _getter(cls):
+    # Returns a function giving the components of an element of cls as a sequence
+    _check_fixed_size(cls)
+    if _is_matrix(cls):
+        return operator.attrgetter('values')
+    return operator.attrgetter(*cls.__slots__)
+
+
+def _build(cls, values):
+    if _is_matrix(cls):
+        return cls(list(values))
+    return cls(*values)
+
+
+def _struct(width, fmt):
+    key = (width, fmt)
+    if key not in _structs:
+        _structs[key] = struct.Struct('<' + str(width) + fmt)
+    return _structs[key]
+
+
+def _to_array(data, fmt):
+    # Little endian bytes to a native array of fmt
+    values = array(fmt)
+    values.frombytes(data)
+    if _swap:
+        values.byteswap()
+    return values
+
+
+def _array_bytes(values):
+    if _swap:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def to_bytes(value, fmt=FLOAT64):
+    # A single value, or a vector/quaternion array as its elements
+    _check_format(fmt)
+    if isinstance(value, pyclid.vector._VecArray):
+        return pack(value, fmt)
+    cls = type(value)
+    return _struct(_width(cls), fmt).pack(*_getter(cls)(value))
+
+
+def from_bytes(cls, data, fmt=FLOAT64):
+    # Inverse of to_bytes, cls may be a vector/quaternion array
+    _check_format(fmt)
+    if _is_array(cls):
+        return unpack(cls, data, fmt)
+    return _build(cls, _struct(_width(cls), fmt).unpack(data))
+
+
+def pack(values, fmt=FLOAT64):
+    """ Packs a sequence of one type, or a vector/quaternion array, to bytes with a fixed stride
+    """
+    _check_format(fmt)
+    if isinstance(values, pyclid.vector._VecArray):
+        # Planar to interleaved, one strided slice assignment per component
+        n = len(values)
+        dim = values.dim
+        out = array(fmt, [0.0])*(n*dim)
+        for c in range(dim):
+            column = values.data[c*n:(c+1)*n]
+            out[c::dim] = column if fmt == FLOAT64 else array(fmt, column)
+        return _array_bytes(out)
+    values = list(values)
+    if not values:
+        return b''
+    cls = type(values[0])
+    flat = array(fmt, chain.from_iterable(map(_getter(cls), values)))
+    assert len(flat) == len(values)*_width(cls), 'Requires a sequence of a single type'
+    return _array_bytes(flat)
+
+
+def unpack(cls, data, fmt=FLOAT64):
+    """ Unpacks bytes written by pack into a list of cls, or into a cls when it is a vector/quaternion array
+    """
+    _check_format(fmt)
+    width = _width(cls)
+    stride = width*struct.calcsize(fmt)
+    assert len(data) % stride == 0, 'Requires a whole number of elements'
+    flat = _to_array(data, fmt)
+    n = len(flat)//width
+    if _is_array(cls):
+        if fmt != FLOAT64:
+            flat = array(FLOAT64, flat)
+        planar = array(FLOAT64, [0.0])*len(flat)
+        for c in range(width):
+            planar[c*n:(c+1)*n] = flat[c::width]
+        return cls._wrap(planar, n)
+    return [_build(cls, flat[i:i+width]) for i in range(0, len(flat), width)]
+
+
+def write(path, values, fmt=FLOAT64):
+    # Writes a sequence (or vector/quaternion array) to path, chunked so the packed copy stays small
+    _check_format(fmt)
+    with open(path, 'wb') as f:
+        if isinstance(values, pyclid.vector._VecArray):
+            f.write(pack(values, fmt))
+            return
+        values = iter(values)
+        chunk = list(islice(values, WRITE_CHUNK_SIZE))
+        while chunk:
+            f.write(pack(chunk, fmt))
+            chunk = list(islice(values, WRITE_CHUNK_SIZE))
+
+
+def read(path, cls, fmt=FLOAT64):
+    # Reads a whole file written by write, see MappedFile to decode lazily
+    with open(path, 'rb') as f:
+        return unpack(cls, f.read(), fmt)
+
+
+class MappedFile:
+    """ A file of fixed stride elements of cls, memory mapped read only
+
+        Elements are decoded when indexed, so only the pages touched are read from disk
+
+        with MappedFile('transforms.bin', Mat4, 'f') as mats:
+            mat = mats[123456]
+    """
+    def __init__(self, path, cls, fmt=FLOAT64):
+        _check_format(fmt)
+        self.cls = cls
+        self.fmt = fmt
+        self.__struct = _struct(_width(cls), fmt)
+        # Checked before opening, so a failed check leaves no open file
+        size = os.path.getsize(path)
+        assert size % self.__struct.size == 0, 'Requires a whole number of elements'
+        self.__n = size//self.__struct.size
+        self.__file = open(path, 'rb')
+        try:
+            # mmap cannot map an empty file
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        except Exception:
+            self.__file.close()
+            raise
+
+    def __len__(self):
+        return self.__n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.__element(j) for j in range(*i.indices(self.__n))]
+        if i < 0:
+            i += self.__n
+        if not 0 <= i < self.__n:
+            raise IndexError('MappedFile index out of range')
+        return self.__element(i)
+
+    def __element(self, i):
+        return _build(self.cls, self.__struct.unpack_from(self.__map, i*self.__struct.size))
+
+    def __iter__(self):
+        for i in range(self.__n):
+            yield self.__element(i)
+
+    def close(self):
+        if isinstance(self.__map, mmap.mmap):
+            self.__map.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
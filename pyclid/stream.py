@@ -0,0 +1,217 @@
+""" Streaming pipelines over chunks of points
+
+    import pyclid.stream
+    pipeline = pyclid.stream.Pipeline().transform(model).rotate(quat).normalize().filter(in_front).project(proj)
+    for chunk in pipeline.run(pyclid.stream.read_chunks('points.bin')):
+        ...
+
+A pipeline is a list of stages applied to a stream of chunks of xyz points, one chunk at a time. Each chunk is
+copied once into an array('d'), every stage runs on it in place, and the generator yields it before the next
+chunk is read, so memory stays at about one chunk (plus the input chunk while it is copied) for any length of stream.
+
+Consecutive linear stages (transform, rotate, translate, scale) are multiplied into one Mat4 when the pipeline
+is compiled, and a project stage takes in the linear stages before it, so the points are read and written once
+per run of linear stages rather than once per stage.
+"""
+import math
+import operator
+from array import array
+from itertools import compress, islice
+
+import pyclid.backend
+import pyclid.matrix
+import pyclid.quaternion
+import pyclid.storage
+import pyclid.vector
+
+# Points per chunk for chunks() and read_chunks()
+CHUNK_SIZE = 65536
+
+
+def _mat4(mat):
+    # A Mat3 is taken as the linear 3x3 part, as Mat3.transform_points with components=3
+    assert isinstance(mat, (pyclid.matrix.Mat3, pyclid.matrix.Mat4)), 'Requires a Mat3 or Mat4'
+    if isinstance(mat, pyclid.matrix.Mat4):
+        return pyclid.matrix.Mat4(list(mat.values))
+    m = mat.values
+    return pyclid.matrix.Mat4([m[0], m[1], m[2], 0,
+                               m[3], m[4], m[5], 0,
+                               m[6], m[7], m[8], 0,
+                               0, 0, 0, 1])
+
+
+def _chunk_array(chunk):
+    # An owned array('d') of the xyz values of a chunk, from a flat buffer, a Vec3Array or a sequence of Vec3
+    if isinstance(chunk, pyclid.vector.Vec3Array):
+        n = len(chunk)
+        data = array('d', [0.0])*(3*n)
+        for c in range(3):
+            data[c::3] = chunk.data[c*n:(c + 1)*n]
+        return data
+    try:
+        view = pyclid.matrix._float_view(chunk)
+    except TypeError:
+        view = None
+    if view is not None:
+        assert len(view) % 3 == 0, 'Requires a chunk length that is a multiple of 3'
+        return array('d', view) if view.format == 'd' else array('d', view.tolist())
+    return array('d', [value for point in chunk for value in (point.x, point.y, point.z)])
+
+
+def _normalize(data):
+    # Normalizes xyz tuples in place, zero length tuples are left untouched
+    n = len(data)//3
+    if pyclid.backend.use_numpy(n):
+        pyclid.backend.normalize_tuples(data, 3)
+        return data
+    xs, ys, zs = data[0::3], data[1::3], data[2::3]
+    mags = [m or 1.0 for m in map(math.hypot, xs, ys, zs)]
+    data[0::3] = array('d', map(operator.truediv, xs, mags))
+    data[1::3] = array('d', map(operator.truediv, ys, mags))
+    data[2::3] = array('d', map(operator.truediv, zs, mags))
+    return data
+
+
+def _filter(data, predicate):
+    # The xyz tuples for which predicate(x, y, z) is true, as a new array('d')
+    xs, ys, zs = data[0::3], data[1::3], data[2::3]
+    keep = list(map(predicate, xs, ys, zs))
+    xs, ys, zs = array('d', compress(xs, keep)), array('d', compress(ys, keep)), array('d', compress(zs, keep))
+    out = array('d', [0.0])*(3*len(xs))
+    out[0::3], out[1::3], out[2::3] = xs, ys, zs
+    return out
+
+
+class Pipeline:
+    """ A chain of stages applied to a stream of xyz chunks
+
+        Each stage method returns the pipeline, so they can be chained. With directions=True the linear stages
+        treat the tuples as directions (w = 0), so translation is ignored
+    """
+    def __init__(self, directions=False):
+        self.directions = directions
+        # (kind, argument) in the order added
+        self.__stages = []
+        self.__compiled = None
+
+    def __add(self, kind, argument=None):
+        self.__stages.append((kind, argument))
+        self.__compiled = None
+        return self
+
+    def transform(self, mat):
+        # Mat4, or the linear part of a Mat3
+        return self.__add('linear', _mat4(mat))
+
+    def rotate(self, quat):
+        assert isinstance(quat, pyclid.quaternion.Quat), 'Requires a Quat'
+        return self.__add('linear', quat.to_mat4())
+
+    def translate(self, x, y, z):
+        # Moves points by (x, y, z), unlike Mat4.translate which moves the origin the other way
+        return self.__add('linear', pyclid.matrix.Mat4([1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z, 0, 0, 0, 1]))
+
+    def scale(self, x, y, z):
+        return self.__add('linear', pyclid.matrix.Mat4([x, 0, 0, 0, 0, y, 0, 0, 0, 0, z, 0, 0, 0, 0, 1]))
+
+    def normalize(self):
+        return self.__add('normalize')
+
+    def filter(self, predicate):
+        # Keeps the tuples for which predicate(x, y, z) is true, chunks can get shorter
+        return self.__add('filter', predicate)
+
+    def project(self, mat):
+        # Transforms by a Mat4 with the perspective divide
+        assert not self.directions, 'Projection requires points'
+        return self.__add('project', _mat4(mat))
+
+    def map(self, function):
+        # Custom stage, function(chunk) takes an array('d') of xyz tuples and returns one
+        return self.__add('map', function)
+
+    def stages(self):
+        """ The compiled stages, as (kind, argument) with kind 'transform', 'project', 'normalize', 'filter' or 'map'
+            and consecutive linear stages folded into one 'transform'
+        """
+        if self.__compiled is None:
+            self.__compiled = self.__compile()
+        return list(self.__compiled)
+
+    def __compile(self):
+        compiled = []
+        folded = None
+        for kind, argument in self.__stages:
+            if kind == 'linear':
+                # Later stages apply after earlier ones, so they multiply on the left
+                folded = argument if folded is None else argument*folded
+                continue
+            if kind == 'project':
+                compiled.append(('project', argument if folded is None else argument*folded))
+                folded = None
+                continue
+            if folded is not None:
+                compiled.append(('transform', folded))
+                folded = None
+            compiled.append((kind, argument))
+        if folded is not None:
+            compiled.append(('transform', folded))
+        return compiled
+
+    def apply(self, chunk):
+        # Runs the pipeline on a single chunk, returning a new array('d') of xyz tuples
+        data = _chunk_array(chunk)
+        w = 0 if self.directions else 1
+        for kind, argument in self.stages():
+            if kind == 'transform':
+                pyclid.matrix._transform_buffer(argument.values, 4, data, None, 3, w, False)
+            elif kind == 'project':
+                pyclid.matrix._transform_buffer(argument.values, 4, data, None, 3, 1, True)
+            elif kind == 'normalize':
+                _normalize(data)
+            elif kind == 'filter':
+                data = _filter(data, argument)
+            else:
+                data = argument(data)
+        return data
+
+    def run(self, chunks):
+        """ Generator applying the pipeline to each chunk of an iterable of chunks, each a flat buffer of xyz values,
+            a Vec3Array or a sequence of Vec3, yielding an array('d') of xyz tuples per chunk
+        """
+        self.stages()
+        for chunk in chunks:
+            yield self.apply(chunk)
+
+
+def chunks(points, size=None):
+    # Groups an iterable of Vec3 into array('d') chunks of size points
+    size = size or CHUNK_SIZE
+    points = iter(points)
+    chunk = list(islice(points, size))
+    while chunk:
+        yield _chunk_array(chunk)
+        chunk = list(islice(points, size))
+
+
+def read_chunks(path, size=None, fmt=pyclid.storage.FLOAT64):
+    # Reads a file of Vec3 written by pyclid.storage.write in chunks of size points
+    size = size or CHUNK_SIZE
+    stride = 3*(8 if fmt == pyclid.storage.FLOAT64 else 4)
+    with open(path, 'rb') as f:
+        data = f.read(size*stride)
+        while data:
+            assert len(data) % stride == 0, 'Requires a whole number of Vec3'
+            yield pyclid.storage._to_array(data, fmt)
+            data = f.read(size*stride)
+
+
+def write_chunks(path, chunks, fmt=pyclid.storage.FLOAT64):
+    # Writes a stream of xyz chunks to path as Vec3 in the pyclid.storage layout, returns the number of points
+    count = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            data = _chunk_array(chunk)
+            f.write(pyclid.storage._array_bytes(data if fmt == pyclid.storage.FLOAT64 else array(fmt, data)))
+            count += len(data)//3
+    return count
@@ -1,10 +1,30 @@
 import math
+import operator
+import sys
+from array import array
+from itertools import chain, repeat
 
 #import pyclid.matrix as matrix
+import pyclid.backend
+import pyclid.kernels
 import pyclid.matrix
+import pyclid.storage
+
+# NumPy array interface type of array('d')
+_FLOAT64_TYPESTR = ('<' if sys.byteorder == 'little' else '>') + 'f8'
+
+
+def _numpy_array(values, shape, dtype, copy):
+    # NumPy is optional and only imported here, when a value is converted with numpy.asarray/array
+    import numpy
+    if copy is False:
+        raise ValueError('A copy is required, values are not stored in a buffer')
+    return numpy.array(values, dtype=dtype or numpy.float64).reshape(shape)
 
 
 class Vec2:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
@@ -18,6 +38,24 @@ class Vec2:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return _numpy_array((self.x, self.y), (2,), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 2 values of a float32/float64 buffer, e.g. a numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 2, 'Requires a buffer of at least 2 values'
+        return cls(*view[:2])
+
     def __abs__(self):
         return math.sqrt(self.x**2 + self.y**2)
 
@@ -31,19 +69,57 @@ class Vec2:
 
     def __mul__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
-        self.x *= other
-        self.y *= other
-        return self
+        return Vec2(self.x*other, self.y*other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
     def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return Vec2(self.x/other, self.y/other)
+
+    __truediv__ = __div__
+
+    def __iadd__(self, other):
+        return Vec2.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Vec2.sub_into(self, self, other)
+
+    def __imul__(self, other):
+        return Vec2.mul_into(self, self, other)
+
+    def __idiv__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
         self.x /= other
         self.y /= other
         return self
 
+    __itruediv__ = __idiv__
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out
+        assert isinstance(a, Vec2) and isinstance(b, Vec2), 'Requires a Vec2'
+        out.x = a.x + b.x
+        out.y = a.y + b.y
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Vec2) and isinstance(b, Vec2), 'Requires a Vec2'
+        out.x = a.x - b.x
+        out.y = a.y - b.y
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        # out = a*b, where b is a number
+        assert isinstance(b, (int, float)), 'Requires a int, float'
+        out.x = a.x*b
+        out.y = a.y*b
+        return out
+
     def __eq__(self, other):
         assert isinstance(other, Vec2), 'Requires a Vec2'
         return self.x == other.x and self.y == other.y
@@ -85,7 +161,7 @@ class Vec2:
         assert isinstance(other, (int, float, pyclid.matrix.Mat2)), 'Requires a rotation matrix or an angle'
 
         if isinstance(other, pyclid.matrix.Mat2):
-            om = other.matrix
+            om = other.values
             vec_x = om[0]*self.x + om[1]*self.y
             vec_y = om[2]*self.x + om[3]*self.y
         else:
@@ -116,6 +192,8 @@ class Vec2:
 
 
 class Vec3:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x=0, y=0, z=0):
         self.x = x
         self.y = y
@@ -130,6 +208,24 @@ class Vec3:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return _numpy_array((self.x, self.y, self.z), (3,), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 3 values of a float32/float64 buffer, e.g. a numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 3, 'Requires a buffer of at least 3 values'
+        return cls(*view[:3])
+
     def __abs__(self):
         return math.sqrt(self.x**2 + self.y**2 + self.z**2)
 
@@ -143,21 +239,72 @@ class Vec3:
 
     def __mul__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
-        self.x *= other
-        self.y *= other
-        self.z *= other
-        return self
+        return Vec3(self.x*other, self.y*other, self.z*other)
 
     def __rmul__(self, other):
-        return self.__rmul__(other)
+        return self.__mul__(other)
 
     def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return Vec3(self.x/other, self.y/other, self.z/other)
+
+    __truediv__ = __div__
+
+    def __iadd__(self, other):
+        return Vec3.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Vec3.sub_into(self, self, other)
+
+    def __imul__(self, other):
+        return Vec3.mul_into(self, self, other)
+
+    def __idiv__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
         self.x /= other
         self.y /= other
         self.z /= other
         return self
 
+    __itruediv__ = __idiv__
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out
+        assert isinstance(a, Vec3) and isinstance(b, Vec3), 'Requires a Vec3'
+        out.x = a.x + b.x
+        out.y = a.y + b.y
+        out.z = a.z + b.z
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Vec3) and isinstance(b, Vec3), 'Requires a Vec3'
+        out.x = a.x - b.x
+        out.y = a.y - b.y
+        out.z = a.z - b.z
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        # out = a*b, where b is a number
+        assert isinstance(b, (int, float)), 'Requires a int, float'
+        out.x = a.x*b
+        out.y = a.y*b
+        out.z = a.z*b
+        return out
+
+    @staticmethod
+    def cross_into(out, a, b):
+        # out may be a or b
+        assert isinstance(a, Vec3) and isinstance(b, Vec3), 'Requires a Vec3'
+        ax, ay, az = a.x, a.y, a.z
+        bx, by, bz = b.x, b.y, b.z
+        out.x = ay*bz - by*az
+        out.y = -(ax*bz - bx*az)
+        out.z = ax*by - bx*ay
+        return out
+
     def __eq__(self, other):
         assert isinstance(other, Vec3), 'Requires a Vec3'
         return self.x == other.x and self.y == other.y and self.z == other.z
@@ -216,6 +363,8 @@ class Vec3:
 
 
 class Vec4:
+    __slots__ = ('x', 'y', 'z', 'w')
+
     def __init__(self, x=0, y=0, z=0, w=0):
         self.x = x
         self.y = y
@@ -231,6 +380,24 @@ class Vec4:
     def __repr__(self):
         return self.__str__()
 
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    def __array__(self, dtype=None, copy=None):
+        return _numpy_array((self.x, self.y, self.z, self.w), (4,), dtype, copy)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # The first 4 values of a float32/float64 buffer, e.g. a numpy array
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) >= 4, 'Requires a buffer of at least 4 values'
+        return cls(*view[:4])
+
     def __abs__(self):
         return math.sqrt(self.x**2 + self.y**2 + self.z**2 + self.w**2)
 
@@ -240,20 +407,31 @@ class Vec4:
 
     def __sub__(self, other):
         assert isinstance(other, Vec4), 'Requires a Vec4'
-        return Vec4(self.x - other.x, self.y - other.y, self.z - other.z, self.w - other.z)
+        return Vec4(self.x - other.x, self.y - other.y, self.z - other.z, self.w - other.w)
 
     def __mul__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
-        self.x *= other
-        self.y *= other
-        self.z *= other
-        self.w *= other
-        return self
+        return Vec4(self.x*other, self.y*other, self.z*other, self.w*other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
 
     def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return Vec4(self.x/other, self.y/other, self.z/other, self.w/other)
+
+    __truediv__ = __div__
+
+    def __iadd__(self, other):
+        return Vec4.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return Vec4.sub_into(self, self, other)
+
+    def __imul__(self, other):
+        return Vec4.mul_into(self, self, other)
+
+    def __idiv__(self, other):
         assert isinstance(other, (int, float)), 'Requires a int, float'
         self.x /= other
         self.y /= other
@@ -261,6 +439,37 @@ class Vec4:
         self.w /= other
         return self
 
+    __itruediv__ = __idiv__
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out
+        assert isinstance(a, Vec4) and isinstance(b, Vec4), 'Requires a Vec4'
+        out.x = a.x + b.x
+        out.y = a.y + b.y
+        out.z = a.z + b.z
+        out.w = a.w + b.w
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(a, Vec4) and isinstance(b, Vec4), 'Requires a Vec4'
+        out.x = a.x - b.x
+        out.y = a.y - b.y
+        out.z = a.z - b.z
+        out.w = a.w - b.w
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        # out = a*b, where b is a number
+        assert isinstance(b, (int, float)), 'Requires a int, float'
+        out.x = a.x*b
+        out.y = a.y*b
+        out.z = a.z*b
+        out.w = a.w*b
+        return out
+
     def __eq__(self, other):
         assert isinstance(other, Vec4), 'Requires a Vec4'
         return self.x == other.x and self.y == other.y and self.z == other.z and self.w == other.w
@@ -328,3 +537,420 @@ class Vec4:
         self.w = 0
         return self
 
+
+
+class VecN:
+    """ Vector of any size, e.g. VecN(1, 2, 3, 4, 5, 6)
+
+        Addition and subtraction use kernels generated for the size, see pyclid.kernels
+    """
+    __slots__ = ('__values',)
+
+    def __init__(self, *values):
+        self.__values = list(values)
+
+    @classmethod
+    def zeros(cls, size):
+        return cls._wrap([0]*size)
+
+    @classmethod
+    def _wrap(cls, values):
+        # Builds a vector around a list without copying it
+        vec = cls.__new__(cls)
+        vec.__values = values
+        return vec
+
+    @property
+    def values(self):
+        return self.__values
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __getitem__(self, i):
+        return self.__values[i]
+
+    def __setitem__(self, i, value):
+        self.__values[i] = value
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __str__(self):
+        return '<' + ', '.join(str(value) for value in self.__values) + '>'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __array__(self, dtype=None, copy=None):
+        return _numpy_array(self.__values, (len(self.__values),), dtype, copy)
+
+    def __abs__(self):
+        return math.sqrt(self.dot(self))
+
+    def __add__(self, other):
+        return VecN.add_into(VecN.zeros(len(self)), self, other)
+
+    def __sub__(self, other):
+        return VecN.sub_into(VecN.zeros(len(self)), self, other)
+
+    def __mul__(self, other):
+        return VecN.mul_into(VecN.zeros(len(self)), self, other)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __div__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return VecN._wrap([value/other for value in self.__values])
+
+    __truediv__ = __div__
+
+    def __iadd__(self, other):
+        return VecN.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return VecN.sub_into(self, self, other)
+
+    def __imul__(self, other):
+        return VecN.mul_into(self, self, other)
+
+    def __idiv__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        self.__values[:] = [value/other for value in self.__values]
+        return self
+
+    __itruediv__ = __idiv__
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out
+        assert isinstance(b, VecN) and len(a) == len(b), 'Requires a VecN of the same size'
+        out.__values[:] = pyclid.kernels.add(len(a))(a.__values, b.__values)
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        assert isinstance(b, VecN) and len(a) == len(b), 'Requires a VecN of the same size'
+        out.__values[:] = pyclid.kernels.sub(len(a))(a.__values, b.__values)
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        # out = a*b, where b is a number
+        assert isinstance(b, (int, float)), 'Requires a int, float'
+        out.__values[:] = map(operator.mul, a.__values, repeat(b))
+        return out
+
+    def __eq__(self, other):
+        assert isinstance(other, VecN), 'Requires a VecN'
+        return self.__values == other.__values
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def distance_between(self, other):
+        return abs(self - other)
+
+    def magnitude(self):
+        return self.__abs__()
+
+    def normalize(self):
+        mag = self.magnitude()
+        if mag:
+            self.__values[:] = [value/mag for value in self.__values]
+        return self
+
+    def dot(self, other):
+        assert isinstance(other, VecN) and len(self) == len(other), 'Requires a VecN of the same size'
+        return sum(map(operator.mul, self.__values, other.__values))
+
+    def zero(self):
+        self.__values[:] = [0]*len(self.__values)
+        return self
+
+
+def _planar_sum(values, n, dim):
+    # Sums the dim blocks of length n in a planar array, e.g. [x*x.., y*y.., z*z..] -> [x*x + y*y + z*z, ..]
+    mv = memoryview(values)
+    total = mv[0:n]
+    for c in range(1, dim):
+        total = map(operator.add, total, mv[c*n:(c+1)*n])
+    return array('d', total)
+
+
+class _VecArray:
+    """ Base for the contiguous vector containers
+
+        Components are stored planar in a single array('d'), so a Vec3Array of length n is laid out as
+
+        [x0, x1, .. xn-1, y0, y1, .. yn-1, z0, z1, .. zn-1]
+
+        Whole array operations run over the flat data where possible, and a per element value
+        (e.g. a magnitude) can be broadcast across every component by repeating it dim times.
+    """
+    __slots__ = ('data', '_n')
+
+    dim = 0
+    components = ()
+    vec_type = None
+
+    def __init__(self, vecs=[]):
+        vecs = list(vecs)
+        n = len(vecs)
+        self.data = array('d', [0.0]) * (n*self.dim)
+        self._n = n
+        for c, name in enumerate(self.components):
+            self.data[c*n:(c+1)*n] = array('d', map(operator.attrgetter(name), vecs))
+
+    @classmethod
+    def zeros(cls, n):
+        return cls._wrap(array('d', [0.0]) * (n*cls.dim), n)
+
+    @classmethod
+    def _wrap(cls, data, n):
+        # Builds a container around an existing planar array without copying
+        new = cls.__new__(cls)
+        new.data = data
+        new._n = n
+        return new
+
+    def __len__(self):
+        return self._n
+
+    def __str__(self):
+        return '[' + ', '.join(str(vec) for vec in self) + ']'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def to_bytes(self, fmt='d'):
+        # Little endian float64 ('d') or float32 ('f') components, see pyclid.storage
+        return pyclid.storage.to_bytes(self, fmt)
+
+    @classmethod
+    def from_bytes(cls, data, fmt='d'):
+        return pyclid.storage.from_bytes(cls, data, fmt)
+
+    @property
+    def __array_interface__(self):
+        """ Exposes the array to NumPy without copying, as an (n, dim) float64 array
+
+            numpy.asarray(points) is a strided view of data, so writes through it change the points.
+            data cannot be resized (append) while a view exists
+        """
+        n = self._n
+        return {'shape': (n, self.dim), 'typestr': _FLOAT64_TYPESTR, 'strides': (8, 8*n),
+                'data': memoryview(self.data), 'version': 3}
+
+    @classmethod
+    def from_buffer(cls, buffer, planar=False):
+        """ Copies a contiguous float32/float64 buffer of elements, e.g. an (n, dim) numpy array
+            planar=True reads the layout of data instead, blocks of each component, e.g. a (dim, n) array
+        """
+        view = pyclid.matrix._float_view(buffer)
+        assert len(view) % cls.dim == 0, 'Requires a multiple of ' + str(cls.dim) + ' values'
+        n = len(view)//cls.dim
+        if view.format == 'd':
+            flat = array('d')
+            flat.frombytes(view.cast('B'))
+        else:
+            flat = array('d', view)
+        if planar:
+            return cls._wrap(flat, n)
+        data = array('d', [0.0]) * len(flat)
+        for c in range(cls.dim):
+            data[c*n:(c+1)*n] = flat[c::cls.dim]
+        return cls._wrap(data, n)
+
+    def __index(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(self.__class__.__name__ + ' index out of range')
+        return i
+
+    def __getitem__(self, i):
+        i = self.__index(i)
+        return self.vec_type(*self.data[i::self._n])
+
+    def __setitem__(self, i, vec):
+        assert isinstance(vec, self.vec_type), 'Requires a ' + self.vec_type.__name__
+        i = self.__index(i)
+        n = self._n
+        for c, name in enumerate(self.components):
+            self.data[c*n + i] = getattr(vec, name)
+
+    def __iter__(self):
+        return map(self.vec_type, *self.columns())
+
+    def __eq__(self, other):
+        assert isinstance(other, self.__class__), 'Requires a ' + self.__class__.__name__
+        return self._n == other._n and self.data == other.data
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __check(self, other):
+        assert isinstance(other, self.__class__), 'Requires a ' + self.__class__.__name__
+        assert self._n == other._n, 'Requires arrays of the same length'
+
+    def columns(self):
+        # Zero copy views of each component, e.g. [x, y, z]
+        mv = memoryview(self.data)
+        n = self._n
+        return [mv[c*n:(c+1)*n] for c in range(self.dim)]
+
+    def append(self, vec):
+        assert isinstance(vec, self.vec_type), 'Requires a ' + self.vec_type.__name__
+        n = self._n
+        # Insert from the last component backwards so earlier offsets stay valid
+        for c in range(self.dim - 1, -1, -1):
+            self.data.insert((c+1)*n, getattr(vec, self.components[c]))
+        self._n += 1
+        return self
+
+    def __abs__(self):
+        return self.magnitude()
+
+    def __add__(self, other):
+        self.__check(other)
+        return self._wrap(array('d', map(operator.add, self.data, other.data)), self._n)
+
+    def __sub__(self, other):
+        self.__check(other)
+        return self._wrap(array('d', map(operator.sub, self.data, other.data)), self._n)
+
+    def __mul__(self, other):
+        assert isinstance(other, (int, float)), 'Requires a int, float'
+        return self._wrap(array('d', map(operator.mul, self.data, repeat(other))), self._n)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def scale(self, other):
+        return self.mul_into(self, self, other)
+
+    def __iadd__(self, other):
+        return self.add_into(self, self, other)
+
+    def __isub__(self, other):
+        return self.sub_into(self, self, other)
+
+    def __imul__(self, other):
+        return self.mul_into(self, self, other)
+
+    @staticmethod
+    def add_into(out, a, b):
+        # out = a + b, written into out's existing storage
+        a.__check(b)
+        a.__check(out)
+        out.data[:] = array('d', map(operator.add, a.data, b.data))
+        return out
+
+    @staticmethod
+    def sub_into(out, a, b):
+        a.__check(b)
+        a.__check(out)
+        out.data[:] = array('d', map(operator.sub, a.data, b.data))
+        return out
+
+    @staticmethod
+    def mul_into(out, a, b):
+        # out = a*b, where b is a number
+        assert isinstance(b, (int, float)), 'Requires a int, float'
+        a.__check(out)
+        out.data[:] = array('d', map(operator.mul, a.data, repeat(b)))
+        return out
+
+    def dot(self, other):
+        self.__check(other)
+        if pyclid.backend.use_numpy(self._n):
+            return pyclid.backend.dot(self.data, other.data, self._n, self.dim)
+        return _planar_sum(array('d', map(operator.mul, self.data, other.data)), self._n, self.dim)
+
+    def magnitude(self):
+        if pyclid.backend.use_numpy(self._n):
+            return pyclid.backend.magnitude(self.data, self._n, self.dim)
+        squares = array('d', map(operator.mul, self.data, self.data))
+        return array('d', map(math.sqrt, _planar_sum(squares, self._n, self.dim)))
+
+    def normalize(self):
+        # Zero length vectors are left untouched, as with Vec.normalize
+        if pyclid.backend.use_numpy(self._n):
+            pyclid.backend.normalize(self.data, self._n, self.dim)
+            return self
+        mags = array('d', [mag or 1.0 for mag in self.magnitude()])
+        self.data[:] = array('d', map(operator.truediv, self.data, mags*self.dim))
+        return self
+
+    def distance_between(self, other):
+        self.__check(other)
+        if pyclid.backend.use_numpy(self._n):
+            return pyclid.backend.distance(self.data, other.data, self._n, self.dim)
+        diff = array('d', map(operator.sub, self.data, other.data))
+        squares = array('d', map(operator.mul, diff, diff))
+        return array('d', map(math.sqrt, _planar_sum(squares, self._n, self.dim)))
+
+    def mid_point(self, other):
+        self.__check(other)
+        total = map(operator.add, self.data, other.data)
+        return self._wrap(array('d', map(operator.truediv, total, repeat(2.0))), self._n)
+
+    def zero(self):
+        self.data[:] = array('d', [0.0]) * len(self.data)
+        return self
+
+
+class Vec2Array(_VecArray):
+    """ Contiguous array of Vec2, stored planar
+
+        [x0, x1, .. xn-1, y0, y1, .. yn-1]
+    """
+    __slots__ = ()
+
+    dim = 2
+    components = ('x', 'y')
+    vec_type = Vec2
+
+    def cross(self, other):
+        # Returns the scalar cross product for each pair, as with Vec2.cross
+        assert isinstance(other, Vec2Array) and len(other) == len(self), 'Requires a Vec2Array of the same length'
+        sx, sy = self.columns()
+        ox, oy = other.columns()
+        return array('d', map(operator.sub, map(operator.mul, sx, oy), map(operator.mul, sy, ox)))
+
+
+class Vec3Array(_VecArray):
+    """ Contiguous array of Vec3, stored planar
+
+        [x0, x1, .. xn-1, y0, y1, .. yn-1, z0, z1, .. zn-1]
+    """
+    __slots__ = ()
+
+    dim = 3
+    components = ('x', 'y', 'z')
+    vec_type = Vec3
+
+    def cross(self, other):
+        assert isinstance(other, Vec3Array) and len(other) == len(self), 'Requires a Vec3Array of the same length'
+        sx, sy, sz = self.columns()
+        ox, oy, oz = other.columns()
+        mul = operator.mul
+        sub = operator.sub
+        x = map(sub, map(mul, sy, oz), map(mul, oy, sz))
+        y = map(sub, map(mul, ox, sz), map(mul, sx, oz))
+        z = map(sub, map(mul, sx, oy), map(mul, ox, sy))
+        return self._wrap(array('d', chain(x, y, z)), self._n)
+
+
+class Vec4Array(_VecArray):
+    """ Contiguous array of Vec4, stored planar
+
+        [x0, .. xn-1, y0, .. yn-1, z0, .. zn-1, w0, .. wn-1]
+    """
+    __slots__ = ()
+
+    dim = 4
+    components = ('x', 'y', 'z', 'w')
+    vec_type = Vec4
@@ -0,0 +1,128 @@
+""" Every pyclid.backend kernel against the pure Python path, on both sides of NUMPY_THRESHOLD
+"""
+import random
+from array import array
+
+import pytest
+
+import pyclid
+import pyclid.backend
+import pyclid.stream
+
+pytest.importorskip('numpy')
+
+THRESHOLD = pyclid.backend.NUMPY_THRESHOLD
+SIZES = [1, THRESHOLD - 1, THRESHOLD, THRESHOLD + 1, 200]
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) <= eps*max(1.0, abs(x)) for x, y in zip(a, b))
+
+
+def _run(operation):
+    """ operation() with the python backend, and with numpy both forced and chosen by 'auto'
+        at the default threshold, returning the three results
+    """
+    results = []
+    for name in ('python', 'numpy', 'auto'):
+        with pyclid.backend.using(name, THRESHOLD):
+            results.append(operation())
+    return results
+
+
+def _check(operation, eps=1e-9):
+    python, numpy, auto = _run(operation)
+    assert _close(python, numpy, eps)
+    assert _close(python, auto, eps)
+
+
+def _vecs(cls, vec, n, rng, zero=False):
+    values = cls([vec(*[rng.uniform(-2, 2) for i in range(len(vec.__slots__))]) for j in range(n)])
+    if zero:
+        values[0] = vec()
+    return values
+
+
+def _quats(n, rng):
+    return pyclid.QuatArray([pyclid.Quat(*[rng.uniform(-1, 1) for i in range(4)]).unit() for j in range(n)])
+
+
+def test_threshold_chooses_the_engine():
+    with pyclid.backend.using('auto', THRESHOLD):
+        assert not pyclid.backend.use_numpy(THRESHOLD - 1)
+        assert pyclid.backend.use_numpy(THRESHOLD)
+    with pyclid.backend.using('python'):
+        assert not pyclid.backend.use_numpy(10**6)
+    with pyclid.backend.using('numpy'):
+        assert pyclid.backend.use_numpy(1)
+
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('cls, vec', [(pyclid.Vec2Array, pyclid.Vec2), (pyclid.Vec3Array, pyclid.Vec3),
+                                      (pyclid.Vec4Array, pyclid.Vec4)])
+def test_vector_kernels(n, cls, vec):
+    rng = random.Random(n)
+    a, b = _vecs(cls, vec, n, rng, zero=True), _vecs(cls, vec, n, rng)
+    _check(lambda: a.dot(b))
+    _check(lambda: a.magnitude())
+    _check(lambda: a.distance_between(b))
+    _check(lambda: cls(list(a)).normalize().data)
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_normalize_tuples(n):
+    rng = random.Random(n)
+    data = array('d', [rng.uniform(-2, 2) for i in range(3*n)])
+    data[0:3] = array('d', [0.0, 0.0, 0.0])
+    _check(lambda: pyclid.stream._normalize(array('d', data)))
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_quaternion_kernels(n):
+    rng = random.Random(n)
+    a, b = _quats(n, rng), _quats(n, rng)
+    vecs = _vecs(pyclid.Vec3Array, pyclid.Vec3, n, rng)
+    _check(lambda: (a*b).data)
+    _check(lambda: (a*pyclid.Quat(1, 2, 3, 4)).data)
+    _check(lambda: a.rotate(vecs).data)
+
+    def rotate_in_place():
+        out = pyclid.Vec3Array(list(vecs))
+        pyclid.QuatArray.rotate_into(out, a, out)
+        return out.data
+    _check(rotate_in_place)
+
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('fmt', ['d', 'f'])
+def test_transform_buffer(n, fmt):
+    rng = random.Random(n)
+    eps = 1e-9 if fmt == 'd' else 1e-4
+    m4 = pyclid.Mat4([rng.uniform(-1, 1) for i in range(12)] + [0.1, 0.2, 0.3, 2.0])
+    m3 = pyclid.Mat3([rng.uniform(-1, 1) for i in range(6)] + [0.1, 0.2, 2.0])
+    affine = pyclid.Mat3x4.from_mat4(pyclid.Mat4([rng.uniform(-1, 1) for i in range(12)] + [0, 0, 0, 1]))
+    points = array(fmt, [rng.uniform(-2, 2) for i in range(3*n)])
+    points4 = array(fmt, [rng.uniform(-2, 2) for i in range(4*n)])
+    points2 = array(fmt, [rng.uniform(-2, 2) for i in range(2*n)])
+    _check(lambda: m4.transform_points(points, array(fmt, points)), eps)
+    _check(lambda: m4.transform_points(points, array(fmt, points), divide=True), eps)
+    _check(lambda: m4.transform_directions(points, array(fmt, points)), eps)
+    _check(lambda: m4.transform_points(points4, array(fmt, points4), components=4), eps)
+    _check(lambda: m3.transform_points(points, array(fmt, points)), eps)
+    _check(lambda: m3.transform_points(points2, array(fmt, points2), components=2, divide=True), eps)
+    _check(lambda: affine.transform_points(points, array(fmt, points)), eps)
+    _check(lambda: affine.transform_directions(points, array(fmt, points)), eps)
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_trs_kernels(n):
+    rng = random.Random(n)
+    translations = _vecs(pyclid.Vec3Array, pyclid.Vec3, n, rng)
+    rotations = _quats(n, rng)
+    scales = pyclid.Vec3Array([pyclid.Vec3(*[rng.uniform(0.5, 2) for i in range(3)]) for j in range(n)])
+    _check(lambda: pyclid.Mat4.from_trs_batch(translations, rotations))
+    _check(lambda: pyclid.Mat4.from_trs_batch(translations, rotations, scales))
+    values = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    for part in range(3):
+        _check(lambda: pyclid.Mat4.decompose_batch(values)[part].data)
@@ -0,0 +1,42 @@
+import pyclid.bench
+
+
+def test_every_timing_case_runs():
+    cases = pyclid.bench.timing_cases(batch_size=8)
+    names = [name for name, func in cases]
+    assert len(names) == len(set(names))
+    for name, func in cases:
+        func()
+
+
+def test_run_and_compare():
+    results = pyclid.bench.run(batch_size=8, min_time=0.0, repeat=1, match='Mat4')
+    assert results['results'] and all('Mat4' in name for name in results['results'])
+    assert results['meta']['batch_size'] == 8
+    assert pyclid.bench.compare(results, results) == []
+    name = sorted(results['results'])[0]
+    faster = {'meta': results['meta'], 'results': dict(results['results'])}
+    faster['results'][name] = results['results'][name]/2
+    regressions = pyclid.bench.compare(results, faster, threshold=0.5)
+    assert [r[0] for r in regressions] == [name]
+    assert abs(regressions[0][3] - 2.0) < 1e-9
+
+
+def test_memory_against_an_earlier_package(tmp_path):
+    # An earlier layout with a per instance __dict__
+    (tmp_path/'vector.py').write_text(
+        'class Vec2:\n    def __init__(self, *values):\n        self.values = list(values)\n'
+        'Vec3 = Vec4 = Vec2\n')
+    (tmp_path/'matrix.py').write_text(
+        'class Mat2:\n    def __init__(self, mat):\n        self.matrix = list(mat)\n        self.size = len(mat)\n'
+        'Mat3 = Mat4 = Mat2\n')
+    # Quat is missing, so it has no before
+    (tmp_path/'quaternion.py').write_text('')
+    results = pyclid.bench.memory(count=200, before=str(tmp_path))
+    assert [name for name, before, after in results] == ['Vec2', 'Vec3', 'Vec4', 'Quat', 'Mat2', 'Mat3', 'Mat4']
+    for name, before, after in results:
+        if name == 'Quat':
+            assert before is None
+        else:
+            assert after < before, name
+    assert all(before is None for name, before, after in pyclid.bench.memory(count=200))
@@ -0,0 +1,101 @@
+import random
+from array import array
+
+import pyclid
+from pyclid.bounds import AABB, BVH, frustum_planes
+
+
+def _random_vec(rng, size):
+    return pyclid.Vec3(rng.uniform(-size, size), rng.uniform(-size, size), rng.uniform(-size, size))
+
+
+def _triangles(n, seed=0):
+    rng = random.Random(seed)
+    tris = []
+    for i in range(n):
+        c = _random_vec(rng, 10)
+        tris.append((c + _random_vec(rng, 0.5), c + _random_vec(rng, 0.5), c + _random_vec(rng, 0.5)))
+    return tris
+
+
+def _ray_triangle(tri, origin, direction):
+    a, b, c = tri
+    e1, e2 = b - a, c - a
+    p = direction.cross(e2)
+    det = e1.dot(p)
+    if abs(det) < 1e-12:
+        return None
+    s = origin - a
+    u = s.dot(p)/det
+    if u < 0 or u > 1:
+        return None
+    q = s.cross(e1)
+    v = direction.dot(q)/det
+    if v < 0 or u + v > 1:
+        return None
+    t = e2.dot(q)/det
+    return t if t >= 0 else None
+
+
+def test_aabb_basics():
+    assert (AABB.from_points(pyclid.Vec3Array([pyclid.Vec3(1, 2, 3), pyclid.Vec3(-1, 0, 5)]))
+            == AABB(pyclid.Vec3(-1, 0, 3), pyclid.Vec3(1, 2, 5)))
+    box = AABB(pyclid.Vec3(0, 0, 0), pyclid.Vec3(1, 1, 1))
+    assert box.intersect_ray(pyclid.Vec3(0.5, 0.5, -1), pyclid.Vec3(0, 0, 1)) == 1.0
+    assert box.surface_area() == 6
+
+
+def test_closest_hit_matches_brute_force():
+    tris = _triangles(500)
+    bvh = BVH(tris)
+    flat = array('d', [v for tri in tris for p in tri for v in (p.x, p.y, p.z)])
+    assert BVH(flat).node_count == bvh.node_count
+    rng = random.Random(1)
+    origins = [_random_vec(rng, 15) for i in range(100)]
+    directions = [_random_vec(rng, 1) for i in range(100)]
+    hits = 0
+    for origin, direction, result in zip(origins, directions, bvh.closest_hit_batch(origins, directions)):
+        best = None
+        for i, tri in enumerate(tris):
+            t = _ray_triangle(tri, origin, direction)
+            if t is not None and (best is None or t < best[1]):
+                best = (i, t)
+        if best is None:
+            assert result is None and bvh.any_hit(origin, direction) is None
+        else:
+            hits += 1
+            assert result[0] == best[0] and abs(result[1] - best[1]) < 1e-9
+            assert bvh.any_hit(origin, direction) is not None
+    assert hits
+
+
+def test_overlap_and_frustum_match_boxes():
+    tris = _triangles(500)
+    bvh = BVH(tris)
+    boxes = [AABB().extend(a).extend(b).extend(c) for a, b, c in tris]
+    query = AABB(pyclid.Vec3(-2, -2, -2), pyclid.Vec3(3, 1, 2))
+    assert bvh.overlap(query) == [i for i, box in enumerate(boxes) if box.overlaps(query)]
+    assert BVH.from_boxes(boxes).overlap(query) == bvh.overlap(query)
+    planes = [(1, 0, 0, 5), (-1, 0, 0, 5), (0, 1, 0, 5), (0, -1, 0, 5), (0, 0, 1, 5), (0, 0, -1, 5)]
+    assert bvh.frustum(planes) == bvh.overlap(AABB(pyclid.Vec3(-5, -5, -5), pyclid.Vec3(5, 5, 5)))
+    unit = frustum_planes(pyclid.Mat4().load_identity())
+    assert bvh.frustum(unit) == bvh.overlap(AABB(pyclid.Vec3(-1, -1, -1), pyclid.Vec3(1, 1, 1)))
+
+
+def _cluster(offset, n):
+    return [AABB(pyclid.Vec3(offset + 0.01*i, 0, 0), pyclid.Vec3(offset + 1 + 0.01*i, 1, 1)) for i in range(n)]
+
+
+def test_small_nodes_stay_leaves_when_splitting_costs_more():
+    # Overlapping boxes, either half of a split has about the area of the node
+    bvh = BVH.from_boxes(_cluster(0, 4*BVH.LEAF_SIZE))
+    assert bvh.node_count == 1
+    # Two far apart clusters are cheaper to split than to test together
+    bvh = BVH.from_boxes(_cluster(0, 2*BVH.LEAF_SIZE) + _cluster(100, 2*BVH.LEAF_SIZE))
+    assert bvh.node_count == 3
+
+
+def test_empty_bvh():
+    bvh = BVH()
+    assert bvh.closest_hit(pyclid.Vec3(), pyclid.Vec3(1, 0, 0)) is None
+    assert bvh.overlap(AABB(pyclid.Vec3(), pyclid.Vec3(1, 1, 1))) == []
@@ -0,0 +1,38 @@
+import pyclid
+import pyclid.instrument
+
+
+def test_instrumented_counts_calls_and_restores_methods():
+    original = pyclid.Vec3.__add__
+    pyclid.instrument.reset()
+    with pyclid.instrument.instrumented():
+        assert pyclid.instrument.enabled()
+        a = pyclid.Vec3(1, 2, 3)
+        for i in range(5):
+            a = a + pyclid.Vec3(1, 1, 1)
+    assert not pyclid.instrument.enabled()
+    assert pyclid.Vec3.__add__ is original
+    assert a == pyclid.Vec3(6, 7, 8)
+    stats = pyclid.instrument.snapshot()
+    assert stats['Vec3.__add__']['calls'] == 5
+    assert stats['Vec3.__init__']['calls'] >= 6
+    assert [name for name, s in pyclid.instrument.top(1, 'calls')] == ['Vec3.__init__']
+    assert 'Vec3.__add__' in pyclid.instrument.report()
+    # statistics are only cleared by reset
+    pyclid.Vec3(1, 2, 3) + pyclid.Vec3()
+    assert pyclid.instrument.snapshot()['Vec3.__add__']['calls'] == 5
+    pyclid.instrument.reset()
+    assert pyclid.instrument.snapshot() == {}
+
+
+def test_enable_selected_classes():
+    pyclid.instrument.reset()
+    pyclid.instrument.enable([pyclid.Quat])
+    try:
+        pyclid.Quat(1, 0, 0, 0)*pyclid.Quat(1, 0, 0, 0)
+        pyclid.Vec3()
+    finally:
+        pyclid.instrument.disable()
+    names = set(pyclid.instrument.snapshot())
+    assert 'Quat.__mul__' in names and not any(name.startswith('Vec3') for name in names)
+    pyclid.instrument.reset()
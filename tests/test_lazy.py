@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import pyclid
+import pyclid.lazy
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _mat4(rng):
+    return pyclid.Mat4([rng.uniform(-1, 1) for i in range(16)])
+
+
+def test_chain_is_planned_and_matches_eager():
+    rng = random.Random(0)
+    p, v, m = _mat4(rng), _mat4(rng), _mat4(rng)
+    vec = pyclid.Vec4(1, 2, 3, 1)
+    expr = pyclid.lazy.lazy(p)*v*m*vec
+    assert expr.plan() == (48, (0, (1, (2, 3))))
+    result, expected = expr.evaluate(), p*v*m*vec
+    assert _close((result.x, result.y, result.z, result.w), (expected.x, expected.y, expected.z, expected.w))
+    mat = (pyclid.lazy.lazy(p)*v*m).evaluate()
+    assert isinstance(mat, pyclid.Mat4) and _close(mat.values, (p*v*m).values)
+
+
+def test_cached_results_follow_mutation():
+    rng = random.Random(1)
+    p, v, m = _mat4(rng), _mat4(rng), _mat4(rng)
+    vec = pyclid.Vec4(1, 2, 3, 1)
+    (pyclid.lazy.lazy(p)*v*m*vec).evaluate()
+    m.set_value(5.0, 0)
+    result, expected = (pyclid.lazy.lazy(p)*v*m*vec).evaluate(), p*v*m*vec
+    assert _close((result.x, result.y, result.z, result.w), (expected.x, expected.y, expected.z, expected.w))
+
+
+def test_matn_chain_and_shape_check():
+    a, b, c = pyclid.MatN(2, 5, [1.0]*10), pyclid.MatN(5, 2, [2.0]*10), pyclid.MatN(2, 5, [3.0]*10)
+    assert (pyclid.lazy.lazy(a)*b*c).evaluate().matrix == (a*b*c).matrix
+    with pytest.raises(AssertionError):
+        pyclid.lazy.lazy(pyclid.Mat4().load_identity())*pyclid.Vec3(1, 2, 3)
+
+
+def test_cache_keeps_operand_types_apart(monkeypatch):
+    # every operand gets the same id, as a collected operand's id can be reused
+    monkeypatch.setattr(pyclid.lazy, 'id', lambda operand: 0, raising=False)
+    pyclid.lazy.clear_cache()
+    values = [float(i) for i in range(16)]
+    result = (pyclid.lazy.lazy(pyclid.Mat4(values))*pyclid.Mat4(values)).evaluate()
+    assert type(result) is pyclid.Mat4
+    result = (pyclid.lazy.lazy(pyclid.MatN(4, 4, values))*pyclid.MatN(4, 4, values)).evaluate()
+    assert type(result) is pyclid.MatN and _close(result.matrix, (pyclid.Mat4(values)*pyclid.Mat4(values)).values)
+    pyclid.lazy.clear_cache()
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import pyclid
+import pyclid.kernels
+
+
+def _reference(a, b, rows, inner, cols):
+    return [sum(a[i*inner + k]*b[k*cols + j] for k in range(inner)) for i in range(rows) for j in range(cols)]
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+@pytest.mark.parametrize('rows, inner, cols', [(1, 1, 1), (2, 3, 4), (6, 6, 6), (12, 12, 12), (20, 17, 9), (12, 6, 1)])
+def test_products_match_reference(rows, inner, cols):
+    rng = random.Random(rows*inner*cols)
+    a = pyclid.MatN(rows, inner, [rng.random() for i in range(rows*inner)])
+    b = pyclid.MatN(inner, cols, [rng.random() for i in range(inner*cols)])
+    p = a*b
+    assert (p.rows, p.cols) == (rows, cols)
+    assert _close(p.matrix, _reference(a.matrix, b.matrix, rows, inner, cols))
+    v = pyclid.VecN(*[rng.random() for i in range(inner)])
+    assert _close((a*v).values, _reference(a.matrix, v.values, rows, inner, 1))
+    t = pyclid.MatN(rows, inner, list(a.matrix)).transpose()
+    assert (t.rows, t.cols) == (inner, rows)
+    assert all(t.matrix[j*rows + i] == a.matrix[i*inner + j] for i in range(rows) for j in range(inner))
+    assert t.transpose() == a
+
+
+def test_in_place_product_and_identity():
+    rng = random.Random(0)
+    a = pyclid.MatN(6, 6, [rng.random() for i in range(36)])
+    b = pyclid.MatN(6, 6, list(a.matrix))
+    c = a*b
+    a *= a
+    assert a == c
+    assert pyclid.MatN.identity(6)*b == b and b*pyclid.MatN.identity(6) == b
+    m4, n4 = pyclid.Mat4([rng.random() for i in range(16)]), pyclid.Mat4([rng.random() for i in range(16)])
+    assert _close((pyclid.MatN(4, 4, list(m4.values))*pyclid.MatN(4, 4, list(n4.values))).matrix, (m4*n4).values)
+
+
+def test_vecn_operations():
+    v = pyclid.VecN(3, 4)
+    assert abs(v) == 5 and (v*2).values == [6, 8] and (2*v).values == [6, 8] and (v/2).values == [1.5, 2]
+    w = pyclid.VecN(1, 1)
+    w += v
+    assert w == pyclid.VecN(4, 5)
+    assert pyclid.VecN(3, 4).normalize() == pyclid.VecN(0.6, 0.8)
+    assert pyclid.VecN(0, 0).normalize() == pyclid.VecN(0, 0)
+
+
+def test_kernel_source_is_unrolled():
+    source = pyclid.kernels.source('matmul', 2, 2, 2)
+    assert 'for' not in source.split(':', 1)[1]
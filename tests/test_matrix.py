@@ -0,0 +1,129 @@
+import math
+import random
+from array import array
+
+import pytest
+
+import pyclid
+import pyclid.matrix
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _random(cls, size, seed=0):
+    rng = random.Random(seed)
+    return cls([rng.uniform(-1, 1) for i in range(size)])
+
+
+def test_transform_points_matches_matrix_vector_product():
+    m = _random(pyclid.Mat4, 16)
+    pts = [random.Random(1).uniform(-1, 1) for i in range(12)]
+    buf = array('d', pts)
+    m.transform_points(buf)
+    for i in range(4):
+        v = m*pyclid.Vec4(pts[3*i], pts[3*i + 1], pts[3*i + 2], 1)
+        assert _close(buf[3*i:3*i + 3], (v.x, v.y, v.z))
+    out = bytearray(len(array('d', pts).tobytes()))
+    m.transform_points(array('d', pts).tobytes(), out, divide=True)
+    v = m*pyclid.Vec4(pts[0], pts[1], pts[2], 1)
+    assert _close(memoryview(out).cast('d').tolist()[:3], (v.x/v.w, v.y/v.w, v.z/v.w))
+    d = array('d', pts)
+    m.transform_directions(d)
+    r = m.transform_direction(pyclid.Vec3(*pts[:3]))
+    assert _close(d[:3], (r.x, r.y, r.z))
+
+
+def test_transform_points_rejects_read_only_buffer_in_place():
+    with pytest.raises(AssertionError):
+        pyclid.Mat4().load_identity().transform_points(array('d', [1, 2, 3]).tobytes())
+
+
+@pytest.mark.parametrize('cls, n', [(pyclid.Mat2, 2), (pyclid.Mat3, 3), (pyclid.Mat4, 4)])
+def test_inverse_and_determinant(cls, n):
+    for seed in range(20):
+        a, b = _random(cls, n*n, seed), _random(cls, n*n, seed + 100)
+        inv = cls.inverse_into(cls(), a)
+        assert _close((a*inv).values, cls().load_identity().values)
+        assert abs((a*b).determinant() - a.determinant()*b.determinant()) < 1e-9
+    assert cls().load_identity().determinant() == 1
+
+
+def test_rotations_match_explicit_products():
+    t = 0.7
+    c, s = math.cos(t), math.sin(t)
+    m = _random(pyclid.Mat4, 16)
+    assert _close(pyclid.Mat4(list(m.values)).rotate_x(t).values,
+                  (m*pyclid.Mat4([1, 0, 0, 0, 0, c, s, 0, 0, -s, c, 0, 0, 0, 0, 1])).values)
+    assert _close(pyclid.Mat4(list(m.values)).rotate_y(t).values,
+                  (m*pyclid.Mat4([c, 0, -s, 0, 0, 1, 0, 0, s, 0, c, 0, 0, 0, 0, 1])).values)
+    assert _close(pyclid.Mat4(list(m.values)).rotate_z(t).values,
+                  (m*pyclid.Mat4([c, s, 0, 0, -s, c, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])).values)
+    m3 = _random(pyclid.Mat3, 9)
+    assert _close(pyclid.Mat3(list(m3.values)).rotate(t).values,
+                  (m3*pyclid.Mat3([c, -s, 0, s, c, 0, 0, 0, 1])).values)
+    m2 = _random(pyclid.Mat2, 4)
+    assert _close(pyclid.Mat2(list(m2.values)).rotate(t).values, (m2*pyclid.Mat2([c, -s, s, c])).values)
+
+
+def test_rotation_cache_is_bounded():
+    size = pyclid.matrix.ROTATION_CACHE_SIZE
+    try:
+        pyclid.matrix.set_rotation_cache_size(3)
+        for angle in range(10):
+            pyclid.Mat2().load_identity().rotate(angle)
+        assert len(pyclid.matrix._rotation_cache) == 3
+        pyclid.matrix.clear_rotation_cache()
+        assert len(pyclid.matrix._rotation_cache) == 0
+        pyclid.matrix.set_rotation_cache_size(0)
+        pyclid.Mat2().rotate(1)
+        assert len(pyclid.matrix._rotation_cache) == 0
+    finally:
+        pyclid.matrix.set_rotation_cache_size(size)
+
+
+def test_mat2x3_matches_mat3():
+    m3 = pyclid.Mat3().load_identity()
+    m3.translate(1, 2)
+    m3.rotate(0.3)
+    m3.scale(2, 3)
+    a = pyclid.Mat2x3().load_identity().translate(1, 2).rotate(0.3).scale(2, 3)
+    assert _close(a.to_mat3().values, m3.values)
+    assert _close(pyclid.Mat2x3.from_mat3(m3).values, a.values)
+    n3 = pyclid.Mat3().load_identity()
+    n3.rotate(-0.7)
+    n = pyclid.Mat2x3.from_mat3(n3)
+    assert _close((a*n).to_mat3().values, (m3*n3).values)
+    p = pyclid.Vec2(0.5, -1.5)
+    r1, r2 = a.transform_point(p), m3.transform_point(p)
+    assert _close((r1.x, r1.y), (r2.x, r2.y))
+    assert abs(a.determinant() - m3.determinant()) < 1e-9
+    assert _close((a*pyclid.Mat2x3(list(a.values)).inverse()).values, (1, 0, 0, 0, 1, 0))
+    buf = array('d', [random.Random(2).random() for i in range(2*40)])
+    assert _close(a.transform_points(buf, array('d', buf)),
+                  m3.transform_points(buf, array('d', buf), components=2))
+
+
+def test_mat3x4_matches_mat4():
+    q = pyclid.Quat.from_axis_angle(pyclid.Vec3(1, 2, 3).normalize(), 0.9)
+    m4 = pyclid.Mat4.from_trs(pyclid.Vec3(1, 2, 3), q, pyclid.Vec3(2, 1, 0.5))
+    a = pyclid.Mat3x4.from_trs(pyclid.Vec3(1, 2, 3), q, pyclid.Vec3(2, 1, 0.5))
+    assert _close(a.to_mat4().values, m4.values)
+    assert _close(pyclid.Mat3x4.from_mat4(m4).values, a.values)
+    r4 = pyclid.Mat4().load_identity().rotate_x(0.3).rotate_y(0.2).rotate_z(-0.4)
+    r = pyclid.Mat3x4().load_identity().rotate_x(0.3).rotate_y(0.2).rotate_z(-0.4)
+    assert _close(r.to_mat4().values, r4.values)
+    assert _close((a*r).to_mat4().values, (m4*r4).values)
+    p = pyclid.Vec3(0.5, -1.5, 2)
+    r1, r2 = a.transform_point(p), m4.transform_point(p)
+    assert _close((r1.x, r1.y, r1.z), (r2.x, r2.y, r2.z))
+    assert abs(a.determinant() - m4.determinant()) < 1e-9
+    assert _close((a*pyclid.Mat3x4(list(a.values)).inverse()).values, (1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0))
+    rt = pyclid.Mat3x4(list(r.values)).translate(3, -1, 2)
+    assert _close(pyclid.Mat3x4(list(rt.values)).inverse_rigid().values,
+                  pyclid.Mat3x4(list(rt.values)).inverse().values)
+    assert pyclid.Mat3x4.from_bytes(a.to_bytes('d')) == a
+    with pytest.raises(AssertionError):
+        pyclid.Mat3x4.from_mat4(pyclid.Mat4([1]*16))
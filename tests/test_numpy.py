@@ -0,0 +1,49 @@
+import pytest
+
+import pyclid
+
+numpy = pytest.importorskip('numpy')
+
+
+def test_asarray_and_from_buffer_round_trip():
+    m = pyclid.Mat4([float(i) for i in range(16)])
+    a = numpy.asarray(m)
+    assert a.shape == (4, 4) and a[1, 2] == 6
+    assert pyclid.Mat4.from_buffer(a) == m
+    assert pyclid.Mat3.from_buffer(numpy.arange(9.0)) == pyclid.Mat3(list(range(9)))
+    assert pyclid.Mat2.from_buffer(numpy.arange(4, dtype=numpy.float32)) == pyclid.Mat2([0, 1, 2, 3])
+    assert numpy.array(pyclid.Vec3(1, 2, 3)).tolist() == [1, 2, 3]
+    assert pyclid.Vec3.from_buffer(numpy.array([1.0, 2, 3])) == pyclid.Vec3(1, 2, 3)
+    assert pyclid.Quat.from_buffer(numpy.array(pyclid.Quat(1, 2, 3, 4))) == pyclid.Quat(1, 2, 3, 4)
+    assert numpy.asarray(pyclid.Vec2(1, 2), dtype=numpy.float32).dtype == numpy.float32
+    assert numpy.asarray(pyclid.QuatArray([pyclid.Quat(1, 2, 3, 4)])).tolist() == [[1, 2, 3, 4]]
+    assert numpy.asarray(pyclid.Vec3Array()).shape == (0, 3)
+
+
+def test_scalar_types_refuse_copy_false():
+    with pytest.raises(ValueError):
+        numpy.array(pyclid.Vec2(1, 2), copy=False)
+
+
+def test_array_views_share_memory():
+    pts = numpy.random.default_rng(0).random((100, 3))
+    arr = pyclid.Vec3Array.from_buffer(pts)
+    assert arr[12] == pyclid.Vec3(*pts[12])
+    view = numpy.asarray(arr)
+    assert (view == pts).all()
+    view[0, 1] = 42.0
+    assert arr[0].y == 42.0
+    # a live view pins the buffer
+    with pytest.raises(BufferError):
+        arr.append(pyclid.Vec3())
+    del view
+    arr.append(pyclid.Vec3())
+    assert len(arr) == 101
+
+
+def test_from_buffer_layouts():
+    pts = numpy.random.default_rng(1).random((10, 3))
+    planar = pyclid.Vec3Array.from_buffer(numpy.ascontiguousarray(pts.T), planar=True)
+    assert planar[7] == pyclid.Vec3(*pts[7])
+    single = pyclid.Vec3Array.from_buffer(pts.astype(numpy.float32))
+    assert single[3].x == float(numpy.float32(pts[3, 0]))
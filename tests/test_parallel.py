@@ -0,0 +1,35 @@
+import random
+from array import array
+
+import pyclid
+import pyclid.backend
+import pyclid.parallel
+
+
+def test_parallel_transform_matches_single_process():
+    rng = random.Random(0)
+    m = pyclid.Mat4([rng.random() for i in range(16)])
+    pts = array('d', [rng.random() for i in range(3*3000)])
+    with pyclid.backend.using('python'):
+        expected = m.transform_points(pts, out=array('d', pts))
+        pt = pyclid.parallel.ParallelTransform(processes=2, chunk_size=1000, threshold=0)
+        assert pt.transform_points(m, pts, out=array('d', pts)) == expected
+        # the work is split in chunks, whichever workers take them
+        assert sum(s['chunks'] for s in pt.stats) == 3 and sum(s['points'] for s in pt.stats) == 3000
+        directions = pt.transform_directions(m, pts, out=array('d', pts))
+        assert directions == m.transform_directions(pts, out=array('d', pts))
+        in_place = array('d', pts)
+        pyclid.parallel.transform_points(m, in_place, processes=2)
+        assert in_place == expected
+        m3 = pyclid.Mat3([rng.random() for i in range(9)])
+        xy = array('d', pts[:2000])
+        assert (pyclid.parallel.ParallelTransform(2, 200, 0).transform_points(m3, xy, out=array('d', xy), components=2)
+                == m3.transform_points(xy, out=array('d', xy), components=2))
+
+
+def test_small_buffers_stay_in_process():
+    m = pyclid.Mat4().load_identity()
+    pt = pyclid.parallel.ParallelTransform(processes=4)
+    pt.transform_points(m, array('d', range(30)))
+    assert len(pt.stats) == 1
+    assert pyclid.parallel.ParallelTransform(2, 100, 0).transform_points(m, array('d')) == array('d')
@@ -0,0 +1,60 @@
+import random
+
+import pyclid
+
+
+def _parts(q):
+    return q.q0, q.q1, q.q2, q.q3
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _unit_quats(n, seed):
+    rng = random.Random(seed)
+    return [pyclid.Quat(*[rng.uniform(-1, 1) for i in range(4)]).unit() for j in range(n)]
+
+
+def test_product_and_rotation_agree_with_matrices():
+    rng = random.Random(0)
+    for i in range(20):
+        x, y, z = [rng.uniform(-3, 3) for j in range(3)]
+        q = pyclid.Quat.from_euler(x, y, z)
+        r = (pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 0, 1), z)*pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 1, 0), y)
+             * pyclid.Quat.from_axis_angle(pyclid.Vec3(1, 0, 0), x))
+        assert _close(_parts(q), _parts(r))
+        v = pyclid.Vec3(*[rng.random() for j in range(3)])
+        s = q*pyclid.Quat(0, v.x, v.y, v.z)*pyclid.Quat(*_parts(q)).conjugate()
+        a, b, d = q.rotate(v), q.to_mat3()*v, q.to_mat4()*pyclid.Vec4(v.x, v.y, v.z, 1)
+        assert _close((a.x, a.y, a.z), _parts(s)[1:])
+        assert _close((a.x, a.y, a.z), (b.x, b.y, b.z))
+        assert _close((a.x, a.y, a.z, 1), (d.x, d.y, d.z, d.w))
+        g = pyclid.Quat(*[rng.random() for j in range(4)])
+        assert _close(_parts(g*pyclid.Quat(*_parts(g)).inverse()), (1, 0, 0, 0))
+
+
+def test_quat_array_matches_scalar_quats():
+    a, b = _unit_quats(50, 1), _unit_quats(50, 2)
+    # nearly equal pair takes the nlerp fallback
+    b[0] = pyclid.Quat(a[0].q0, a[0].q1, a[0].q2, a[0].q3 + 1e-6).unit()
+    qa, qb = pyclid.QuatArray(a), pyclid.QuatArray(b)
+    slerp = pyclid.QuatSlerp(qa, qb)
+    for t in (0.0, 0.3, 1.0):
+        r = slerp.sample(t)
+        for i in range(50):
+            assert _close(_parts(r[i]), _parts(pyclid.Quat.slerp(a[i], b[i], t)))
+    ts = [random.Random(3).random() for i in range(50)]
+    r = pyclid.QuatArray.slerp(qa, qb, ts)
+    n = pyclid.QuatArray.nlerp(qa, qb, 0.25)
+    p = qa*qb
+    for i in range(50):
+        assert _close(_parts(r[i]), _parts(pyclid.Quat.slerp(a[i], b[i], ts[i])))
+        assert _close(_parts(n[i]), _parts(pyclid.Quat.nlerp(a[i], b[i], 0.25)))
+        assert _close(_parts(p[i]), _parts(a[i]*b[i]))
+    vs = pyclid.Vec3Array([pyclid.Vec3(i, 1, 2) for i in range(50)])
+    rotated = qa.rotate(vs)
+    for i in range(50):
+        e = a[i].rotate(vs[i])
+        assert _close((rotated[i].x, rotated[i].y, rotated[i].z), (e.x, e.y, e.z))
@@ -0,0 +1,63 @@
+import random
+
+import pyclid
+from pyclid.scene import TransformHierarchy
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _trs(t, q, s):
+    translation = pyclid.Mat4([1, 0, 0, t.x, 0, 1, 0, t.y, 0, 0, 1, t.z, 0, 0, 0, 1])
+    scale = pyclid.Mat4([s.x, 0, 0, 0, 0, s.y, 0, 0, 0, 0, s.z, 0, 0, 0, 0, 1])
+    return translation*q.to_mat4()*scale
+
+
+def _worlds(nodes):
+    worlds = []
+    for parent, t, q, s in nodes:
+        local = _trs(t, q, s)
+        worlds.append(local if parent < 0 else worlds[parent]*local)
+    return worlds
+
+
+def _descendants(nodes, index):
+    # parents always come before their children
+    found = {index}
+    for i, node in enumerate(nodes):
+        if node[0] in found:
+            found.add(i)
+    return found
+
+
+def test_worlds_and_partial_updates():
+    rng = random.Random(5)
+    h = TransformHierarchy()
+    nodes = []
+    for i in range(200):
+        parent = -1 if i == 0 or rng.random() < 0.05 else rng.randrange(i)
+        t = pyclid.Vec3(rng.random(), rng.random(), rng.random())
+        q = pyclid.Quat(*[rng.uniform(-1, 1) for j in range(4)]).unit()
+        s = pyclid.Vec3(1 + rng.random(), 1, 2)
+        h.add(parent, t, q, s)
+        nodes.append([parent, t, q, s])
+    assert h.update() == list(range(200))
+    for i, world in enumerate(_worlds(nodes)):
+        assert _close(h.world(i).values, world.values)
+    assert h.update() == []
+    q = pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 1, 0), 0.4)
+    h.set_rotation(7, q)
+    nodes[7][2] = q
+    h.set_translation(20, 1, 2, 3)
+    nodes[20][1] = pyclid.Vec3(1, 2, 3)
+    changed = h.update()
+    assert changed == sorted(_descendants(nodes, 7) | _descendants(nodes, 20))
+    for i, world in enumerate(_worlds(nodes)):
+        assert _close(h.world(i).values, world.values)
+
+
+def test_changed_ranges():
+    assert TransformHierarchy.changed_ranges([1, 2, 3, 7, 9, 10]) == [(1, 4), (7, 8), (9, 11)]
+    assert TransformHierarchy.changed_ranges([]) == []
@@ -0,0 +1,97 @@
+import math
+import random
+from array import array
+
+import pytest
+
+import pyclid
+from pyclid.spatial import HashGrid, KDTree, weld
+
+
+def _points(n, dim, seed=0):
+    rng = random.Random(seed)
+    cls = pyclid.Vec2 if dim == 2 else pyclid.Vec3
+    return [cls(*[rng.uniform(-10, 10) for i in range(dim)]) for j in range(n)]
+
+
+def _coords(point):
+    return (point.x, point.y, getattr(point, 'z', 0.0))
+
+
+def _brute_nearest(points, q, k):
+    d = sorted((math.dist(_coords(p), _coords(q)), i) for i, p in enumerate(points))
+    return [i for _, i in d[:k]]
+
+
+def _brute_within(points, q, radius):
+    return [i for i, p in enumerate(points) if math.dist(_coords(p), _coords(q)) <= radius]
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+def test_kdtree_matches_brute_force(dim):
+    points = _points(300, dim)
+    tree = KDTree(points)
+    for q in _points(20, dim, seed=1):
+        assert [i for i, d in tree.nearest(q, 5)] == _brute_nearest(points, q, 5)
+        assert tree.within(q, 4.0) == _brute_within(points, q, 4.0)
+
+
+def test_kdtree_insert_and_rebuild():
+    points = _points(100, 3)
+    tree = KDTree(points[:10])
+    for p in points[10:]:
+        tree.insert(p)
+    assert len(tree) == 100
+    q = pyclid.Vec3(1, 2, 3)
+    assert [i for i, d in tree.nearest(q, 7)] == _brute_nearest(points, q, 7)
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+def test_empty_kdtree_takes_the_dimension_of_the_first_insert(dim):
+    points = _points(80, dim)
+    tree = KDTree()
+    assert tree.nearest(points[0]) == []
+    assert tree.within(points[0], 1.0) == []
+    assert tree.nearest_batch(points[:3]) == [[], [], []]
+    for p in points:
+        tree.insert(p)
+    assert tree.dim == dim
+    q = points[5]
+    assert [i for i, d in tree.nearest(q, 3)] == _brute_nearest(points, q, 3)
+    assert tree.within(q, 5.0) == _brute_within(points, q, 5.0)
+
+
+def test_empty_kdtree_with_dim_keeps_it():
+    tree = KDTree(dim=3)
+    tree.insert(pyclid.Vec3(1, 2, 3))
+    assert tree.dim == 3
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+def test_hash_grid_matches_brute_force(dim):
+    points = _points(200, dim)
+    grid = HashGrid(2.0, points)
+    q = points[0]
+    assert grid.query(q, 3.0) == _brute_within(points, q, 3.0)
+    pairs = sorted(grid.pairs(1.5))
+    expected = [(i, j) for i in range(len(points)) for j in range(i + 1, len(points))
+                if math.dist(_coords(points[i]), _coords(points[j])) <= 1.5]
+    assert pairs == expected
+
+
+def test_empty_hash_grid_takes_the_dimension_of_the_first_insert():
+    grid = HashGrid(1.0)
+    assert grid.query(pyclid.Vec2(0, 0), 1.0) == []
+    grid.insert(pyclid.Vec2(0.5, 0.5))
+    grid.insert_many([pyclid.Vec2(0.7, 0.5), pyclid.Vec2(5, 5)])
+    assert grid.dim == 2
+    assert grid.query(pyclid.Vec2(0.6, 0.5), 0.5) == [0, 1]
+    grid = HashGrid(1.0)
+    grid.insert_many(pyclid.Vec2Array([pyclid.Vec2(1, 1)]))
+    assert grid.dim == 2
+
+
+def test_weld():
+    points = [pyclid.Vec3(0, 0, 0), pyclid.Vec3(0.001, 0, 0), pyclid.Vec3(1, 0, 0), pyclid.Vec3(1, 0.0005, 0)]
+    assert weld(points, 0.01) == [0, 0, 2, 2]
+    assert weld(array('d', [0, 0, 0, 0]), 0, dim=2) == [0, 0]
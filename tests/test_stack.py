@@ -0,0 +1,62 @@
+from array import array
+
+import pytest
+
+import pyclid
+from pyclid.stack import MatrixStack
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _translation(x, y, z):
+    return pyclid.Mat4([1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z, 0, 0, 0, 1])
+
+
+def test_push_pop_matches_mat4_operations():
+    s = MatrixStack(capacity=2)
+    with s.push():
+        s.translate(1, 2, 3)
+        s.rotate_y(0.3)
+        ref = (pyclid.Mat4().load_identity()*_translation(1, 2, 3)).rotate_y(0.3)
+        assert _close(s.top.values, ref.values)
+        with s.push():
+            s.scale(2, 3, 4)
+            ref2 = ref*pyclid.Mat4([2, 0, 0, 0, 0, 3, 0, 0, 0, 0, 4, 0, 0, 0, 0, 1])
+            # deeper than the initial capacity
+            with s.push():
+                s.rotate_x(1.1)
+                s.rotate_z(-0.4)
+                m = pyclid.Mat4(list(ref2.values)).rotate_x(1.1).rotate_z(-0.4)
+                assert _close(s.top.values, m.values)
+                v = m.values
+                inv = pyclid.Mat3([v[i] for i in (0, 1, 2, 4, 5, 6, 8, 9, 10)]).inverse()
+                inv.transpose()
+                assert _close(s.normal.values, inv.values)
+                assert s.capacity >= 4 and s.depth == 3
+            assert _close(s.top.values, ref2.values)
+            s.multiply(_translation(1, 0, 0))
+            assert _close(s.top.values, (ref2*_translation(1, 0, 0)).values)
+        assert _close(s.top.values, ref.values)
+    assert s.depth == 0 and _close(s.top.values, pyclid.Mat4().load_identity().values)
+    with pytest.raises(AssertionError):
+        s.pop()
+
+
+def test_2d_stack_and_transforms():
+    s = MatrixStack(3)
+    s.push().translate(1, 2).rotate(0.5).scale(2, 2)
+    m = pyclid.Mat3().load_identity()
+    m.translate(1, 2)
+    m.rotate(0.5)
+    m.scale(2, 2)
+    assert _close(s.top.values, m.values)
+    p, q = s.transform_point(pyclid.Vec2(1, 1)), m.transform_point(pyclid.Vec2(1, 1))
+    assert _close((p.x, p.y), (q.x, q.y))
+    s3 = MatrixStack()
+    s3.push().translate(1, 1, 1)
+    buf = array('d', [1, 2, 3])
+    s3.transform_points(buf)
+    assert list(buf) == [2, 3, 4]
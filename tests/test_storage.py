@@ -0,0 +1,63 @@
+import builtins
+
+import pytest
+
+import pyclid
+import pyclid.storage
+
+
+def test_round_trip_single_values():
+    for value in (pyclid.Vec3(1, 2, 3), pyclid.Quat(1, 0, 0, 0), pyclid.Mat4([float(i) for i in range(16)])):
+        for fmt in ('d', 'f'):
+            assert type(value).from_bytes(value.to_bytes(fmt), fmt) == value
+
+
+def test_pack_unpack_and_files(tmp_path):
+    mats = [pyclid.Mat3([float(i + j) for i in range(9)]) for j in range(5)]
+    data = pyclid.storage.pack(mats, 'f')
+    assert len(data) == 5*9*4
+    assert pyclid.storage.unpack(pyclid.Mat3, data, 'f') == mats
+    path = str(tmp_path/'mats.bin')
+    pyclid.storage.write(path, mats)
+    assert pyclid.storage.read(path, pyclid.Mat3) == mats
+    with pyclid.storage.MappedFile(path, pyclid.Mat3) as mapped:
+        assert len(mapped) == 5
+        assert mapped[3] == mats[3]
+        assert mapped[-1] == mats[-1]
+        assert mapped[1:3] == mats[1:3]
+
+
+def test_variable_size_types_are_rejected(tmp_path):
+    for value in (pyclid.MatN(2, 3, [1.0]*6), pyclid.VecN(1, 2, 3)):
+        with pytest.raises(AssertionError, match='fixed size'):
+            pyclid.storage.to_bytes(value)
+        with pytest.raises(AssertionError, match='fixed size'):
+            pyclid.storage.pack([value, value])
+        with pytest.raises(AssertionError, match='fixed size'):
+            pyclid.storage.write(str(tmp_path/'values.bin'), [value])
+        with pytest.raises(AssertionError, match='fixed size'):
+            pyclid.storage.unpack(type(value), b'')
+
+
+def test_mapped_file_empty(tmp_path):
+    path = tmp_path/'empty.bin'
+    path.write_bytes(b'')
+    with pyclid.storage.MappedFile(str(path), pyclid.Vec3) as mapped:
+        assert len(mapped) == 0
+
+
+def test_mapped_file_bad_size_leaves_no_open_file(tmp_path, monkeypatch):
+    path = tmp_path/'bad.bin'
+    path.write_bytes(b'\0'*10)
+    opened = []
+    real_open = builtins.open
+
+    def tracking_open(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr(builtins, 'open', tracking_open)
+    with pytest.raises(AssertionError):
+        pyclid.storage.MappedFile(str(path), pyclid.Vec3)
+    assert all(f.closed for f in opened)
@@ -0,0 +1,60 @@
+import random
+from array import array
+
+import pytest
+
+import pyclid
+import pyclid.backend
+import pyclid.storage
+import pyclid.stream
+
+
+def _reference(p, m, q, proj):
+    v = m*pyclid.Vec4(p.x, p.y, p.z, 1)
+    r = q.rotate(pyclid.Vec3(v.x, v.y, v.z))
+    r = pyclid.Vec3(2*(r.x + 1), 2*(r.y + 2), 2*(r.z + 3))
+    length = r.magnitude()
+    r = pyclid.Vec3(r.x/length, r.y/length, r.z/length)
+    if not r.x > 0:
+        return None
+    h = proj*pyclid.Vec4(r.x, r.y, r.z, 1)
+    return h.x/h.w, h.y/h.w, h.z/h.w
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_pipeline_matches_reference(backend):
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    rng = random.Random(2)
+    m = pyclid.Mat4([rng.uniform(-1, 1) for i in range(12)] + [0, 0, 0, 1])
+    q = pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 0, 1), 0.7)
+    proj = pyclid.Mat4([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, -0.5, 2])
+    pts = [pyclid.Vec3(rng.uniform(-5, 5), rng.uniform(-5, 5), rng.uniform(-5, 5)) for i in range(1000)]
+    pipe = (pyclid.stream.Pipeline().transform(m).rotate(q).translate(1, 2, 3).scale(2, 2, 2).normalize()
+            .filter(lambda x, y, z: x > 0).project(proj))
+    # the affine stages fold into one transform
+    assert [kind for kind, stage in pipe.stages()] == ['transform', 'normalize', 'filter', 'project']
+    expected = [v for p in pts for r in [_reference(p, m, q, proj)] if r for v in r]
+    out = array('d')
+    with pyclid.backend.using(backend):
+        for chunk in pipe.run(pyclid.stream.chunks(pts, 300)):
+            out.extend(chunk)
+    assert len(out) == len(expected)
+    assert max(abs(a - b) for a, b in zip(out, expected)) < 1e-9
+
+
+def test_directions_ignore_translation():
+    q = pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 0, 1), 0.7)
+    out = pyclid.stream.Pipeline(directions=True).translate(5, 5, 5).rotate(q).apply([pyclid.Vec3(1, 0, 0)])
+    r = q.rotate(pyclid.Vec3(1, 0, 0))
+    assert abs(out[0] - r.x) < 1e-12 and abs(out[1] - r.y) < 1e-12 and abs(out[2] - r.z) < 1e-12
+
+
+def test_read_and_write_chunks(tmp_path):
+    pts = [pyclid.Vec3(i, 2*i, 3*i) for i in range(500)]
+    src, dst = str(tmp_path/'in.bin'), str(tmp_path/'out.bin')
+    pyclid.storage.write(src, pts)
+    chunks = pyclid.stream.Pipeline().scale(2, 2, 2).run(pyclid.stream.read_chunks(src, 128))
+    assert pyclid.stream.write_chunks(dst, chunks) == 500
+    back = pyclid.storage.read(dst, pyclid.Vec3)
+    assert [back[i] for i in (0, 5, 499)] == [pts[i]*2 for i in (0, 5, 499)]
@@ -0,0 +1,161 @@
+import itertools
+import json
+
+import pytest
+
+import pyclid
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _components(vec):
+    return [getattr(vec, c) for c in type(vec).__slots__]
+
+
+def _general(mat):
+    # A copy with the same values, tagged general
+    copy = type(mat)(list(mat.values))
+    copy.matrix[0] = copy.matrix[0]
+    assert copy.structure == 'general'
+    return copy
+
+
+def _mat2_samples():
+    return {
+        'identity': pyclid.Mat2().load_identity(),
+        'diagonal': pyclid.Mat2([2, 0, 0, 3]),
+        'rigid': pyclid.Mat2().load_identity().rotate(0.4),
+        'general': pyclid.Mat2([1, 2, 3, 5]),
+    }
+
+
+def _mat3_samples():
+    rigid = pyclid.Mat3().load_identity()
+    rigid.rotate(0.4)
+    rigid.translate(1, -2)
+    return {
+        'identity': pyclid.Mat3().load_identity(),
+        'translation': pyclid.Mat3().load_identity().translate(1, 2),
+        'diagonal': pyclid.Mat3([2, 0, 0, 0, 3, 0, 0, 0, 1]),
+        'rigid': rigid,
+        'affine': pyclid.Mat3([1, 2, 3, 0, 1, 4, 0, 0, 1]),
+        'general': pyclid.Mat3([1, 2, 3, 0, 1, 4, 0.5, 0, 1]),
+    }
+
+
+def _mat4_samples():
+    return {
+        'identity': pyclid.Mat4().load_identity(),
+        'translation': pyclid.Mat4().load_identity().translate(1, 2, 3),
+        'diagonal': pyclid.Mat4([2, 0, 0, 0, 0, 3, 0, 0, 0, 0, 4, 0, 0, 0, 0, 1]),
+        'rigid': pyclid.Mat4().load_identity().rotate_x(0.3).rotate_y(0.7).translate(1, -2, 3),
+        'affine': pyclid.Mat4([1, 2, 0, 3, 0, 1, 4, 1, 2, 0, 1, 2, 0, 0, 0, 1]),
+        'general': pyclid.Mat4([1, 2, 0, 3, 0, 1, 4, 1, 2, 0, 1, 2, 0.5, 0, 0.1, 1]),
+    }
+
+
+SAMPLES = [(pyclid.Mat2, pyclid.Vec2, _mat2_samples), (pyclid.Mat3, pyclid.Vec3, _mat3_samples),
+           (pyclid.Mat4, pyclid.Vec4, _mat4_samples)]
+
+
+@pytest.mark.parametrize('cls, vec, samples', SAMPLES)
+def test_tags(cls, vec, samples):
+    for structure, mat in samples().items():
+        assert mat.structure == structure
+
+
+@pytest.mark.parametrize('cls, vec, samples', SAMPLES)
+def test_products_match_general(cls, vec, samples):
+    mats = samples()
+    for a, b in itertools.product(mats.values(), repeat=2):
+        assert _close((a*b).values, (_general(a)*_general(b)).values)
+
+
+@pytest.mark.parametrize('cls, vec, samples', SAMPLES)
+def test_vector_products_match_general(cls, vec, samples):
+    v = vec(*[0.3, -1.2, 2.5, 1.0][-len(vec.__slots__):])
+    for mat in samples().values():
+        r1, r2 = mat*v, _general(mat)*v
+        assert _close(_components(r1), _components(r2))
+
+
+@pytest.mark.parametrize('cls, vec, samples', SAMPLES)
+def test_determinants_and_inverses_match_general(cls, vec, samples):
+    for mat in samples().values():
+        general = _general(mat)
+        assert abs(mat.determinant() - general.determinant()) < 1e-9
+        out, general_out = cls(), cls()
+        cls.inverse_into(out, mat)
+        cls.inverse_into(general_out, general)
+        assert _close(out.values, general_out.values)
+
+
+@pytest.mark.parametrize('samples', [_mat3_samples, _mat4_samples])
+def test_transform_point_matches_general(samples):
+    for mat in samples().values():
+        point = pyclid.Vec2(0.3, -1.2) if isinstance(mat, pyclid.Mat3) else pyclid.Vec3(0.3, -1.2, 2.5)
+        r1, r2 = mat.transform_point(point, True), _general(mat).transform_point(point, True)
+        assert _close(_components(r1), _components(r2))
+        r1, r2 = mat.transform_direction(point), _general(mat).transform_direction(point)
+        assert _close(_components(r1), _components(r2))
+
+
+def test_rigid_products_and_inverses_stay_rigid():
+    rigid = _mat4_samples()['rigid']
+    assert (rigid*rigid).structure == 'rigid'
+    assert pyclid.Mat4.inverse_into(pyclid.Mat4(), rigid).structure == 'rigid'
+
+
+def test_writes_through_a_kept_matrix_view_drop_the_tag():
+    m = pyclid.Mat4().load_identity()
+    values = m.matrix
+    m.load_identity()
+    assert m.structure == 'identity'
+    values[3] = 5.0
+    assert m.structure == 'general'
+    v = m*pyclid.Vec4(0, 0, 0, 1)
+    assert (v.x, v.y, v.z, v.w) == (5.0, 0, 0, 1)
+    m.load_identity()
+    values[:] = range(16)
+    assert m.structure == 'general'
+    assert m.determinant() == 0
+
+
+def test_reading_the_matrix_view_keeps_the_tag():
+    m = pyclid.Mat3().load_identity()
+    assert m.matrix == [1, 0, 0, 0, 1, 0, 0, 0, 1]
+    assert list(m.matrix) == list(m.values)
+    assert m.structure == 'identity'
+
+
+def test_matrix_view_keeps_the_size():
+    m = pyclid.Mat2([1, 2, 3, 4])
+    with pytest.raises(AssertionError):
+        m.matrix[0:2] = [1]
+    assert len(m.matrix) == 4
+
+
+def test_matrix_view_is_list_like_but_not_a_list():
+    m = pyclid.Mat2([1, 2, 3, 4])
+    view = m.matrix
+    assert not isinstance(view, list)
+    assert view + [5] == [1, 2, 3, 4, 5] and [0] + view == [0, 1, 2, 3, 4]
+    copy = view.copy()
+    copy[0] = 9
+    assert type(copy) is list and m.values == (1, 2, 3, 4)
+    assert json.loads(json.dumps(list(view))) == [1, 2, 3, 4]
+    with pytest.raises(TypeError):
+        json.dumps(view)
+    assert view[1:3] == [2, 3] and 3 in view and view.index(3) == 2 and view.count(4) == 1
+    # the view follows the matrix
+    m.load_identity()
+    assert view == [1, 0, 0, 1]
+
+
+@pytest.mark.parametrize('cls', [pyclid.Mat2, pyclid.Mat3, pyclid.Mat4])
+def test_load_zero_tags_general(cls):
+    m = cls().load_identity().load_zero()
+    assert m.structure == 'general' and not any(m.values)
@@ -0,0 +1,94 @@
+import math
+import random
+
+import pytest
+
+import pyclid
+import pyclid.backend
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _batch(n, rng):
+    translations = pyclid.Vec3Array([pyclid.Vec3(*[rng.uniform(-5, 5) for i in range(3)]) for j in range(n)])
+    rotations = pyclid.QuatArray([pyclid.Quat(*[rng.uniform(-1, 1) for i in range(4)]).unit() for j in range(n)])
+    scales = pyclid.Vec3Array([pyclid.Vec3(*[rng.uniform(0.5, 2) for i in range(3)]) for j in range(n)])
+    return translations, rotations, scales
+
+
+@pytest.mark.parametrize('n', [1, 6, pyclid.backend.NUMPY_THRESHOLD - 1, pyclid.backend.NUMPY_THRESHOLD + 1, 50])
+@pytest.mark.parametrize('with_scales', [False, True])
+def test_from_trs_batch_backends_agree(n, with_scales):
+    pytest.importorskip('numpy')
+    translations, rotations, scales = _batch(n, random.Random(n))
+    scales = scales if with_scales else None
+    with pyclid.backend.using('python'):
+        python = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    with pyclid.backend.using('numpy'):
+        numpy = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    assert len(python) == 16*n
+    assert _close(python, numpy)
+
+
+@pytest.mark.parametrize('n', [1, 6, 50])
+def test_from_trs_batch_matches_from_trs(n):
+    translations, rotations, scales = _batch(n, random.Random(n))
+    values = pyclid.Mat4.from_trs_batch(translations, rotations)
+    for i in range(n):
+        assert _close(values[16*i:16*i + 16], pyclid.Mat4.from_trs(translations[i], rotations[i]).values)
+    values = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    for i in range(n):
+        assert _close(values[16*i:16*i + 16],
+                      pyclid.Mat4.from_trs(translations[i], rotations[i], scales[i]).values)
+
+
+@pytest.mark.parametrize('n', [3, 50])
+def test_decompose_batch_backends_agree(n):
+    pytest.importorskip('numpy')
+    translations, rotations, scales = _batch(n, random.Random(n))
+    values = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    results = []
+    for backend in ('python', 'numpy'):
+        with pyclid.backend.using(backend):
+            results.append([list(a.data) for a in pyclid.Mat4.decompose_batch(values)])
+    for python, numpy in zip(*results):
+        assert _close(python, numpy)
+
+
+def test_decompose_round_trip():
+    rotation = pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 1, 0), 0.5)
+    m = pyclid.Mat4.from_trs(pyclid.Vec3(1, 2, 3), rotation, pyclid.Vec3(2, 3, -4))
+    translation, rotation, scale = m.decompose()
+    assert _close(pyclid.Mat4.from_trs(translation, rotation, scale).values, m.values)
+
+
+def test_from_trs_tags_unit_rotations_rigid():
+    rotation = pyclid.Quat.from_axis_angle(pyclid.Vec3(0, 1, 0), 0.5)
+    assert pyclid.Mat4.from_trs(pyclid.Vec3(1, 2, 3), rotation).structure == 'rigid'
+    assert pyclid.Mat4.from_trs(pyclid.Vec3(1, 2, 3), rotation, pyclid.Vec3(2, 2, 2)).structure == 'affine'
+
+
+def test_from_trs_non_unit_rotation_is_not_rigid():
+    rotation = pyclid.Quat(2, 0.5, 0, 0)
+    m = pyclid.Mat4.from_trs(pyclid.Vec3(1, 2, 3), rotation)
+    assert m.structure == 'affine'
+    general = pyclid.Mat4(list(m.values))
+    general.matrix[0] = general.matrix[0]
+    assert general.structure == 'general'
+    assert _close(m.inverse().values, general.inverse().values)
+    assert abs(m.determinant() - general.determinant()) < 1e-9
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_decompose_batch_zero_scale(backend):
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    translations, rotations, scales = _batch(20, random.Random(0))
+    values = pyclid.Mat4.from_trs_batch(translations, rotations, scales)
+    values[16*7 + 1] = values[16*7 + 5] = values[16*7 + 9] = 0.0
+    with pyclid.backend.using(backend):
+        with pytest.raises(AssertionError):
+            pyclid.Mat4.decompose_batch(values)
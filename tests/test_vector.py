@@ -0,0 +1,94 @@
+import math
+import random
+
+import pytest
+
+import pyclid
+
+
+def _close(a, b, eps=1e-9):
+    a, b = list(a), list(b)
+    return len(a) == len(b) and all(abs(x - y) < eps for x, y in zip(a, b))
+
+
+def _parts(vec):
+    return [getattr(vec, c) for c in 'xyzw'[:len(vec)]]
+
+
+def _vecs(vec, n, seed=0):
+    rng = random.Random(seed)
+    return [vec(*[rng.uniform(-2, 2) for i in range(len(vec()))]) for j in range(n)]
+
+
+@pytest.mark.parametrize('cls, vec', [(pyclid.Vec2Array, pyclid.Vec2), (pyclid.Vec3Array, pyclid.Vec3),
+                                      (pyclid.Vec4Array, pyclid.Vec4)])
+def test_arrays_match_scalar_vectors(cls, vec):
+    vs, us = _vecs(vec, 10), _vecs(vec, 10, seed=1)
+    a, b = cls(vs), cls(us)
+    assert len(a) == 10 and a[3] == vs[3] and a[-1] == vs[-1]
+    pairs = [(_parts(v), _parts(u)) for v, u in zip(vs, us)]
+    assert [_parts(r) for r in a + b] == [[x + y for x, y in zip(v, u)] for v, u in pairs]
+    assert [_parts(r) for r in a - b] == [[x - y for x, y in zip(v, u)] for v, u in pairs]
+    assert _close(a.dot(b), [sum(x*y for x, y in zip(v, u)) for v, u in pairs])
+    assert _close(a.magnitude(), [sum(x*x for x in v)**0.5 for v in map(_parts, vs)])
+    assert _close(a.distance_between(b), [sum((x - y)**2 for x, y in zip(v, u))**0.5 for v, u in pairs])
+    for n, v in zip(cls(vs).normalize(), map(_parts, vs)):
+        length = sum(x*x for x in v)**0.5
+        assert _close(_parts(n), [x/length for x in v])
+
+
+def test_vec3_array_cross_append_and_index():
+    vs, us = _vecs(pyclid.Vec3, 5), _vecs(pyclid.Vec3, 5, seed=1)
+    a = pyclid.Vec3Array(vs)
+    assert list(a.cross(pyclid.Vec3Array(us))) == [v.cross(u) for v, u in zip(vs, us)]
+    a.append(pyclid.Vec3(1, 2, 3))
+    assert len(a) == 6 and a[5] == pyclid.Vec3(1, 2, 3)
+    a[0] = pyclid.Vec3()
+    assert a[0] == pyclid.Vec3()
+    with pytest.raises(IndexError):
+        a[6]
+    assert len(pyclid.Vec2Array.zeros(3)) == 3
+
+
+@pytest.mark.parametrize('value', [pyclid.Vec2(), pyclid.Vec3(), pyclid.Vec4(), pyclid.Quat(), pyclid.Mat2(),
+                                   pyclid.Mat3(), pyclid.Mat4(), pyclid.Mat2x3(), pyclid.Mat3x4()])
+def test_slots_leave_no_instance_dict(value):
+    assert not hasattr(value, '__dict__')
+
+
+def test_in_place_operators_keep_the_object():
+    v = pyclid.Vec3(1, 2, 3)
+    same = v
+    v += pyclid.Vec3(1, 1, 1)
+    v *= 2
+    assert v is same and v == pyclid.Vec3(4, 6, 8)
+    a = pyclid.Mat4([float(i) for i in range(16)])
+    b = pyclid.Mat4([float(16 - i) for i in range(16)])
+    expected = a*b
+    same = a
+    a *= b
+    assert a is same and a == expected
+    out = pyclid.Mat4()
+    assert pyclid.Mat4.mul_into(out, same, b) is out
+    # out may alias an operand
+    c = pyclid.Mat4(list(b.values))
+    pyclid.Mat4.mul_into(c, expected, c)
+    assert c == expected*b
+    q = pyclid.Quat(1, 2, 3, 4)
+    r = pyclid.Quat(0.5, 0, 1, 0)
+    out = pyclid.Quat()
+    assert pyclid.Quat.mul_into(out, q, r) is out and out == q*r
+    arr = pyclid.Vec3Array([pyclid.Vec3(1, 2, 3)])
+    same = arr
+    arr += arr
+    arr *= 0.5
+    assert arr is same and arr[0] == pyclid.Vec3(1, 2, 3)
+
+
+def test_vec2_rotate_by_angle_and_matrix():
+    v = pyclid.Vec2(1, 0)
+    r = pyclid.Vec2(1, 0).rotate(math.pi/2)
+    assert _close((r.x, r.y), (0, 1))
+    m = pyclid.Mat2().load_identity().rotate(math.pi/2)
+    r = v.rotate(m)
+    assert _close((r.x, r.y), (0, 1))